@@ -1,7 +1,5 @@
-import pandas as pd
 from ninja import NinjaAPI
-from ninja.responses import Response
-from django.contrib.auth import get_user_model, authenticate, login as auth_login, logout as auth_logout
+from django.contrib.auth import get_user_model, login as auth_login, logout as auth_logout
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from ninja.files import UploadedFile
@@ -9,49 +7,74 @@ from ninja.files import UploadedFile as NinjaUploadedFile
 from .schemas import (
     UserSignupSchema,
     UserOutSchema,
+    UserPageSchema,
     UserLoginSchema,
     AdminCreateUserSchema,
     UserUpdateSchema,
-    ExcelImportResponse,
     UploadedFileOutSchema,
+    UploadedFilePageSchema,
+    ImportJobOutSchema,
+    SignedUrlsInSchema,
+    SignedUrlsOutSchema,
 )
 from .api_google import router as google_router
-from .dependencies import admin_only as admin_required
+from .dependencies import admin_only as admin_required, async_django_auth
 from api.models import StudentProfile, FacultyProfile, StaffProfile, UploadedFile as UploadedFileModel
+from api.models import ImportJob as ImportJobModel
 from .schemas import UploadedFileInSchema
-from .utils import upload_to_supabase
-from decouple import config
-from supabase import create_client
+from .blobs import astore_upload
+from .file_listing import FILE_LIST_TIMEOUT, page_key
+from .signed_urls import MAX_SIGNED_URL_BATCH, aget_signed_urls, get_signed_urls
+from .storage import get_storage, verify_local_url
+from asgiref.sync import sync_to_async
+from .import_jobs import enqueue_import
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate_keyset
+from .profiles import auth_check_data, full_detail_data, users_with_profiles
+from .user_cache import get_for_user, set_for_user
+from .credentials import verify_credentials
 from django.http import HttpRequest
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
 from django.core.cache import cache
 api = NinjaAPI()
 User = get_user_model()
 
-SUPABASE_URL = config("SUPABASE_URL")
-SUPABASE_KEY = config("SUPABASE_KEY")
-SUPABASE_BUCKET = config("SUPABASE_BUCKET")
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-from urllib.parse import urljoin
-
-def get_signed_url(path: str, expires_in: int = 3600) -> str:
-    res = supabase.storage.from_(SUPABASE_BUCKET).create_signed_url(path, expires_in)
-
-    # If using Supabase Python client (like postgrest-py or storage3), check structure:
-    if isinstance(res, dict):
-        signed_path = res.get("signedURL")
-    else:
-        signed_path = getattr(res, "signedURL", None)
-
-    if not signed_path:
+def get_signed_url(path: str) -> str:
+    url = get_signed_urls([path]).get(path)
+    if not url:
         raise Exception(f"Signed URL generation failed or returned empty for path: {path}")
+    return url
+
+
+@api.get("/users", response=UserPageSchema)
+def list_users(
+    request,
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    role: str = None,
+    department: str = None,
+    is_active: bool = None,
+    include_total: bool = False,
+):
+    """
+    Keyset-paginated user listing ordered by (username, id). Pass the
+    returned ``next_cursor`` back as ``cursor`` to fetch the next page.
+    """
+    users = User.objects.annotate(sort_name=Coalesce("username", Value("")))
+    if role:
+        users = users.filter(role=role)
+    if is_active is not None:
+        users = users.filter(is_active=is_active)
+    if department:
+        users = users.filter(
+            Q(student_profile__department=department)
+            | Q(faculty_profile__department=department)
+            | Q(staff_profile__department=department)
+        )
 
-    return signed_path  # ✅ Already a full, signed Supabase URL
-
-
-@api.get("/users", response=list[UserOutSchema])
-def list_users(request):
-    return User.objects.all().order_by("username")
+    total = users.count() if include_total else None
+    items, next_cursor = paginate_keyset(users, ("sort_name", "id"), cursor=cursor, limit=limit)
+    return {"items": items, "next_cursor": next_cursor, "total": total}
 
 @api.post("/signup", response=UserOutSchema)
 def create_user(request, data: UserSignupSchema):
@@ -84,14 +107,8 @@ def login(request: HttpRequest, data: UserLoginSchema):
     if not email.endswith("@lnmiit.ac.in"):
         return api.create_response(request, {"detail": "Only LNMIIT emails are allowed"}, status=400)
 
-    # Try cache first
-    cache_key = f"user_auth:{email}"
-    user = cache.get(cache_key)
-
-    if not user:
-        user = authenticate(request, email=email, password=password)
-        if user:
-            cache.set(cache_key, user, timeout=60*5)  # cache 5 minutes
+    # Skips PBKDF2 only for these exact, recently verified credentials
+    user = verify_credentials(request, email, password)
 
     if user is None:
         return api.create_response(request, {"detail": "Invalid email or password"}, status=401)
@@ -116,27 +133,13 @@ def check_auth(request):
     if not request.user.is_authenticated:
         return {"authenticated": False, "user": None}
 
-    cache_key = f"user_check:{request.user.id}"
-    cached_data = cache.get(cache_key)
+    cached_data = get_for_user("user_check", request.user.id)
     if cached_data:
         return cached_data
 
-    user_data = {
-        "id": request.user.id,
-        "username": request.user.username,
-        "email": request.user.email,
-        "role": request.user.role,
-    }
-
-    if request.user.role == "student":
-        try:
-            profile = StudentProfile.objects.get(user=request.user)
-            user_data["roll_number"] = profile.roll_number
-        except StudentProfile.DoesNotExist:
-            user_data["roll_number"] = None
-
-    response = {"authenticated": True, "user": user_data}
-    cache.set(cache_key, response, timeout=60*5)  # cache for 5 minutes
+    # request.user is loaded with its role profile by ProfileModelBackend
+    response = {"authenticated": True, "user": auth_check_data(request.user)}
+    set_for_user("user_check", request.user.id, response)
     return response
 
 
@@ -177,10 +180,6 @@ def admin_create_user(request, data: AdminCreateUserSchema):
     elif data.role == "staff":
         StaffProfile.objects.create(user=user, department=data.department)
 
-    # Invalidate cached data for this user
-    cache.delete(f"user_check:{user.id}")
-    cache.delete(f"user_full_detail:{user.id}")
-
     return user
 
 
@@ -230,10 +229,6 @@ def update_user(request, user_id: int, data: UserUpdateSchema):
             profile.department = data.department
             profile.save()
 
-    # Invalidate cached data for this user
-    cache.delete(f"user_check:{user.id}")
-    cache.delete(f"user_full_detail:{user.id}")
-
     return user
 
 
@@ -242,121 +237,53 @@ def full_user_detail(request):
     if not request.user.is_authenticated:
         return {"authenticated": False, "user": None}
 
-    cache_key = f"user_full_detail:{request.user.id}"
-    cached_data = cache.get(cache_key)
+    cached_data = get_for_user("user_full_detail", request.user.id)
     if cached_data:
-        return cached_data
+        # Logging in doesn't invalidate the entry (see api.signals)
+        return {**cached_data, "user": {**cached_data["user"], "last_login": str(request.user.last_login)}}
 
-    user = request.user
-    user_data = {
-        "id": str(user.id),
-        "username": user.username or "",
-        "email": user.email or "",
-        "role": user.role or "",
-        "first_name": user.first_name or "",
-        "last_name": user.last_name or "",
-        "profile_picture": getattr(user, "profile_picture", "") or "",
-        "date_joined": str(user.date_joined),
-        "last_login": str(user.last_login),
-        "is_active": user.is_active,
-        "is_superuser": user.is_superuser,
-        "is_staff": user.is_staff,
-    }
+    response = {"authenticated": True, "user": full_detail_data(request.user)}
+    set_for_user("user_full_detail", request.user.id, response)
+    return response
 
-    # Role-specific info
-    if user.role == "student":
-        try:
-            profile = StudentProfile.objects.get(user=user)
-            user_data.update({
-                "roll_number": profile.roll_number or "",
-                "department": profile.department or "",
-                "year": profile.year or ""
-            })
-        except StudentProfile.DoesNotExist:
-            user_data.update({"roll_number": "", "department": "", "year": ""})
 
-    elif user.role == "faculty":
-        try:
-            profile = FacultyProfile.objects.get(user=user)
-            user_data["department"] = profile.department or ""
-        except FacultyProfile.DoesNotExist:
-            user_data["department"] = ""
+@api.get("/users/details")
+@admin_required
+def users_details(request, ids: str):
+    """
+    Full detail for several users at once, e.g. /users/details?ids=1,2,3.
+    Users and their role profiles are fetched in a single joined query.
+    """
+    try:
+        user_ids = {int(part) for part in ids.split(",") if part.strip()}
+    except ValueError:
+        return api.create_response(request, {"detail": "ids must be a comma-separated list of integers"}, status=400)
 
-    elif user.role == "staff":
-        try:
-            profile = StaffProfile.objects.get(user=user)
-            user_data["department"] = profile.department or ""
-        except StaffProfile.DoesNotExist:
-            user_data["department"] = ""
-
-    response = {"authenticated": True, "user": user_data}
-    cache.set(cache_key, response, timeout=60*5)  # 5 min cache
-    return response
+    if len(user_ids) > MAX_PAGE_SIZE:
+        return api.create_response(request, {"detail": f"At most {MAX_PAGE_SIZE} ids per request"}, status=400)
 
+    users = users_with_profiles().filter(id__in=user_ids).order_by("id")
+    return [full_detail_data(user) for user in users]
 
-@api.post("/admin/import-users", response=ExcelImportResponse)
+
+@api.post("/admin/import-users", response={202: ImportJobOutSchema})
 @admin_required
-def import_users(request, file: UploadedFile) -> Response:
-    df = pd.read_excel(file.file, engine='openpyxl')
-    df.columns = df.columns.str.strip().str.lower()
-
-    required_columns = {"email", "role", "username", "password"}
-    missing = required_columns - set(df.columns)
-    if missing:
-        return api.create_response(request, {"detail": f"Missing required columns: {', '.join(missing)}"}, status=400)
-
-    success = 0
-    failed = []
-
-    for index, row in df.iterrows():
-        try:
-            email = str(row["email"]).strip().lower()
-            username = str(row["username"]).strip()
-            role = str(row["role"]).strip().lower()
-            password = str(row["password"])
-            picture = row.get("picture", "") or None
-            department = row.get("department", "")
-            roll_number = row.get("roll_number", "")
-
-            if not email.lower().endswith("@lnmiit.ac.in"):
-                raise ValueError("Only LNMIIT emails are allowed")
-
-            if User.objects.filter(email=email).exists():
-                raise ValueError("Email already exists")
-
-            if role == "student":
-                if not roll_number or not department:
-                    raise ValueError("Student must have roll_number and department")
-                if StudentProfile.objects.filter(roll_number=roll_number).exists():
-                    raise ValueError("Roll number already exists")
-
-            validate_password(password)
-
-            user = User.objects.create_user(
-                email=email,
-                username=username,
-                password=password,
-                role=role,
-                profile_picture=picture
-            )
-
-            if role == "student":
-                StudentProfile.objects.create(user=user, roll_number=roll_number, department=department)
-            elif role == "faculty":
-                FacultyProfile.objects.create(user=user, department=department)
-            elif role == "staff":
-                StaffProfile.objects.create(user=user, department=department)
-
-            success += 1
-
-        except Exception as e:
-            failed.append({"row": int(index) + 2, "error": str(e)})
-
-    return api.create_response(
-        request,
-        ExcelImportResponse(success_count=success, failed=failed),
-        status=201
-    )
+def import_users(request, file: UploadedFile):
+    """
+    Queue the spreadsheet for a background import worker and return the job
+    right away. Poll /admin/import-jobs/{job_id} for progress.
+    """
+    job = enqueue_import(request.user, file)
+    return 202, job
+
+
+@api.get("/admin/import-jobs/{job_id}", response=ImportJobOutSchema)
+@admin_required
+def import_job_status(request, job_id: int):
+    try:
+        return ImportJobModel.objects.defer("payload").get(id=job_id)
+    except ImportJobModel.DoesNotExist:
+        return api.create_response(request, {"detail": "Import job not found"}, status=404)
 
 
 #File Handling
@@ -378,32 +305,43 @@ def save_file_meta(request, data: UploadedFileInSchema):
     # Cache metadata for this file (5 minutes)
     cache.set(f"file_meta:{uploaded.id}", uploaded, timeout=300)
 
-    return uploaded
+    return {
+        "id": uploaded.id,
+        "user": uploaded.user_id,
+        "filename": uploaded.filename,
+        "size": uploaded.size,
+        "uploaded_at": uploaded.uploaded_at,
+        "cdn_url": uploaded.cdn_url,
+        "year": uploaded.year,
+    }
 
 
 @api.post("/upload")
-def upload_file(request, file: NinjaUploadedFile):
-    if not request.user.is_authenticated:
+async def upload_file(request, file: NinjaUploadedFile):
+    user = await request.auser()
+    if not user.is_authenticated:
         return api.create_response(request, {"detail": "Authentication required"}, status=401)
 
     year = request.POST.get("year") or request.POST.get("year[]") or None
 
     try:
-        supabase_path = upload_to_supabase(file, file.name)
+        # Identical content is stored once and shared between uploads
+        blob, created = await astore_upload(file)
     except Exception as e:
         return api.create_response(request, {"detail": f"Upload failed: {str(e)}"}, status=500)
 
-    uploaded = UploadedFileModel.objects.create(
-        user=request.user,
+    uploaded = await UploadedFileModel.objects.acreate(
+        user=user,
         file=None,
         filename=file.name,
         size=file.size,
         year=year,
-        cdn_url=supabase_path,
+        cdn_url=blob.path,
+        blob=blob,
     )
 
     # Cache metadata
-    cache.set(f"file_meta:{uploaded.id}", uploaded, timeout=300)
+    await cache.aset(f"file_meta:{uploaded.id}", uploaded, timeout=300)
 
     return {
         "success": True,
@@ -413,40 +351,65 @@ def upload_file(request, file: NinjaUploadedFile):
         "id": uploaded.id,
         "uploaded_at": uploaded.uploaded_at,
         "year": uploaded.year,
+        "deduplicated": not created,
     }
 
 
-@api.get("/uploaded-files", response=list[UploadedFileOutSchema])
-def list_uploaded_files(request):
+def _with_signed_urls(rows):
+    # One bulk signing call for whatever the shared cache can't answer
+    urls = get_signed_urls([row["cdn_url"] for row in rows if row["cdn_url"]])
+    return [{**row, "signed_url": urls.get(row["cdn_url"])} for row in rows]
+
+
+@api.get("/uploaded-files", response=UploadedFilePageSchema)
+def list_uploaded_files(
+    request,
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    year: str = None,
+    owner: int = None,
+    filename: str = None,
+    with_urls: bool = False,
+):
+    """
+    Files visible to the user, newest first, keyset-paginated on
+    (uploaded_at, id). ``year``, ``owner`` (a user id) and ``filename`` (a
+    prefix) narrow the list. ``with_urls=true`` adds a ``signed_url`` to
+    every row so the client doesn't have to sign them one by one.
+    """
     if not request.user.is_authenticated:
         raise HttpError(401, "Authentication required")
 
-    cache_key = f"uploaded_files:{request.user.id}"
-    cached_files = cache.get(cache_key)
-    if cached_files:
-        return cached_files
-
-    files = (
-        UploadedFileModel.objects.all()
-        if request.user.role in ["admin", "faculty"]
-        else UploadedFileModel.objects.filter(user=request.user)
-    ).order_by("-uploaded_at")
-
-    result = []
-    for f in files:
-        result.append({
-            "id": f.id,
-            "user": f.user_id,
-            "filename": f.filename,
-            "size": f.size,
-            "uploaded_at": f.uploaded_at,
-            "cdn_url": f.cdn_url or "",
-            "year": f.year or "",
-        })
-
-    # Cache the list for 5 minutes
-    cache.set(cache_key, result, timeout=300)
-    return result
+    sees_all = request.user.role in ["admin", "faculty"]
+    # Admins and faculty share cached pages; uploads and deletes invalidate
+    # every page through the listing version (see api.file_listing)
+    cache_key = page_key(
+        "all" if sees_all else request.user.id,
+        cursor=cursor, limit=limit, year=year, owner=owner, filename=filename,
+    )
+    page = cache.get(cache_key)
+    if page is None:
+        files = UploadedFileModel.objects.all() if sees_all else UploadedFileModel.objects.filter(user=request.user)
+        if year:
+            files = files.filter(year=year)
+        if owner is not None:
+            files = files.filter(user_id=owner)
+        if filename:
+            files = files.filter(filename__startswith=filename)
+
+        rows, next_cursor = paginate_keyset(
+            files.values("id", "user", "filename", "size", "uploaded_at", "cdn_url", "year"),
+            ("-uploaded_at", "-id"),
+            cursor=cursor,
+            limit=limit,
+        )
+        items = [{**row, "cdn_url": row["cdn_url"] or "", "year": row["year"] or ""} for row in rows]
+        page = {"items": items, "next_cursor": next_cursor}
+        cache.set(cache_key, page, timeout=FILE_LIST_TIMEOUT)
+
+    if with_urls:
+        page = {**page, "items": _with_signed_urls(page["items"])}
+    return page
 
 
 @api.delete("/uploaded-files/{file_id}/delete")
@@ -462,73 +425,147 @@ def delete_uploaded_file(request, file_id: int):
     except UploadedFileModel.DoesNotExist:
         return api.create_response(request, {"detail": "File not found"}, status=404)
 
-    try:
-        path = uploaded_file.cdn_url
-        res = supabase.storage.from_(SUPABASE_BUCKET).remove([path])
-        if hasattr(res, "error") and res.error:
-            print(f"Supabase deletion error: {res.error.message}")
-    except Exception as e:
-        print(f"Supabase removal failed: {e}")
-
+    # Storage is cleaned up by api.signals, and only once nothing else
+    # references the content
     uploaded_file.delete()
 
-    # Invalidate cache
+    # Invalidate cache (file listings are invalidated by api.signals)
     cache.delete(f"file_meta:{file_id}")
-    cache.delete(f"uploaded_files:{request.user.id}")
 
     return {"success": True, "detail": "File deleted successfully."}
 
 
 
-@api.get("/get-signed-url/{filename}")
-def get_signed_url_view(request, filename: str):
-    cache_key = f"signed_url:{filename}"
-    url = cache.get(cache_key)
+async def _visible_paths(user, paths):
+    # Students only see their own uploads
+    if user.role in ["admin", "faculty"]:
+        return paths
+    owned = UploadedFileModel.objects.filter(user=user, cdn_url__in=paths).values_list("cdn_url", flat=True)
+    allowed = {path async for path in owned}
+    return [path for path in paths if path in allowed]
 
-    if not url:
-        try:
-            url = get_signed_url(filename)
-            cache.set(cache_key, url, timeout=60*5)  # cache 5 minutes
-        except Exception as e:
-            return api.create_response(request, {"detail": str(e)}, status=500)
 
-    return {"url": url}
+@api.get("/get-signed-url/{filename}", auth=async_django_auth)
+async def get_signed_url_view(request, filename: str):
+    if not await _visible_paths(request.auth, [filename]):
+        return api.create_response(request, {"detail": "File not found"}, status=404)
+
+    try:
+        urls = await aget_signed_urls([filename])
+    except Exception as e:
+        return api.create_response(request, {"detail": str(e)}, status=500)
+
+    # Storage only leaves out paths it has no object for
+    if filename not in urls:
+        return api.create_response(request, {"detail": "File not found"}, status=404)
+
+    return {"url": urls[filename]}
+
+
+@api.post("/get-signed-urls", response=SignedUrlsOutSchema, auth=async_django_auth)
+async def get_signed_urls_view(request, data: SignedUrlsInSchema):
+    """
+    Sign up to MAX_SIGNED_URL_BATCH paths at once. Students only get URLs
+    for their own uploads; everything else is reported in ``missing``.
+    """
+    paths = list(dict.fromkeys(data.paths))
+    if len(paths) > MAX_SIGNED_URL_BATCH:
+        return api.create_response(request, {"detail": f"At most {MAX_SIGNED_URL_BATCH} paths per request"}, status=400)
+
+    paths = await _visible_paths(request.auth, paths)
+
+    try:
+        urls = await aget_signed_urls(paths)
+    except Exception as e:
+        return api.create_response(request, {"detail": str(e)}, status=500)
+
+    return {"urls": urls, "missing": [path for path in data.paths if path not in urls]}
 
-import requests
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.http import StreamingHttpResponse, HttpResponse
 from ninja.errors import HttpError
-from ninja.security import django_auth
+from .stream_cache import stream_cache
 
-@api.get("/secure-stream", auth=django_auth)
-def secure_stream(request, path: str):
-    if not request.user.is_authenticated:
-        raise HttpError(401, "Unauthorized")
+STREAM_CHUNK_SIZE = getattr(settings, "SECURE_STREAM_CHUNK_SIZE", 64 * 1024)
 
-    cache_key = f"signed_stream:{path}"
-    signed_url = cache.get(cache_key)
+# Conditional/partial request headers forwarded to storage, and the response
+# headers passed back, so seeking in a PDF or video only moves the bytes asked for.
+FORWARDED_STREAM_HEADERS = ("Range", "If-Range", "If-None-Match", "If-Modified-Since")
+PASSTHROUGH_STREAM_HEADERS = ("Content-Length", "Content-Range", "Accept-Ranges", "ETag", "Last-Modified")
 
-    if not signed_url:
-        try:
-            signed_url = get_signed_url(path, expires_in=60)
-            cache.set(cache_key, signed_url, timeout=50)  # cache for 50 seconds
-        except Exception as e:
-            print(f"[ERROR] Failed to generate signed URL for {path}: {e}")
-            return HttpResponse("File could not be streamed.", status=500)
 
-    try:
-        response = requests.get(signed_url, stream=True, timeout=10)
-        if response.status_code != 200:
-            raise Exception(f"Failed to fetch file from Supabase (status: {response.status_code})")
+async def _open_object(request, path):
+    forwarded = {name: request.headers[name] for name in FORWARDED_STREAM_HEADERS if name in request.headers}
+    # Bytes are relayed as-is, so Content-Length/Content-Range must describe them
+    forwarded["Accept-Encoding"] = "identity"
+
+    status, upstream_headers, chunks = await get_storage().aopen(
+        path, forwarded, request.method, async_chunks=isinstance(request, ASGIRequest)
+    )
+    if status not in (200, 206, 304, 416):
+        raise Exception(f"Failed to fetch file from storage (status: {status})")
+    return status, upstream_headers, chunks
 
-        content_type = response.headers.get("Content-Type", "application/octet-stream")
-        content_disposition = f'inline; filename="{path.split("_", 1)[-1]}"'
 
-        return StreamingHttpResponse(
-            response.iter_content(chunk_size=8192),
-            content_type=content_type,
-            headers={"Content-Disposition": content_disposition},
+def _relay_response(status, upstream_headers, chunks, filename):
+    headers = {name: upstream_headers[name] for name in PASSTHROUGH_STREAM_HEADERS if name in upstream_headers}
+    headers["Content-Disposition"] = f'inline; filename="{filename}"'
+    content_type = upstream_headers.get("Content-Type", "application/octet-stream")
+
+    if chunks is None:
+        return HttpResponse(status=status, content_type=content_type, headers=headers)
+    return StreamingHttpResponse(chunks, status=status, content_type=content_type, headers=headers)
+
+
+@api.api_operation(["GET", "HEAD"], "/secure-stream", auth=async_django_auth)
+async def secure_stream(request, path: str):
+    filename = path.split("_", 1)[-1]
+
+    # Hot files are answered from local disk without touching storage
+    entry = await sync_to_async(stream_cache.lookup, thread_sensitive=False)(path)
+    if entry:
+        response = await sync_to_async(stream_cache.response, thread_sensitive=False)(
+            request, entry, filename, STREAM_CHUNK_SIZE, isinstance(request, ASGIRequest)
         )
+        # None: evicted since the lookup, so fetch it from storage after all
+        if response is not None:
+            return response
 
+    try:
+        status, upstream_headers, chunks = await _open_object(request, path)
     except Exception as e:
         print(f"[ERROR] Stream failed for {path}: {e}")
         return HttpResponse("File could not be streamed.", status=500)
+
+    if status == 200 and get_storage().cache_streams and "Content-Length" in upstream_headers:
+        # A complete body: keep a copy for the next request
+        chunks = stream_cache.tee(
+            path,
+            upstream_headers.get("ETag"),
+            int(upstream_headers["Content-Length"]),
+            upstream_headers.get("Content-Type", "application/octet-stream"),
+            chunks,
+        )
+    return _relay_response(status, upstream_headers, chunks, filename)
+
+
+@api.api_operation(["GET", "HEAD"], "/local-storage/{path:path}")
+async def local_storage_object(request, path: str, token: str):
+    """
+    Serves the signed URLs handed out by the local storage backend.
+    """
+    if not verify_local_url(path, token):
+        return api.create_response(request, {"detail": "Invalid or expired link"}, status=403)
+
+    try:
+        status, upstream_headers, chunks = await _open_object(request, path)
+    except Exception:
+        return api.create_response(request, {"detail": "File not found"}, status=404)
+    return _relay_response(status, upstream_headers, chunks, path.split("_", 1)[-1])
+
+
+@api.get("/admin/stream-cache")
+@admin_required
+def stream_cache_stats(request):
+    return stream_cache.stats()
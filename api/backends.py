@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .profiles import users_with_profiles
+
+UserModel = get_user_model()
+
+# Dotted path passed to ``login()`` when the user wasn't obtained through
+# ``authenticate()`` (e.g. Google sign-in).
+PROFILE_BACKEND = "api.backends.ProfileModelBackend"
+
+
+class ProfileModelBackend(ModelBackend):
+    """
+    ModelBackend whose ``get_user`` joins the role profiles, so
+    ``request.user`` arrives with its Student/Faculty/Staff profile already
+    loaded in the same query.
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = users_with_profiles().get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,112 @@
+"""
+Content-addressed storage for uploads.
+
+Each distinct file content is stored once, as a ``StoredObject`` keyed by
+its SHA-256. Uploading the same bytes again only adds a reference, and the
+storage object is removed when the last ``UploadedFile`` pointing at it is
+deleted, however it is deleted (the API, a cascade from its user, the
+admin): ``api.signals`` releases every deleted row. Reference counts are
+changed with conditional UPDATEs, so concurrent uploads and deletes of the
+same content stay consistent.
+"""
+import hashlib
+import logging
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import StoredObject, UploadedFile
+from .storage import get_storage
+from .stream_cache import stream_cache
+from .utils import upload_to_storage
+
+HASH_READ_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def content_digest(file):
+    """
+    SHA-256 of an uploaded file, as computed by ``api.upload_handlers``
+    while it was received, or by reading it when another handler was used.
+    """
+    digest = getattr(file, "sha256", None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in file.chunks(HASH_READ_SIZE):
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+async def _add_reference(digest):
+    if await StoredObject.objects.filter(sha256=digest).aupdate(ref_count=F("ref_count") + 1):
+        return await StoredObject.objects.aget(sha256=digest)
+    return None
+
+
+async def astore_upload(file):
+    """
+    Return ``(stored_object, created)`` for ``file``, uploading it only if
+    no object with the same content exists yet. The caller owns one new
+    reference either way.
+    """
+    digest = await sync_to_async(content_digest, thread_sensitive=False)(file)
+    blob = await _add_reference(digest)
+    if blob:
+        return blob, False
+
+    path = await upload_to_storage(file, file.name)
+    try:
+        return await StoredObject.objects.acreate(sha256=digest, path=path, size=file.size, ref_count=1), True
+    except IntegrityError:
+        # An identical upload finished first: use its object, drop ours
+        blob = await _add_reference(digest)
+        if blob is None:
+            raise
+        await get_storage().aremove([path])
+        return blob, False
+
+
+def release_blob(blob_id):
+    """
+    Drop one reference to a stored object. Returns its storage path when
+    that was the last reference (the row is gone and the caller should
+    remove the object from storage), otherwise None.
+    """
+    with transaction.atomic():
+        StoredObject.objects.filter(id=blob_id).update(ref_count=F("ref_count") - 1)
+        path = StoredObject.objects.filter(id=blob_id, ref_count=0).values_list("path", flat=True).first()
+        if path:
+            StoredObject.objects.filter(id=blob_id).delete()
+    return path
+
+
+def release_upload(uploaded_file):
+    """
+    Drop the reference held by a deleted ``UploadedFile``. Returns the
+    storage path to remove when nothing references it any more, otherwise
+    None.
+    """
+    if uploaded_file.blob_id is not None:
+        path = release_blob(uploaded_file.blob_id)
+    else:
+        # Registered without a blob (before deduplication, or through
+        # /save-file-meta); the path may still be a stored object's
+        path = uploaded_file.cdn_url
+        if path and StoredObject.objects.filter(path=path).exists():
+            return None
+    if not path or UploadedFile.objects.filter(cdn_url=path).exists():
+        return None
+    return path
+
+
+def remove_from_storage(path):
+    try:
+        get_storage().remove([path])
+    except Exception:
+        # The row is already gone; an orphaned object only costs space
+        logger.exception("Storage removal failed for %s", path)
+    stream_cache.evict(path)
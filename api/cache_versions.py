@@ -0,0 +1,32 @@
+"""
+Version counters for namespaced cache keys.
+
+A cached entry embeds (or stores alongside it) the current version of its
+namespace; bumping the version orphans every entry written under the old
+one at once, and those simply age out. Used for the per-user namespaces in
+``api.user_cache`` and the /uploaded-files pages in ``api.file_listing``.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _seed():
+    # Seeding from the clock means a counter that was evicted never comes
+    # back with a value older entries were written under.
+    return time.time_ns() // 1000
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _seed(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _seed(), timeout=None)
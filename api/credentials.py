@@ -0,0 +1,55 @@
+"""
+Fast path for repeated logins.
+
+PBKDF2 is deliberately slow, which hurts during exam-time login spikes. After
+a successful ``authenticate`` we remember that this exact (email, stored
+password hash, password) triple was verified, under an HMAC so neither the
+password nor a cheap hash of it ever reaches the cache. Any password change
+alters the stored hash and therefore the key, so old entries can never match
+again; a wrong password simply misses and falls through to ``authenticate``.
+"""
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.core.cache import cache
+
+from .backends import PROFILE_BACKEND, ProfileModelBackend
+from .profiles import users_with_profiles
+
+VERIFIED_CREDENTIALS_TIMEOUT = 60 * 10  # 10 minutes
+
+User = get_user_model()
+
+
+def _credentials_key(email, password_hash, password):
+    message = b"\0".join((email.encode(), password_hash.encode(), password.encode()))
+    digest = hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+    return f"verified_login:{digest}"
+
+
+def verify_credentials(request, email, password):
+    """
+    Return the user for valid credentials, or None. Behaves like
+    ``authenticate`` but skips the password hasher for credentials verified
+    within the last ``VERIFIED_CREDENTIALS_TIMEOUT`` seconds.
+    """
+    try:
+        user = users_with_profiles().get(email=email)
+    except User.DoesNotExist:
+        user = None
+
+    if user is not None and user.password:
+        if (
+            cache.get(_credentials_key(email, user.password, password))
+            and ProfileModelBackend().user_can_authenticate(user)
+        ):
+            user.backend = PROFILE_BACKEND
+            return user
+
+    user = authenticate(request, email=email, password=password)
+    if user is not None:
+        # Keyed on the hash *after* authenticate, which may have upgraded it
+        cache.set(_credentials_key(email, user.password, password), True, timeout=VERIFIED_CREDENTIALS_TIMEOUT)
+    return user
@@ -57,3 +57,19 @@ student_only = require_role("student")
 faculty_only = require_role("faculty")
 staff_only = require_role("staff")
 
+
+
+# ✅ Session auth for async views: resolves request.user without touching the
+# ORM from the event loop (ninja's django_auth reads request.user synchronously)
+from ninja.security import SessionAuth
+
+class AsyncSessionAuth(SessionAuth):
+    is_async = True
+
+    async def authenticate(self, request, key):
+        user = await request.auser()
+        if user.is_authenticated:
+            return user
+        return None
+
+async_django_auth = AsyncSessionAuth()
@@ -0,0 +1,32 @@
+"""
+Cached pages of /uploaded-files.
+
+Every cached page is namespaced by a single listing version. ``api.signals``
+bumps it whenever an ``UploadedFile`` is saved or deleted, so an upload or a
+delete orphans all cached pages at once (for every user, not just the one
+who made the change) and the next request reads fresh rows.
+"""
+import hashlib
+import json
+
+from . import cache_versions
+
+FILE_LIST_TIMEOUT = 60 * 60
+_VERSION_KEY = "uploaded_files_version"
+
+
+def get_version():
+    return cache_versions.get_version(_VERSION_KEY)
+
+
+def bump_version():
+    cache_versions.bump_version(_VERSION_KEY)
+
+
+def page_key(scope, **params):
+    """
+    Cache key for one page, e.g. ``uploaded_files:v1718000000000001:all:<digest>``.
+    ``scope`` is ``all`` for roles that see every file, otherwise the user id.
+    """
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:32]
+    return f"uploaded_files:v{get_version()}:{scope}:{digest}"
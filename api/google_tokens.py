@@ -0,0 +1,187 @@
+"""
+Offline verification of Google ID tokens.
+
+``id_token.verify_oauth2_token`` downloads Google's signing certificates on
+every call. Here the certificates are kept in a process-local cache for as
+long as Google's ``Cache-Control: max-age`` allows, parsed into verifiers
+once, and each token's RS256 signature and claims are checked locally.
+
+The key set is fetched at most once per ``MIN_REFRESH_INTERVAL``, however
+many tokens name an unknown key id. When a fetch fails the keys already
+held keep being used; with none held, verification raises
+``CertsUnavailable``.
+"""
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+DEFAULT_CERTS_MAX_AGE = 60 * 60
+MIN_REFRESH_INTERVAL = 60
+CLOCK_SKEW_SECONDS = 10
+VERIFIED_TOKEN_TIMEOUT = 60 * 5
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class CertsUnavailable(Exception):
+    """
+    Google's signing certificates could not be fetched, so no token can be
+    verified. Not a ``ValueError``: the token itself may be fine.
+    """
+
+
+def certs_max_age(headers):
+    """
+    Seconds the certificate response may be cached for, from its
+    Cache-Control and Age headers.
+    """
+    match = _MAX_AGE_RE.search(headers.get("Cache-Control", ""))
+    if not match:
+        return DEFAULT_CERTS_MAX_AGE
+    try:
+        age = int(headers.get("Age", 0))
+    except ValueError:
+        age = 0
+    return max(0, int(match.group(1)) - age)
+
+
+class GoogleCertCache:
+    """
+    Thread-safe, process-local cache of Google's signing keys, keyed by
+    ``kid``. Only one thread refreshes at a time; the others wait for it.
+    """
+
+    def __init__(self):
+        self._verifiers = {}
+        self._expires_at = 0.0
+        self._attempted_at = float("-inf")
+        self._lock = threading.Lock()
+        self._session = None
+        self.fetch_count = 0
+
+    @property
+    def url(self):
+        return getattr(settings, "GOOGLE_CERTS_URL", GOOGLE_CERTS_URL)
+
+    def _refresh(self):
+        # Loaded on the first refresh rather than at import, to keep them out
+        # of worker start-up
+        import requests
+        from google.auth import crypt
+
+        self._attempted_at = time.monotonic()
+        if self._session is None:
+            self._session = requests.Session()
+        try:
+            response = self._session.get(self.url, timeout=5)
+            response.raise_for_status()
+            verifiers = {
+                kid: crypt.RSAVerifier.from_string(cert)
+                for kid, cert in response.json().items()
+            }
+        except (requests.RequestException, ValueError, AttributeError):
+            # Unreachable, an error status, or not a {kid: pem} document;
+            # keep whatever keys we have
+            return
+        self._verifiers = verifiers
+        self._expires_at = time.monotonic() + certs_max_age(response.headers)
+        self.fetch_count += 1
+
+    def get(self, kid, force_refresh=False):
+        """
+        Return the verifier for ``kid`` (``None`` if Google has no such key),
+        refreshing the key set when it has expired or ``force_refresh`` is
+        set, e.g. after a key rotation.
+
+        Raises:
+            CertsUnavailable: If no key set could be fetched.
+        """
+        now = time.monotonic()
+        due = force_refresh or now >= self._expires_at
+        if due and now - self._attempted_at >= MIN_REFRESH_INTERVAL:
+            attempted_at = self._attempted_at
+            with self._lock:
+                # Another thread may have refreshed while we waited
+                if self._attempted_at == attempted_at:
+                    self._refresh()
+        if not self._verifiers:
+            raise CertsUnavailable("Google signing certificates are unavailable")
+        return self._verifiers.get(kid)
+
+
+cert_cache = GoogleCertCache()
+
+
+def _b64decode(segment):
+    return base64.urlsafe_b64decode(segment + b"=" * (-len(segment) % 4))
+
+
+def verify_google_token(token):
+    """
+    Verify a Google ID token locally and return its claims.
+
+    Raises:
+        ValueError: If the token is malformed, badly signed, expired or was
+        not issued by Google for this client.
+        CertsUnavailable: If Google's certificates could not be fetched.
+    """
+    try:
+        header_segment, payload_segment, signature_segment = token.encode().split(b".")
+        header = json.loads(_b64decode(header_segment))
+        claims = json.loads(_b64decode(payload_segment))
+        signature = _b64decode(signature_segment)
+    except Exception:
+        raise ValueError("Malformed token")
+
+    if header.get("alg") != "RS256":
+        raise ValueError("Unsupported signing algorithm")
+
+    kid = header.get("kid")
+    verifier = cert_cache.get(kid)
+    if verifier is None:
+        # Google may have rotated its keys before our copy expired
+        verifier = cert_cache.get(kid, force_refresh=True)
+    if verifier is None:
+        raise ValueError(f"Certificate for key id {kid} not found")
+
+    if not verifier.verify(header_segment + b"." + payload_segment, signature):
+        raise ValueError("Invalid token signature")
+
+    now = time.time()
+    if claims.get("iat", 0) > now + CLOCK_SKEW_SECONDS:
+        raise ValueError("Token used too early")
+    if claims.get("exp", 0) < now - CLOCK_SKEW_SECONDS:
+        raise ValueError("Token expired")
+    if claims.get("iss") not in GOOGLE_ISSUERS:
+        raise ValueError("Wrong issuer")
+
+    audience = getattr(settings, "GOOGLE_CLIENT_ID", None)
+    if audience and claims.get("aud") != audience:
+        raise ValueError("Token has wrong audience")
+
+    return claims
+
+
+def verify_google_token_cached(token):
+    """
+    ``verify_google_token`` with the claims cached under a digest of the
+    token (never beyond the token's own expiry).
+    """
+    cache_key = f"google_token:{hashlib.sha256(token.encode()).hexdigest()}"
+    idinfo = cache.get(cache_key)
+    if idinfo:
+        return idinfo
+
+    idinfo = verify_google_token(token)
+    timeout = min(VERIFIED_TOKEN_TIMEOUT, int(idinfo["exp"] - time.time()))
+    if timeout > 0:
+        cache.set(cache_key, idinfo, timeout=timeout)
+    return idinfo
@@ -0,0 +1,53 @@
+"""
+Shared HTTP clients for outbound calls (Supabase storage, streamed files).
+
+httpx connection pools are bound to the event loop that created them. Under
+ASGI there is one loop per worker, so every request reuses the same pooled
+client; under WSGI each async view runs in its own short-lived loop and gets
+its own client. Sync code (WSGI views) uses ``http_client()`` instead, one
+thread-safe pooled client per process, rather than a throwaway loop and
+client per call.
+"""
+import asyncio
+import threading
+import weakref
+
+HTTP_TIMEOUT = 10.0
+HTTP_CONNECT_TIMEOUT = 5.0
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE = 20
+
+_clients = weakref.WeakKeyDictionary()
+_sync_client = None
+_sync_client_lock = threading.Lock()
+
+
+def _client_options():
+    import httpx
+
+    return {
+        "timeout": httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        "limits": httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE),
+    }
+
+
+def async_http_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        # httpx is imported with the first client, not at worker start-up
+        import httpx
+
+        client = _clients[loop] = httpx.AsyncClient(**_client_options())
+    return client
+
+
+def http_client():
+    global _sync_client
+    if _sync_client is None:
+        with _sync_client_lock:
+            if _sync_client is None:
+                import httpx
+
+                _sync_client = httpx.Client(**_client_options())
+    return _sync_client
@@ -0,0 +1,126 @@
+"""
+DB-backed queue for spreadsheet user imports.
+
+``/admin/import-users`` only stores the upload as an ``ImportJob`` row; the
+``run_import_worker`` management command claims queued jobs and runs them
+through the bulk import engine, recording progress as it goes.
+
+The running worker bumps ``heartbeat_at`` after every chunk. A ``running``
+job without a heartbeat for ``STALE_AFTER`` belongs to a worker that died
+or was restarted; the next claim puts it back in the queue, or fails it
+once it has been claimed ``MAX_ATTEMPTS`` times. Rows the lost run already
+imported are then reported as existing users.
+"""
+import io
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ImportJob
+
+STALE_AFTER = timedelta(minutes=30)
+MAX_ATTEMPTS = 3
+
+
+def enqueue_import(user, file):
+    """
+    Store the uploaded spreadsheet and queue it for a worker.
+    """
+    return ImportJob.objects.create(
+        created_by=user if user.is_authenticated else None,
+        filename=file.name or "",
+        payload=file.read(),
+    )
+
+
+def reclaim_stale_jobs():
+    """
+    Requeue (or fail, after ``MAX_ATTEMPTS``) jobs whose worker stopped
+    without finishing them. Returns the number of jobs requeued.
+    """
+    # Long imports stay alive as long as they keep reporting progress
+    stale = ImportJob.objects.filter(status="running", heartbeat_at__lt=timezone.now() - STALE_AFTER)
+    stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status="failed",
+        error=f"Import worker stopped {MAX_ATTEMPTS} times before finishing this job",
+        finished_at=timezone.now(),
+        payload=b"",
+    )
+    return stale.update(status="queued", rows_processed=0, rows_failed=0)
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to ``running`` and return it.
+
+    The conditional UPDATE makes this safe with several workers (threads or
+    processes) on any database backend, without relying on row locks.
+    """
+    reclaim_stale_jobs()
+    while True:
+        job_id = (
+            ImportJob.objects.filter(status="queued")
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(id=job_id, status="queued").update(
+            status="running", started_at=now, heartbeat_at=now, attempts=F("attempts") + 1
+        )
+        if claimed:
+            return ImportJob.objects.get(id=job_id)
+
+
+def _this_run(job):
+    # A run that outlived STALE_AFTER may have been reclaimed; it must not
+    # overwrite the progress of the run that replaced it
+    return ImportJob.objects.filter(id=job.id, status="running", started_at=job.started_at)
+
+
+def _finish(job, **fields):
+    _this_run(job).update(finished_at=timezone.now(), payload=b"", **fields)
+
+
+def run_job(job):
+    """
+    Parse and import one claimed job. Never raises; failures are recorded
+    on the job row.
+    """
+    # pandas (via the import engine) is only loaded by processes that run
+    # imports, keeping it out of web worker start-up.
+    import pandas as pd
+
+    from .user_import import REQUIRED_COLUMNS, import_users_frame
+
+    try:
+        df = pd.read_excel(io.BytesIO(bytes(job.payload)), engine="openpyxl")
+        df.columns = df.columns.str.strip().str.lower()
+
+        missing = REQUIRED_COLUMNS - set(df.columns)
+        if missing:
+            _finish(job, status="failed", error=f"Missing required columns: {', '.join(missing)}")
+            return
+
+        _this_run(job).update(rows_total=len(df), heartbeat_at=timezone.now())
+
+        def on_progress(processed, failed_count):
+            _this_run(job).update(
+                rows_processed=processed, rows_failed=failed_count, heartbeat_at=timezone.now()
+            )
+
+        success, failed = import_users_frame(df, on_progress=on_progress)
+        _finish(
+            job,
+            status="done",
+            success_count=success,
+            rows_processed=F("rows_total"),
+            rows_failed=len(failed),
+            failed=failed,
+        )
+    except Exception as e:
+        _finish(job, status="failed", error=str(e))
@@ -0,0 +1,236 @@
+"""
+Per-request query count, DB time and cache round trips.
+
+``RequestStatsMiddleware`` opens a ``RequestStats`` for every request in a
+context variable. Database connections get an execute wrapper when they are
+created (see ``ApiConfig.ready``) and the instrumented cache backends count
+their calls, both against whichever ``RequestStats`` is current. Context
+variables follow the request into ``sync_to_async`` threads, so async views
+are counted like sync ones.
+
+Totals are kept per route (``"GET api/users"``) in ``route_stats`` and the
+same measurements feed the Prometheus metrics in ``api.metrics``. With
+``settings.SERVER_TIMING`` (on under DEBUG) each response also carries a
+``Server-Timing`` header with its own numbers.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.urls import Resolver404, resolve
+
+from . import metrics
+
+_current = contextvars.ContextVar("request_stats", default=None)
+# Set while a cache backend method runs, so calls it makes to itself
+# (BaseCache.get_or_set -> get + add) are only counted once, at the outside
+_in_cache_call = contextvars.ContextVar("in_cache_call", default=False)
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "cache_calls")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_calls = 0
+
+
+@contextmanager
+def collect():
+    """
+    Count queries and cache calls made inside the block, e.g. around a
+    management command or a benchmark step.
+    """
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # connection_created fires again on every reconnect of the same wrapper.
+    # Inserted first so execute_wrapper() blocks, which pop the last
+    # wrapper on exit, leave it alone.
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+# Each of these is one round trip to Redis
+COUNTED_CACHE_METHODS = (
+    "add", "get", "set", "touch", "delete", "get_many", "has_key",
+    "incr", "set_many", "delete_many", "get_or_set", "clear",
+)
+
+
+def _observe_get(args, kwargs, result):
+    default = args[1] if len(args) > 1 else kwargs.get("default")
+    metrics.cache_lookup(args[0], result is not default)
+
+
+def _observe_get_many(args, kwargs, result):
+    for key in args[0]:
+        metrics.cache_lookup(key, key in result)
+
+
+CACHE_LOOKUP_OBSERVERS = {"get": _observe_get, "get_many": _observe_get_many}
+
+
+def _counted(name):
+    observe = CACHE_LOOKUP_OBSERVERS.get(name)
+
+    def method(self, *args, **kwargs):
+        call = getattr(super(CacheCallCounter, self), name)
+        if _in_cache_call.get():
+            return call(*args, **kwargs)
+        stats = _current.get()
+        if stats is not None:
+            stats.cache_calls += 1
+        token = _in_cache_call.set(True)
+        try:
+            result = call(*args, **kwargs)
+        finally:
+            _in_cache_call.reset(token)
+        if observe is not None:
+            observe(args, kwargs, result)
+        return result
+
+    method.__name__ = name
+    return method
+
+
+class CacheCallCounter:
+    """
+    Mixin for a cache backend that counts its calls in the current
+    ``RequestStats`` and reports hits and misses to ``api.metrics``. The
+    async methods of Django's backends run the sync ones in a thread, so
+    they are counted too.
+    """
+
+
+for _name in COUNTED_CACHE_METHODS:
+    setattr(CacheCallCounter, _name, _counted(_name))
+
+
+class InstrumentedRedisCache(CacheCallCounter, RedisCache):
+    pass
+
+
+class InstrumentedLocMemCache(CacheCallCounter, LocMemCache):
+    pass
+
+
+class RouteStats:
+    """
+    Process-local totals per route, safe to update from several threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, stats, duration):
+        with self._lock:
+            totals = self._routes.get(route)
+            if totals is None:
+                totals = self._routes[route] = {
+                    "requests": 0, "queries": 0, "max_queries": 0, "db_seconds": 0.0,
+                    "cache_calls": 0, "seconds": 0.0, "max_seconds": 0.0,
+                }
+            totals["requests"] += 1
+            totals["queries"] += stats.queries
+            totals["max_queries"] = max(totals["max_queries"], stats.queries)
+            totals["db_seconds"] += stats.db_time
+            totals["cache_calls"] += stats.cache_calls
+            totals["seconds"] += duration
+            totals["max_seconds"] = max(totals["max_seconds"], duration)
+
+    def snapshot(self):
+        with self._lock:
+            return {route: dict(totals) for route, totals in self._routes.items()}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+route_stats = RouteStats()
+
+
+def _route(request):
+    """
+    The URL pattern the request resolves to, e.g.
+    ``instruments/items/<item_id>``, or None. Resolved up front (rather
+    than read from ``request.resolver_match`` afterwards) so in-flight
+    requests can be labelled too.
+    """
+    try:
+        return resolve(request.path_info).route
+    except Resolver404:
+        return None
+
+
+class RequestStatsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        route = self._start(request)
+        with collect() as stats:
+            started = time.perf_counter()
+            response = self.get_response(request)
+            duration = time.perf_counter() - started
+        return self._finish(request, route, response, stats, duration)
+
+    async def __acall__(self, request):
+        route = self._start(request)
+        with collect() as stats:
+            started = time.perf_counter()
+            response = await self.get_response(request)
+            duration = time.perf_counter() - started
+        return self._finish(request, route, response, stats, duration)
+
+    def _start(self, request):
+        route = _route(request)
+        metrics.request_started(request.method, route or metrics.UNMATCHED_ROUTE)
+        return route
+
+    def _finish(self, request, route, response, stats, duration):
+        if route is not None:
+            route_stats.record(f"{request.method} {route}", stats, duration)
+        metrics.request_finished(request.method, route or metrics.UNMATCHED_ROUTE, response.status_code, duration, stats)
+        if not settings.SERVER_TIMING:
+            return response
+        # Streamed bodies are produced after this point and aren't included
+        response["Server-Timing"] = (
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+            f'cache;desc="{stats.cache_calls} calls", '
+            f"total;dur={duration * 1000:.1f}"
+        )
+        return response
@@ -0,0 +1,45 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from api.import_jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued spreadsheet user imports (DB-backed queue)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2, help="Jobs processed in parallel.")
+        parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit instead of polling forever.")
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        self.stdout.write(f"Import worker started with {workers} worker(s)")
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(self.work_loop, options["poll_interval"], options["once"])
+                for _ in range(workers)
+            ]
+            for future in futures:
+                future.result()
+
+    def work_loop(self, poll_interval, once):
+        try:
+            while True:
+                close_old_connections()
+                job = claim_next_job()
+                if job is None:
+                    if once:
+                        return
+                    time.sleep(poll_interval)
+                    continue
+
+                self.stdout.write(f"Running import job #{job.id} ({job.filename})")
+                run_job(job)
+                self.stdout.write(f"Finished import job #{job.id}")
+        finally:
+            connection.close()
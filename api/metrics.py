@@ -0,0 +1,159 @@
+"""
+Prometheus metrics, served in text exposition format on /metrics.
+
+prometheus_client runs in multiprocess mode: every worker process writes its
+samples to files under ``PROMETHEUS_MULTIPROC_DIR`` (set in settings) and the
+worker answering /metrics merges all of them, so the numbers cover every
+gunicorn worker. gunicorn.conf.py clears the directory at start-up and marks
+exited workers dead so their in-flight gauges drop out.
+
+Requests are labelled by their URL pattern (``api/users/<user_id>/update``),
+which keeps label values bounded. Fed by:
+
+* ``api.instrumentation.RequestStatsMiddleware`` - latency, status counts,
+  in-flight requests, DB queries and DB time per route;
+* the instrumented cache backends - hits and misses per cache key name (the
+  part of the key before the first ``:``, e.g. ``signed_url``);
+* ``timed`` on the storage backends - latency of every storage call.
+"""
+import functools
+import hmac
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Seconds; spans cache hits (a few ms) to large streamed uploads
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+UNMATCHED_ROUTE = "unmatched"
+SESSION_KEY_PREFIX = "django.contrib.sessions.cache"
+# The stream cache numbers take a directory scan and a cache round trip,
+# so each worker reuses them for this many seconds across scrapes
+STREAM_CACHE_STATS_TTL = 60
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to build the response, by route.",
+    ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter("http_requests", "Responses by route and status code.", ["method", "route", "status"])
+IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests being handled, by route.",
+    ["method", "route"], multiprocess_mode="livesum",
+)
+DB_QUERIES = Counter("http_request_db_queries", "Database queries made by requests, by route.", ["method", "route"])
+DB_SECONDS = Counter("http_request_db_seconds", "Time spent in database queries, by route.", ["method", "route"])
+CACHE_LOOKUPS = Counter("cache_lookups", "Cache reads by key name and result (hit or miss).", ["name", "result"])
+STORAGE_SECONDS = Histogram(
+    "storage_call_duration_seconds", "Latency of storage backend calls.",
+    ["backend", "operation", "outcome"], buckets=LATENCY_BUCKETS,
+)
+
+
+def request_started(method, route):
+    IN_PROGRESS.labels(method, route).inc()
+
+
+def request_finished(method, route, status, duration, stats):
+    IN_PROGRESS.labels(method, route).dec()
+    REQUEST_SECONDS.labels(method, route).observe(duration)
+    REQUESTS.labels(method, route, str(status)).inc()
+    if stats.queries:
+        DB_QUERIES.labels(method, route).inc(stats.queries)
+        DB_SECONDS.labels(method, route).inc(stats.db_time)
+
+
+def key_name(key):
+    if key.startswith(SESSION_KEY_PREFIX):
+        return "session"
+    name, sep, _ = key.partition(":")
+    return name if sep else "other"
+
+
+def cache_lookup(key, hit):
+    CACHE_LOOKUPS.labels(key_name(key), "hit" if hit else "miss").inc()
+
+
+def timed(operation):
+    """
+    Record the latency of a storage method, sync or async. For ``aopen``
+    this is the time to the response headers, not the whole body.
+    """
+    def decorator(method):
+        def observe(self, started, outcome):
+            STORAGE_SECONDS.labels(type(self).__name__, operation, outcome).observe(time.perf_counter() - started)
+
+        if not iscoroutinefunction(method):
+            @functools.wraps(method)
+            def wrapper(self, *args, **kwargs):
+                started = time.perf_counter()
+                outcome = "error"
+                try:
+                    result = method(self, *args, **kwargs)
+                    outcome = "ok"
+                    return result
+                finally:
+                    observe(self, started, outcome)
+            return wrapper
+
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await method(self, *args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                observe(self, started, outcome)
+        return async_wrapper
+    return decorator
+
+
+class StreamCacheCollector:
+    """
+    The /secure-stream disk cache keeps its counters in the shared Django
+    cache, so they are already totals for all workers.
+    """
+
+    _stats = None
+    _stats_at = None
+
+    @classmethod
+    def stats(cls):
+        from .stream_cache import stream_cache
+
+        now = time.monotonic()
+        if cls._stats is None or now - cls._stats_at >= STREAM_CACHE_STATS_TTL:
+            cls._stats, cls._stats_at = stream_cache.stats(), now
+        return cls._stats
+
+    def collect(self):
+        stats = self.stats()
+        for name in ("hits", "misses", "fills", "evictions"):
+            yield CounterMetricFamily(f"stream_cache_{name}", f"/secure-stream disk cache {name}.", value=stats[name])
+        yield GaugeMetricFamily("stream_cache_bytes", "Bytes held by this host's stream cache.", value=stats["bytes"])
+        yield GaugeMetricFamily("stream_cache_entries", "Files held by this host's stream cache.", value=stats["entries"])
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponse("Forbidden", status=403)
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse("Unauthorized", status=401)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(StreamCacheCollector())
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-17 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_storedobject'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='uploadedfile',
+            index=models.Index(fields=['-uploaded_at', '-id'], name='file_uploaded_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedfile',
+            index=models.Index(fields=['year', '-uploaded_at', '-id'], name='file_year_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedfile',
+            index=models.Index(fields=['user', '-uploaded_at', '-id'], name='file_user_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedfile',
+            index=models.Index(fields=['filename'], name='file_filename_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.contrib.auth.password_validation import validate_password
@@ -23,6 +26,13 @@ class CustomUser(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']  # Needed for createsuperuser
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Backs keyset pagination of /users on (username, id)
+            models.Index(Coalesce('username', Value('')), F('id'), name='user_sort_name_id_idx'),
+            models.Index(fields=['role', 'is_active'], name='user_role_active_idx'),
+        ]
+
     def set_password(self, raw_password):
         # Validate password strength before saving
         validate_password(raw_password, user=self)
@@ -36,7 +46,7 @@ class CustomUser(AbstractUser):
 class StudentProfile(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='student_profile')
     roll_number = models.CharField(max_length=20, unique=True)
-    department = models.CharField(max_length=100)
+    department = models.CharField(max_length=100, db_index=True)
 
     def __str__(self):
         return f"{self.user.email} - {self.roll_number}"
@@ -45,7 +55,7 @@ class StudentProfile(models.Model):
 # Faculty-specific profile
 class FacultyProfile(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='faculty_profile')
-    department = models.CharField(max_length=100)
+    department = models.CharField(max_length=100, db_index=True)
 
     def __str__(self):
         return f"{self.user.email} - {self.department}"
@@ -54,13 +64,25 @@ class FacultyProfile(models.Model):
 # Staff-specific profile
 class StaffProfile(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='staff_profile')
-    department = models.CharField(max_length=100)
+    department = models.CharField(max_length=100, db_index=True)
 
     def __str__(self):
         return f"{self.user.email} - {self.department}"
 
 
 # File Upload Model
+# One stored storage object per distinct file content (see api/blobs.py)
+class StoredObject(models.Model):
+    sha256 = models.CharField(max_length=64, unique=True)
+    path = models.CharField(max_length=500, unique=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.path} ({self.ref_count} refs)"
+
+
 class UploadedFile(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='uploaded_files')
     file = models.FileField(upload_to='uploads/')
@@ -69,7 +91,59 @@ class UploadedFile(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     cdn_url = models.CharField(max_length=500, blank=True, null=True)  # Changed from URLField
     year = models.CharField(max_length=10, blank=True, null=True)  # <-- Added year field
+    # Null for files uploaded before deduplication or registered via /save-file-meta
+    blob = models.ForeignKey(StoredObject, on_delete=models.SET_NULL, null=True, blank=True, related_name='files')
+
+    class Meta:
+        indexes = [
+            # Back keyset pagination of /uploaded-files on (uploaded_at, id),
+            # unfiltered and per filter
+            models.Index(fields=['-uploaded_at', '-id'], name='file_uploaded_id_idx'),
+            models.Index(fields=['year', '-uploaded_at', '-id'], name='file_year_uploaded_idx'),
+            models.Index(fields=['user', '-uploaded_at', '-id'], name='file_user_uploaded_idx'),
+            # Prefix (LIKE 'abc%') search on Postgres
+            models.Index(fields=['filename'], name='file_filename_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
+    def __str__(self):
+        return f"{self.filename} uploaded by {self.user.email}"
+
+# Background spreadsheet import (see api/import_jobs.py)
+class ImportJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='import_jobs')
+    filename = models.CharField(max_length=255)
+    payload = models.BinaryField()  # Uploaded spreadsheet, cleared once processed
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    rows_total = models.PositiveIntegerField(default=0)
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    success_count = models.PositiveIntegerField(default=0)
+    failed = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    attempts = models.PositiveSmallIntegerField(default=0)  # Claims so far, including reclaims of stalled runs
+    heartbeat_at = models.DateTimeField(blank=True, null=True)  # Last sign of life from the running worker
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='importjob_status_created_idx'),
+        ]
+
+    @property
+    def rows_per_second(self):
+        if not self.started_at or not self.rows_processed:
+            return 0.0
+        elapsed = ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+        return round(self.rows_processed / elapsed, 2) if elapsed > 0 else 0.0
 
     def __str__(self):
-        return f"{self.filename} uploaded by {self.user.email}"
\ No newline at end of file
+        return f"Import #{self.pk} ({self.filename}) - {self.status}"
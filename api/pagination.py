@@ -0,0 +1,92 @@
+"""
+Keyset (cursor) pagination shared by the list endpoints.
+
+A cursor is an opaque, URL-safe encoding of the ordering values of the last
+row on the previous page, so every page is a single indexed range scan
+instead of an ``OFFSET`` that grows with the page number.
+"""
+import base64
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from ninja.errors import HttpError
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder drops microseconds past the millisecond, which would
+    # skip or repeat rows when paging on a timestamp
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, cls=_CursorEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, expected_length):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HttpError(400, "Invalid cursor")
+    if not isinstance(values, list) or len(values) != expected_length:
+        raise HttpError(400, "Invalid cursor")
+    return values
+
+
+def _after(ordering, values):
+    """
+    Build ``(a, b, c) > (va, vb, vc)`` for a mixed-direction ordering as
+    ``a > va OR (a = va AND b > vb) OR (a = va AND b = vb AND c > vc)``.
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= equal & Q(**{f"{name}__{lookup}": value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def _value(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def clamp_limit(limit):
+    return max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+
+
+def paginate_keyset(queryset, ordering, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return ``(rows, next_cursor)`` for one page of ``queryset``.
+
+    ``ordering`` must end in a unique column (normally ``id``) so the order
+    is total; prefix a field with ``-`` for descending order.
+    """
+    limit = clamp_limit(limit)
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, len(ordering))
+        # A well-formed cursor can still hold values of the wrong type, which
+        # only fail when the lookups are built or the query runs
+        try:
+            rows = list(queryset.filter(_after(ordering, values))[:limit + 1])
+        except (ValueError, TypeError, OverflowError, ValidationError):
+            raise HttpError(400, "Invalid cursor")
+    else:
+        rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([_value(rows[-1], field.lstrip("-")) for field in ordering])
+    return rows, next_cursor
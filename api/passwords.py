@@ -0,0 +1,78 @@
+"""
+Batched password validation and hashing for bulk user creation.
+
+``CustomUser.set_password`` validates and hashes one password at a time on a
+single core. ``hash_passwords`` does the same work for many users across a
+process pool and hands back ready-made hashes for ``bulk_create``.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+
+# Below this many passwords the pool start-up and pickling cost more than
+# they save, so the batch is hashed in-process.
+MIN_PARALLEL_BATCH = 16
+
+# Attributes UserAttributeSimilarityValidator compares the password against.
+USER_ATTRIBUTES = ("username", "email", "first_name", "last_name")
+
+WORKERS = os.cpu_count() or 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def user_attributes(user):
+    return {name: getattr(user, name, None) or "" for name in USER_ATTRIBUTES}
+
+
+def _init_worker(settings_module):
+    import django
+    from django.apps import apps
+
+    # The parent's settings, so a pool started by tests or benchmarks never
+    # loads the production ones
+    os.environ["DJANGO_SETTINGS_MODULE"] = settings_module
+    if not apps.ready:
+        django.setup()
+
+
+def _validate_and_hash(entry):
+    """
+    Return ``(hash, None)`` or ``(None, error)`` for one ``(password, attrs)``
+    entry. Runs inside a pool worker, so it only touches picklable values.
+    """
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.password_validation import validate_password
+
+    password, attrs = entry
+    try:
+        validate_password(password, user=get_user_model()(**attrs))
+    except Exception as e:
+        return None, str(e)
+    return make_password(password), None
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=WORKERS, initializer=_init_worker, initargs=(os.environ["DJANGO_SETTINGS_MODULE"],)
+            )
+        return _pool
+
+
+def hash_passwords(entries, parallel=True):
+    """
+    Validate and hash ``entries`` (an iterable of ``(password, attrs)``
+    pairs) and return a list of ``(hash, error)`` tuples in the same order.
+    """
+    entries = list(entries)
+    if not parallel or len(entries) < MIN_PARALLEL_BATCH or WORKERS < 2:
+        return [_validate_and_hash(entry) for entry in entries]
+
+    chunksize = max(1, len(entries) // (WORKERS * 4))
+    return list(get_pool().map(_validate_and_hash, entries, chunksize=chunksize))
@@ -0,0 +1,78 @@
+"""
+Single-query user + role profile resolution.
+
+The three profile tables hang off ``CustomUser`` as reverse one-to-ones, so
+``select_related`` can LEFT JOIN all of them in the user query instead of a
+second role-dependent lookup.
+"""
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist
+
+PROFILE_RELATIONS = {
+    "student": "student_profile",
+    "faculty": "faculty_profile",
+    "staff": "staff_profile",
+}
+
+
+def users_with_profiles(queryset=None):
+    if queryset is None:
+        queryset = get_user_model().objects.all()
+    return queryset.select_related(*PROFILE_RELATIONS.values())
+
+
+def get_role_profile(user):
+    """
+    Return the profile matching ``user.role`` or None. No query is made when
+    the user was loaded through ``users_with_profiles``.
+    """
+    relation = PROFILE_RELATIONS.get(user.role)
+    if relation is None:
+        return None
+    try:
+        return getattr(user, relation)
+    except ObjectDoesNotExist:
+        return None
+
+
+def auth_check_data(user):
+    user_data = {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "role": user.role,
+    }
+    if user.role == "student":
+        profile = get_role_profile(user)
+        user_data["roll_number"] = profile.roll_number if profile else None
+    return user_data
+
+
+def full_detail_data(user):
+    user_data = {
+        "id": str(user.id),
+        "username": user.username or "",
+        "email": user.email or "",
+        "role": user.role or "",
+        "first_name": user.first_name or "",
+        "last_name": user.last_name or "",
+        "profile_picture": getattr(user, "profile_picture", "") or "",
+        "date_joined": str(user.date_joined),
+        "last_login": str(user.last_login),
+        "is_active": user.is_active,
+        "is_superuser": user.is_superuser,
+        "is_staff": user.is_staff,
+    }
+
+    # Role-specific info
+    profile = get_role_profile(user)
+    if user.role == "student":
+        user_data.update({
+            "roll_number": getattr(profile, "roll_number", "") or "",
+            "department": getattr(profile, "department", "") or "",
+            "year": getattr(profile, "year", "") or "",
+        })
+    elif user.role in ("faculty", "staff"):
+        user_data["department"] = getattr(profile, "department", "") or ""
+
+    return user_data
@@ -18,10 +18,16 @@ class UploadedFileOutSchema(BaseModel):
     uploaded_at: datetime.datetime
     cdn_url: Optional[str]
     year: Optional[str]
+    signed_url: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+# ✅ One keyset page of /uploaded-files
+class UploadedFilePageSchema(BaseModel):
+    items: List[UploadedFileOutSchema]
+    next_cursor: Optional[str] = None
+
 
 # ✅ Input schema for file upload (if you want to accept extra fields)
 class UploadedFileInSchema(Schema):
@@ -31,11 +37,20 @@ class UploadedFileInSchema(Schema):
     year: Optional[str] = None
 
 
+class SignedUrlsInSchema(Schema):
+    paths: List[str]
+
+
+class SignedUrlsOutSchema(Schema):
+    urls: Dict[str, str]
+    missing: List[str]
+
+
 # ...existing code...
 # ✅ Output schema — never includes sensitive data
 class UserOutSchema(BaseModel):
     id: int
-    username: str
+    username: Optional[str] = None
     email: str
     role: str
     date_joined: datetime.datetime
@@ -43,6 +58,12 @@ class UserOutSchema(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+# ✅ One keyset page of /users
+class UserPageSchema(BaseModel):
+    items: List[UserOutSchema]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
 # ✅ Input schema for user signup
 class UserSignupSchema(Schema):
     username: str
@@ -64,8 +85,9 @@ class AdminCreateUserSchema(Schema):
     department: Optional[str] = None   # Required for student, faculty, staff
 
 class UserUpdateSchema(Schema):
-    username: Optional[str]
-    department: Optional[str]
+    username: Optional[str] = None
+    email: Optional[EmailStr] = None
+    department: Optional[str] = None
     roll_number: Optional[str] = None
 
 from ninja import Schema
@@ -87,3 +109,22 @@ class ExcelImportResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ImportJobOutSchema(BaseModel):
+    id: int
+    status: str
+    filename: str
+    rows_total: int
+    rows_processed: int
+    rows_failed: int
+    success_count: int
+    rows_per_second: float
+    created_at: datetime.datetime
+    started_at: Optional[datetime.datetime]
+    finished_at: Optional[datetime.datetime]
+    error: Optional[str]
+    failed: List[FailedRow]
+
+    class Config:
+        from_attributes = True
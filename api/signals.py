@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .blobs import release_upload, remove_from_storage
+from .file_listing import bump_version
+from .models import CustomUser, StudentProfile, FacultyProfile, StaffProfile, UploadedFile
+from .user_cache import bump_generation
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_user_cache(sender, instance, update_fields=None, **kwargs):
+    # Every login saves last_login alone (django.contrib.auth's
+    # update_last_login); cached entries overlay it instead of being dropped
+    if update_fields == {"last_login"}:
+        return
+    bump_generation(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=StudentProfile)
+@receiver([post_save, post_delete], sender=FacultyProfile)
+@receiver([post_save, post_delete], sender=StaffProfile)
+def invalidate_profile_user_cache(sender, instance, **kwargs):
+    bump_generation(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UploadedFile)
+def invalidate_file_listing_cache(sender, instance, **kwargs):
+    bump_version()
+
+
+@receiver(post_delete, sender=UploadedFile)
+def release_uploaded_file(sender, instance, **kwargs):
+    path = release_upload(instance)
+    if path:
+        # Only once the delete is committed; a rollback keeps the row
+        transaction.on_commit(lambda: remove_from_storage(path))
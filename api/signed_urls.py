@@ -0,0 +1,68 @@
+"""
+Shared cache of signed storage URLs.
+
+Every endpoint that hands out a signed URL goes through here, so a URL
+signed for a file listing is reused by ``/get-signed-url`` until it gets too
+close to expiry. Misses are signed together in one bulk storage call.
+"""
+import time
+
+from django.core.cache import cache
+
+from .storage import get_storage
+
+SIGNED_URL_EXPIRES_IN = 60 * 60
+# Callers handing URLs to a browser need them to stay valid for a while
+DEFAULT_MIN_TTL = 60 * 10
+MAX_SIGNED_URL_BATCH = 500
+
+
+def _key(path):
+    return f"signed_url:{path}"
+
+
+def _split(paths, cached, now, min_ttl):
+    urls = {}
+    missing = []
+    for path in paths:
+        entry = cached.get(_key(path))
+        if entry and entry[1] - now >= min_ttl:
+            urls[path] = entry[0]
+        else:
+            missing.append(path)
+    return urls, missing
+
+
+def _entries(signed, now):
+    expires_at = now + SIGNED_URL_EXPIRES_IN
+    return {_key(path): (url, expires_at) for path, url in signed.items()}
+
+
+async def aget_signed_urls(paths, min_ttl=DEFAULT_MIN_TTL):
+    """
+    Return ``{path: url}`` for ``paths``, each valid for at least
+    ``min_ttl`` more seconds. Paths storage refused to sign are left out.
+    """
+    paths = list(dict.fromkeys(paths))
+    now = time.time()
+    urls, missing = _split(paths, await cache.aget_many([_key(path) for path in paths]), now, min_ttl)
+    if missing:
+        signed = await get_storage().asign(missing, expires_in=SIGNED_URL_EXPIRES_IN)
+        await cache.aset_many(_entries(signed, now), timeout=SIGNED_URL_EXPIRES_IN)
+        urls.update(signed)
+    return urls
+
+
+def get_signed_urls(paths, min_ttl=DEFAULT_MIN_TTL):
+    """
+    ``aget_signed_urls`` for sync views, signing through the backend's sync
+    client rather than an event loop per call.
+    """
+    paths = list(dict.fromkeys(paths))
+    now = time.time()
+    urls, missing = _split(paths, cache.get_many([_key(path) for path in paths]), now, min_ttl)
+    if missing:
+        signed = get_storage().sign(missing, expires_in=SIGNED_URL_EXPIRES_IN)
+        cache.set_many(_entries(signed, now), timeout=SIGNED_URL_EXPIRES_IN)
+        urls.update(signed)
+    return urls
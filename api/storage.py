@@ -0,0 +1,493 @@
+"""
+Storage backends for uploaded files.
+
+Every file endpoint (upload, signing, delete, stream) goes through
+``get_storage()``, whose class is chosen by the ``STORAGE_BACKEND`` setting:
+
+* ``SupabaseStorage`` talks to the Supabase storage REST API directly,
+  sharing the pooled client from ``api.http_clients`` so I/O-bound views
+  never block the event loop.
+* ``LocalStorage`` keeps objects under ``MEDIA_ROOT`` and signs URLs for the
+  ``/local-storage`` endpoint, so the file paths can be developed,
+  benchmarked and load-tested without the network.
+
+Uploads are streamed from the (disk-spooled) file in small fixed-size reads,
+and on Supabase anything larger than one TUS chunk goes through the
+resumable endpoint, so the memory an upload needs doesn't grow with the file.
+"""
+import abc
+import base64
+import mimetypes
+import os
+import tempfile
+import time
+from typing import NamedTuple
+from urllib.parse import quote, urljoin
+
+from asgiref.sync import sync_to_async
+from decouple import config
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from django.utils.module_loading import import_string
+
+from .http_clients import async_http_client, http_client
+from .metrics import timed
+from .stream_cache import ammap_chunks, conditional_range, mmap_chunks
+
+DEFAULT_STORAGE_BACKEND = "api.storage.SupabaseStorage"
+
+# Read size when streaming a file in a single request
+UPLOAD_READ_SIZE = 256 * 1024
+# Read size when streaming an object out
+STREAM_READ_SIZE = getattr(settings, "SECURE_STREAM_CHUNK_SIZE", 64 * 1024)
+# Supabase requires every resumable chunk except the last to be exactly 6 MB
+RESUMABLE_CHUNK_SIZE = 6 * 1024 * 1024
+RESUMABLE_RETRIES = 3
+TUS_VERSION = "1.0.0"
+
+LOCAL_URL_SALT = "api.storage.local"
+
+
+class StorageError(Exception):
+    pass
+
+
+class ObjectStat(NamedTuple):
+    size: int
+    etag: str
+    content_type: str
+
+
+async def _read(file, size):
+    return await sync_to_async(file.read, thread_sensitive=False)(size)
+
+
+async def _iter_file(file, length=None):
+    """
+    Yield the next ``length`` bytes of ``file`` (all of it when None) in
+    ``UPLOAD_READ_SIZE`` pieces. Using an iterator rather than one bytes
+    body also keeps httpx from holding on to the payload after the request.
+    """
+    remaining = length
+    while remaining is None or remaining > 0:
+        size = UPLOAD_READ_SIZE if remaining is None else min(UPLOAD_READ_SIZE, remaining)
+        chunk = await _read(file, size)
+        if not chunk:
+            break
+        if remaining is not None:
+            remaining -= len(chunk)
+        yield chunk
+
+
+class Storage(abc.ABC):
+    """
+    Interface of a storage backend. All methods are coroutines except
+    ``sign`` and ``remove``, the forms sync (WSGI) views call without
+    running an event loop.
+
+    ``aopen`` returns ``(status, headers, chunks)`` for a GET or HEAD with
+    the given conditional/range request headers; ``chunks`` is None for HEAD
+    and bodiless statuses, otherwise a sync iterator, or an async one when
+    ``async_chunks`` is set (Django buffers async iterators under WSGI).
+    """
+
+    # Whether /secure-stream should keep local copies of relayed objects
+    cache_streams = True
+
+    @abc.abstractmethod
+    async def aput(self, path, file, size, content_type=None):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def asign(self, paths, expires_in=3600):
+        """
+        Return ``{path: url}``; paths that can't be signed are left out.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def sign(self, paths, expires_in=3600):
+        """
+        ``asign`` for sync callers (WSGI views), without an event loop.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def aremove(self, paths):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def remove(self, paths):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def astat(self, path):
+        """
+        Return an ``ObjectStat``, or None if there is no such object.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def aopen(self, path, headers=None, method="GET", async_chunks=True):
+        raise NotImplementedError
+
+
+async def _iter_response(response):
+    try:
+        async for chunk in response.aiter_bytes(STREAM_READ_SIZE):
+            yield chunk
+    finally:
+        await response.aclose()
+
+
+def _tus_metadata(**values):
+    return ",".join(f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in values.items())
+
+
+class SupabaseStorage(Storage):
+    def __init__(self, url=None, key=None, bucket=None):
+        self.key = key or config("SUPABASE_KEY")  # Use service role key if bypassing RLS
+        self.bucket = bucket or config("SUPABASE_BUCKET")
+        self.url = f"{(url or config('SUPABASE_URL')).rstrip('/')}/storage/v1"
+
+        # Used for streams served over WSGI, where Django would buffer an
+        # async iterator whole; a sync iterator keeps them incremental there.
+        # The backend is built on first use, so requests stays out of start-up.
+        import requests
+
+        self.session = requests.Session()
+        self.session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+    def _headers(self, extra=None):
+        headers = {"Authorization": f"Bearer {self.key}", "apikey": self.key}
+        headers.update(extra or {})
+        return headers
+
+    def _object_url(self, path, kind=""):
+        return f"{self.url}/object/{kind}{self.bucket}/{quote(path, safe='/')}"
+
+    @timed("put")
+    async def aput(self, path, file, size, content_type=None):
+        """
+        Upload ``file`` to ``path`` without overwriting, and return the path.
+        """
+        if size > RESUMABLE_CHUNK_SIZE:
+            return await self._aput_resumable(path, file, size, content_type)
+
+        await sync_to_async(file.seek, thread_sensitive=False)(0)
+        response = await async_http_client().post(
+            self._object_url(path),
+            content=_iter_file(file),
+            headers=self._headers({
+                "Content-Type": content_type or "application/octet-stream",
+                "Content-Length": str(size),
+                "x-upsert": "false",
+            }),
+        )
+        if response.status_code not in (200, 201):
+            raise StorageError(f"Upload failed ({response.status_code})")
+        return path
+
+    async def _resumable_offset(self, upload_url):
+        response = await async_http_client().head(upload_url, headers=self._headers({"Tus-Resumable": TUS_VERSION}))
+        if response.status_code != 200:
+            raise StorageError(f"Resumable upload lost ({response.status_code})")
+        return int(response.headers["Upload-Offset"])
+
+    async def _aput_resumable(self, path, file, size, content_type=None):
+        """
+        Upload with the TUS resumable protocol, one ``RESUMABLE_CHUNK_SIZE``
+        chunk per request, each streamed from the file. A failed chunk is
+        retried from the offset storage reports, up to ``RESUMABLE_RETRIES``
+        times in a row.
+        """
+        client = async_http_client()
+        response = await client.post(
+            f"{self.url}/upload/resumable",
+            headers=self._headers({
+                "Tus-Resumable": TUS_VERSION,
+                "Upload-Length": str(size),
+                "Upload-Metadata": _tus_metadata(
+                    bucketName=self.bucket,
+                    objectName=path,
+                    contentType=content_type or "application/octet-stream",
+                    cacheControl="3600",
+                ),
+                "x-upsert": "false",
+            }),
+        )
+        if response.status_code != 201:
+            raise StorageError(f"Resumable upload could not be created ({response.status_code})")
+        upload_url = urljoin(f"{self.url}/upload/resumable/", response.headers["Location"])
+
+        import httpx
+
+        offset = 0
+        failures = 0
+        while offset < size:
+            try:
+                await sync_to_async(file.seek, thread_sensitive=False)(offset)
+                length = min(RESUMABLE_CHUNK_SIZE, size - offset)
+                response = await client.patch(
+                    upload_url,
+                    content=_iter_file(file, length),
+                    headers=self._headers({
+                        "Tus-Resumable": TUS_VERSION,
+                        "Upload-Offset": str(offset),
+                        "Content-Length": str(length),
+                        "Content-Type": "application/offset+octet-stream",
+                    }),
+                )
+                if response.status_code != 204:
+                    raise StorageError(f"Chunk at offset {offset} rejected ({response.status_code})")
+                offset = int(response.headers["Upload-Offset"])
+                failures = 0
+            except (httpx.TransportError, StorageError):
+                failures += 1
+                if failures > RESUMABLE_RETRIES:
+                    raise
+                offset = await self._resumable_offset(upload_url)
+        return path
+
+    def _sign_request(self, paths, expires_in):
+        return {
+            "url": f"{self.url}/object/sign/{self.bucket}",
+            "json": {"expiresIn": expires_in, "paths": list(paths)},
+            "headers": self._headers(),
+        }
+
+    def _signed_urls(self, response):
+        if response.status_code != 200:
+            raise StorageError(f"Bulk signed URL generation failed ({response.status_code})")
+
+        return {
+            item["path"]: f"{self.url}/{item['signedURL'].lstrip('/')}"
+            for item in response.json()
+            if item.get("signedURL") and not item.get("error")
+        }
+
+    @timed("sign")
+    async def asign(self, paths, expires_in=3600):
+        """
+        Sign many paths in a single request.
+        """
+        if not paths:
+            return {}
+        response = await async_http_client().post(**self._sign_request(paths, expires_in))
+        return self._signed_urls(response)
+
+    @timed("sign")
+    def sign(self, paths, expires_in=3600):
+        if not paths:
+            return {}
+        return self._signed_urls(http_client().post(**self._sign_request(paths, expires_in)))
+
+    def _remove_request(self, paths):
+        return {
+            "method": "DELETE",
+            "url": f"{self.url}/object/{self.bucket}",
+            "json": {"prefixes": list(paths)},
+            "headers": self._headers(),
+        }
+
+    def _check_removed(self, response):
+        if response.status_code != 200:
+            raise StorageError(f"Delete failed ({response.status_code})")
+
+    @timed("remove")
+    async def aremove(self, paths):
+        """
+        Delete ``paths`` from the bucket in one request.
+        """
+        if not paths:
+            return
+        self._check_removed(await async_http_client().request(**self._remove_request(paths)))
+
+    @timed("remove")
+    def remove(self, paths):
+        if not paths:
+            return
+        self._check_removed(http_client().request(**self._remove_request(paths)))
+
+    @timed("stat")
+    async def astat(self, path):
+        response = await async_http_client().head(self._object_url(path, "authenticated/"), headers=self._headers())
+        if response.status_code in (400, 404):
+            return None
+        if response.status_code != 200:
+            raise StorageError(f"Stat failed for {path} ({response.status_code})")
+        return ObjectStat(
+            size=int(response.headers.get("Content-Length", 0)),
+            etag=response.headers.get("ETag", ""),
+            content_type=response.headers.get("Content-Type", "application/octet-stream"),
+        )
+
+    @timed("open")
+    async def aopen(self, path, headers=None, method="GET", async_chunks=True):
+        url = self._object_url(path, "authenticated/")
+        headers = self._headers(headers)
+
+        if async_chunks:
+            client = async_http_client()
+            response = await client.send(client.build_request(method, url, headers=headers), stream=True)
+            if method == "HEAD" or response.status_code not in (200, 206):
+                await response.aclose()
+                return response.status_code, response.headers, None
+            return response.status_code, response.headers, _iter_response(response)
+
+        response = await sync_to_async(self.session.request, thread_sensitive=False)(
+            method, url, headers=headers, stream=True, timeout=10
+        )
+        if method == "HEAD" or response.status_code not in (200, 206):
+            response.close()
+            return response.status_code, response.headers, None
+        return response.status_code, response.headers, response.iter_content(chunk_size=STREAM_READ_SIZE)
+
+
+class LocalStorage(Storage):
+    # Objects already live on local disk
+    cache_streams = False
+
+    def __init__(self, root=None, base_url=None):
+        self.root = str(root or getattr(settings, "LOCAL_STORAGE_ROOT", os.path.join(settings.MEDIA_ROOT, "storage")))
+        self.base_url = base_url or getattr(settings, "LOCAL_STORAGE_URL", "/api/local-storage/")
+
+    def _full_path(self, path):
+        # None for paths escaping the root (e.g. "../x"), which are treated
+        # as objects that don't exist
+        try:
+            return safe_join(self.root, path)
+        except SuspiciousFileOperation:
+            return None
+
+    def _put(self, path, file):
+        full_path = self._full_path(path)
+        if full_path is None:
+            raise StorageError(f"Upload failed: invalid path {path}")
+        if os.path.exists(full_path):
+            raise StorageError(f"Upload failed: {path} already exists")
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+        # Written next to the target and renamed, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                file.seek(0)
+                while chunk := file.read(UPLOAD_READ_SIZE):
+                    out.write(chunk)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return path
+
+    @timed("put")
+    async def aput(self, path, file, size, content_type=None):
+        return await sync_to_async(self._put, thread_sensitive=False)(path, file)
+
+    def _sign(self, paths, expires_in):
+        expires_at = int(time.time()) + expires_in
+        return {
+            path: f"{self.base_url}{quote(path)}?token="
+            + signing.dumps([path, expires_at], salt=LOCAL_URL_SALT)
+            for path in paths
+            if (full_path := self._full_path(path)) and os.path.isfile(full_path)
+        }
+
+    @timed("sign")
+    async def asign(self, paths, expires_in=3600):
+        return await sync_to_async(self._sign, thread_sensitive=False)(paths, expires_in)
+
+    @timed("sign")
+    def sign(self, paths, expires_in=3600):
+        return self._sign(paths, expires_in)
+
+    def _remove(self, paths):
+        for path in paths:
+            full_path = self._full_path(path)
+            if full_path is None:
+                continue
+            try:
+                os.unlink(full_path)
+            except FileNotFoundError:
+                pass
+
+    @timed("remove")
+    async def aremove(self, paths):
+        await sync_to_async(self._remove, thread_sensitive=False)(paths)
+
+    @timed("remove")
+    def remove(self, paths):
+        self._remove(paths)
+
+    def _stat(self, path):
+        full_path = self._full_path(path)
+        if full_path is None:
+            return None
+        try:
+            stat = os.stat(full_path)
+        except FileNotFoundError:
+            return None
+        return ObjectStat(
+            size=stat.st_size,
+            etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+            content_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+        )
+
+    @timed("stat")
+    async def astat(self, path):
+        return await sync_to_async(self._stat, thread_sensitive=False)(path)
+
+    @timed("open")
+    async def aopen(self, path, headers=None, method="GET", async_chunks=True):
+        stat = await self.astat(path)
+        if stat is None:
+            return 404, {}, None
+
+        status, response_headers, start, length = conditional_range(headers or {}, stat.etag, stat.size)
+        response_headers["Content-Type"] = stat.content_type
+        if status in (304, 416):
+            return status, response_headers, None
+        response_headers["Content-Length"] = str(length)
+        if method == "HEAD":
+            return status, response_headers, None
+
+        try:
+            file = await sync_to_async(open, thread_sensitive=False)(self._full_path(path), "rb")
+        except FileNotFoundError:
+            return 404, {}, None
+        chunks = ammap_chunks if async_chunks else mmap_chunks
+        return status, response_headers, chunks(file, start, length, STREAM_READ_SIZE)
+
+
+def verify_local_url(path, token):
+    """
+    Whether ``token`` is a current ``LocalStorage`` signature for ``path``.
+    """
+    try:
+        signed_path, expires_at = signing.loads(token, salt=LOCAL_URL_SALT)
+    except (signing.BadSignature, ValueError, TypeError):
+        return False
+    return signed_path == path and expires_at >= time.time()
+
+
+_storage = None
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        _storage = import_string(getattr(settings, "STORAGE_BACKEND", DEFAULT_STORAGE_BACKEND))()
+    return _storage
+
+
+def set_storage(storage):
+    """
+    Replace the configured backend, e.g. with one pointed at a local
+    stand-in in benchmarks and load tests.
+    """
+    global _storage
+    _storage = storage
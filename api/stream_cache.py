@@ -0,0 +1,422 @@
+"""
+Bounded on-disk LRU cache for files relayed by ``/secure-stream``.
+
+The first full ``GET`` of an object is written to a ``.part`` file while it
+streams to the client and promoted to ``<path key>-<etag key>.bin`` once all
+of ``Content-Length`` has arrived. Later requests for the same path are served
+from that file without signing a URL or touching storage: whole files go out
+as a ``FileResponse`` (``sendfile`` under WSGI servers that provide
+``wsgi.file_wrapper``), ranges and ASGI responses as slices of a memory map.
+
+Several workers share the directory. Creating the ``.part`` file with
+``O_EXCL`` means only one of them fills a given object; promotion, index
+writes and eviction run under an ``flock`` on ``.lock``. Entries are ordered
+by file mtime, which is bumped on every hit, and the least recently used are
+removed once the directory grows past ``STREAM_CACHE_MAX_BYTES``.
+"""
+import hashlib
+import json
+import mmap
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines; a single runserver process needs no lock
+    fcntl = None
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "secure_stream_cache")
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# No single object may take more than this share of the cache
+MAX_ENTRY_FRACTION = 4
+# A .part file this old belongs to a worker that died mid-fill
+STALE_PART_SECONDS = 60 * 60
+# Hits within this window don't rewrite the mtime again
+TOUCH_INTERVAL = 60
+
+COUNTERS = ("hits", "misses", "fills", "evictions")
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _digest(value, length=32):
+    return hashlib.sha256(value.encode()).hexdigest()[:length]
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    strip = lambda tag: tag.strip().removeprefix("W/")
+    return strip(etag) in {strip(tag) for tag in header.split(",")}
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, length)`` for a single ``bytes=`` range, or None when the
+    header should be ignored and the whole file sent (multiple ranges or an
+    unknown unit).
+
+    Raises:
+        ValueError: If the range cannot be satisfied for ``size`` bytes.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        length = min(int(last), size)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return size - length, length
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Unsatisfiable range")
+    return start, end - start + 1
+
+
+def conditional_range(headers, etag, size):
+    """
+    Resolve ``If-None-Match``, ``Range`` and ``If-Range`` request headers
+    against an object, like storage does. Returns ``(status, response
+    headers, start, length)``; a 304 or 416 has no body.
+    """
+    response_headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+    if etag_matches(headers.get("If-None-Match"), etag):
+        return 304, response_headers, 0, 0
+
+    if "Range" in headers and etag_matches(headers.get("If-Range", etag), etag):
+        try:
+            byte_range = parse_range(headers["Range"], size)
+        except ValueError:
+            response_headers["Content-Range"] = f"bytes */{size}"
+            return 416, response_headers, 0, 0
+        if byte_range:
+            start, length = byte_range
+            response_headers["Content-Range"] = f"bytes {start}-{start + length - 1}/{size}"
+            return 206, response_headers, start, length
+
+    return 200, response_headers, 0, size
+
+
+def mmap_chunks(file, start, length, chunk_size):
+    """
+    Yield ``length`` bytes of the open ``file`` from ``start``, closing it
+    when done. The file is opened by the caller, so an entry evicted since
+    the lookup is noticed before any response is started.
+    """
+    with file:
+        if length == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = start + length
+            for offset in range(start, end, chunk_size):
+                yield mm[offset:min(offset + chunk_size, end)]
+
+
+async def ammap_chunks(file, start, length, chunk_size):
+    # Slicing the map faults pages in from disk when they aren't cached, so
+    # every read runs in a worker thread rather than on the event loop
+    chunks = mmap_chunks(file, start, length, chunk_size)
+    read = sync_to_async(next, thread_sensitive=False)
+    try:
+        while (chunk := await read(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=False)()
+
+
+class _Fill:
+    """
+    One in-progress copy of an upstream body into the cache.
+    """
+
+    def __init__(self, store, path, etag, size, content_type, part_path, fd):
+        self.store = store
+        self.path = path
+        self.etag = etag
+        self.size = size
+        self.content_type = content_type
+        self.part_path = part_path
+        self.file = os.fdopen(fd, "wb")
+        self.written = 0
+        self.failed = False
+
+    def write(self, chunk):
+        if self.failed:
+            return
+        try:
+            self.file.write(chunk)
+            self.written += len(chunk)
+        except OSError:
+            # A full disk must not break the response being relayed
+            self.failed = True
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.unlink(self.part_path)
+        except FileNotFoundError:
+            pass
+
+    def commit(self):
+        if self.failed or self.written != self.size:
+            self.abort()
+            return
+        self.file.close()
+        self.store._promote(self)
+
+
+class StreamCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    # -- counters ---------------------------------------------------------
+
+    def _count(self, name):
+        # Kept in the shared cache so the numbers cover every worker
+        key = f"stream_cache:{name}"
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, 1, timeout=None):
+                cache.incr(key)
+
+    def stats(self):
+        counts = cache.get_many([f"stream_cache:{name}" for name in COUNTERS])
+        entries = self._entries()
+        return {
+            **{name: counts.get(f"stream_cache:{name}", 0) for name in COUNTERS},
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    # -- layout -----------------------------------------------------------
+
+    def _key(self, path):
+        return _digest(path)
+
+    def _index_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _data_name(self, key, etag):
+        return f"{key}-{_digest(etag, 16)}.bin"
+
+    @contextmanager
+    def _lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_index(self, key):
+        try:
+            with open(self._index_path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _remove(self, name):
+        try:
+            os.unlink(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+    def _entries(self):
+        """
+        ``(name, size, mtime)`` for every cached body, oldest first. Stale
+        ``.part`` files are cleaned up along the way.
+        """
+        entries = []
+        now = time.time()
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            if name.endswith(".bin"):
+                entries.append((name, stat.st_size, stat.st_mtime))
+            elif name.endswith(".part") and now - stat.st_mtime > STALE_PART_SECONDS:
+                self._remove(name)
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    # -- reads ------------------------------------------------------------
+
+    def lookup(self, path):
+        """
+        Return the index entry for ``path`` with its ``file`` resolved, or
+        None on a miss. Counts the hit or miss and refreshes LRU order.
+        """
+        if not self.enabled:
+            return None
+        entry = self._read_index(self._key(path))
+        if entry:
+            file_path = os.path.join(self.directory, entry["file"])
+            try:
+                mtime = os.stat(file_path).st_mtime
+                if time.time() - mtime > TOUCH_INTERVAL:
+                    os.utime(file_path)
+            except FileNotFoundError:
+                entry = None
+            else:
+                entry["file"] = file_path
+        self._count("hits" if entry else "misses")
+        return entry
+
+    # -- writes -----------------------------------------------------------
+
+    def _start_fill(self, path, etag, size, content_type):
+        if not self.enabled or not etag or size is None or size > self.max_bytes // MAX_ENTRY_FRACTION:
+            return None
+        key = self._key(path)
+        part_path = os.path.join(self.directory, self._data_name(key, etag)[:-4] + ".part")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd = os.open(part_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except OSError:
+            # Another worker is already filling this object (or the disk is unusable)
+            return None
+        return _Fill(self, path, etag, size, content_type, part_path, fd)
+
+    def _promote(self, fill):
+        key = self._key(fill.path)
+        data_name = self._data_name(key, fill.etag)
+        index = {"file": data_name, "etag": fill.etag, "size": fill.size, "content_type": fill.content_type}
+
+        with self._lock():
+            previous = self._read_index(key)
+            os.replace(fill.part_path, os.path.join(self.directory, data_name))
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self._index_path(key))
+            if previous and previous["file"] != data_name:
+                self._remove(previous["file"])
+            self._evict_over_budget()
+        self._count("fills")
+
+    def _evict_over_budget(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for name, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            key = name.split("-", 1)[0]
+            index = self._read_index(key)
+            if index and index["file"] == name:
+                self._remove(f"{key}.json")
+            self._remove(name)
+            total -= size
+            self._count("evictions")
+
+    def tee(self, path, etag, size, content_type, chunks):
+        """
+        Wrap the upstream ``chunks`` (sync or async) so the body is copied
+        into the cache as it is relayed. Returns ``chunks`` unchanged when the
+        object can't or needn't be cached.
+        """
+        fill = self._start_fill(path, etag, size, content_type)
+        if fill is None:
+            return chunks
+        if hasattr(chunks, "__aiter__"):
+            return self._atee(fill, chunks)
+        return self._tee(fill, chunks)
+
+    def _tee(self, fill, chunks):
+        try:
+            for chunk in chunks:
+                fill.write(chunk)
+                yield chunk
+        except BaseException:
+            fill.abort()
+            raise
+        fill.commit()
+
+    async def _atee(self, fill, chunks):
+        try:
+            async for chunk in chunks:
+                fill.write(chunk)
+                yield chunk
+        except BaseException:
+            fill.abort()
+            raise
+        await sync_to_async(fill.commit, thread_sensitive=False)()
+
+    def evict(self, path):
+        """
+        Drop ``path`` from the cache, e.g. after the object was deleted.
+        """
+        key = self._key(path)
+        with self._lock():
+            index = self._read_index(key)
+            self._remove(f"{key}.json")
+            if index:
+                self._remove(index["file"])
+
+    # -- responses --------------------------------------------------------
+
+    def response(self, request, entry, filename, chunk_size, asgi):
+        """
+        Answer ``request`` from the cached ``entry``, honouring HEAD,
+        If-None-Match and a single byte range like the upstream would.
+        Returns None when the entry was evicted after the lookup. Opens the
+        file, so async callers run it in a thread.
+        """
+        content_type = entry["content_type"]
+        status, headers, start, length = conditional_range(request.headers, entry["etag"], entry["size"])
+        headers["Content-Disposition"] = f'inline; filename="{filename}"'
+        if status == 304:
+            return HttpResponse(status=status, headers=headers)
+        if status == 416:
+            return HttpResponse(status=status, content_type=content_type, headers=headers)
+        headers["Content-Length"] = length
+
+        if request.method == "HEAD":
+            return HttpResponse(status=status, content_type=content_type, headers=headers)
+
+        try:
+            file = open(entry["file"], "rb")
+        except FileNotFoundError:
+            return None
+
+        if asgi:
+            chunks = ammap_chunks(file, start, length, chunk_size)
+        elif status == 200:
+            del headers["Content-Disposition"]
+            return FileResponse(file, content_type=content_type, filename=filename, headers=headers)
+        else:
+            chunks = mmap_chunks(file, start, length, chunk_size)
+        return StreamingHttpResponse(chunks, status=status, content_type=content_type, headers=headers)
+
+
+stream_cache = StreamCache(
+    getattr(settings, "STREAM_CACHE_DIR", DEFAULT_CACHE_DIR),
+    getattr(settings, "STREAM_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES),
+)
@@ -1,3 +1,917 @@
-from django.test import TestCase
+"""
+Run with the self-contained benchmark settings (SQLite, local-memory cache,
+local filesystem storage), never against the production database:
 
-# Create your tests here.
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python manage.py test
+"""
+import asyncio
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+from unittest import mock
+
+import pandas as pd
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from benchmarks.query_budgets import measure
+from benchmarks.servers import QuietHandler, cert_handler, object_handler, serve, sign_handler, upload_handler
+
+from . import credentials, google_tokens, passwords, storage
+from .metrics import StreamCacheCollector
+from .import_jobs import MAX_ATTEMPTS, STALE_AFTER, _finish, claim_next_job, run_job
+from .models import ImportJob, StoredObject, StudentProfile, UploadedFile
+from .pagination import MAX_PAGE_SIZE, encode_cursor
+from .user_cache import get_generation
+from .user_import import import_users_frame
+
+User = get_user_model()
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class UserImportTests(TestCase):
+    def frame(self, *rows):
+        return pd.DataFrame([
+            {"role": "faculty", "department": "CSE", "roll_number": "", **row} for row in rows
+        ])
+
+    def test_repeat_of_a_rejected_row_is_imported(self):
+        df = self.frame(
+            {"email": "dup@lnmiit.ac.in", "username": "dup", "password": "123"},  # too short
+            {"email": "dup@lnmiit.ac.in", "username": "dup", "password": "Quartz#Zebra91"},
+        )
+        success, failed = import_users_frame(df)
+        self.assertEqual(success, 1)
+        self.assertEqual([f["row"] for f in failed], [2])
+        self.assertTrue(User.objects.filter(email="dup@lnmiit.ac.in").exists())
+
+    def test_repeat_of_an_accepted_row_is_rejected(self):
+        df = self.frame(
+            {"email": "dup@lnmiit.ac.in", "username": "dup", "password": "Quartz#Zebra91"},
+            {"email": "dup@lnmiit.ac.in", "username": "dup2", "password": "Quartz#Zebra92"},
+            {"email": "s1@lnmiit.ac.in", "username": "s1", "password": "Quartz#Zebra93",
+             "role": "student", "roll_number": "22ucs001"},
+            {"email": "s2@lnmiit.ac.in", "username": "s2", "password": "Quartz#Zebra94",
+             "role": "student", "roll_number": "22ucs001"},
+        )
+        success, failed = import_users_frame(df)
+        self.assertEqual(success, 2)
+        self.assertEqual(failed, [
+            {"row": 3, "error": "Email already exists"},
+            {"row": 5, "error": "Roll number already exists"},
+        ])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class PasswordHashingTests(TestCase):
+    PASSWORDS = ("Quartz#Zebra91", "short", "12345678901", "password123", "asha.verma01", "Lunar^Maple47")
+
+    def entries(self, count):
+        attrs = {"username": "asha.verma01", "email": "asha.verma@lnmiit.ac.in", "first_name": "", "last_name": ""}
+        return [(self.PASSWORDS[i % len(self.PASSWORDS)], attrs) for i in range(count)]
+
+    def test_pool_matches_the_serial_path(self):
+        # A private two-worker pool, forked while the fast hashers are set
+        for name, value in (("WORKERS", 2), ("_pool", None)):
+            patcher = mock.patch.object(passwords, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: passwords._pool and passwords._pool.shutdown())
+
+        for count in (passwords.MIN_PARALLEL_BATCH - 1, passwords.MIN_PARALLEL_BATCH * 2):
+            with self.subTest(count=count):
+                entries = self.entries(count)
+                serial = passwords.hash_passwords(entries, parallel=False)
+                pooled = passwords.hash_passwords(entries)
+                self.assertEqual([error for _, error in pooled], [error for _, error in serial])
+                self.assertEqual({error is None for _, error in pooled}, {True, False})
+                for (password, _), (hashed, error) in zip(entries, pooled):
+                    if error is None:
+                        self.assertTrue(check_password(password, hashed))
+        self.assertIsNotNone(passwords._pool)
+
+    def test_workers_use_the_parent_settings(self):
+        with mock.patch.dict("os.environ", {"DJANGO_SETTINGS_MODULE": "backend1.settings"}):
+            passwords._init_worker("benchmarks.settings")
+            self.assertEqual(os.environ["DJANGO_SETTINGS_MODULE"], "benchmarks.settings")
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ImportJobReclaimTests(TestCase):
+    def stall(self, job, attempts=1):
+        long_ago = timezone.now() - STALE_AFTER * 2
+        ImportJob.objects.filter(id=job.id).update(
+            status="running", attempts=attempts, started_at=long_ago, heartbeat_at=long_ago
+        )
+
+    def test_stalled_job_is_claimed_again(self):
+        job = ImportJob.objects.create(filename="users.xlsx", payload=b"x")
+        self.stall(job)
+        claimed = claim_next_job()
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.attempts, 2)
+
+    def test_running_job_is_left_alone(self):
+        job = ImportJob.objects.create(filename="users.xlsx", payload=b"x")
+        self.assertEqual(claim_next_job().id, job.id)
+        self.assertIsNone(claim_next_job())
+
+    def test_long_job_with_a_fresh_heartbeat_is_left_alone(self):
+        job = ImportJob.objects.create(filename="users.xlsx", payload=b"x")
+        self.stall(job)
+        ImportJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now())
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("running", 1))
+
+    def test_progress_bumps_the_heartbeat(self):
+        frame = pd.DataFrame([{
+            "username": "s1", "email": "s1@lnmiit.ac.in", "password": "Quartz#Zebra91",
+            "role": "student", "roll_number": "22ucs101",
+        }])
+        payload = io.BytesIO()
+        frame.to_excel(payload, index=False)
+        ImportJob.objects.create(filename="users.xlsx", payload=payload.getvalue())
+        job = claim_next_job()
+        self.stall(job)
+        job.refresh_from_db()
+        run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        self.assertGreater(job.heartbeat_at, job.started_at + STALE_AFTER)
+
+    def test_job_stalling_too_often_fails(self):
+        job = ImportJob.objects.create(filename="users.xlsx", payload=b"x")
+        self.stall(job, attempts=MAX_ATTEMPTS)
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIsNotNone(job.finished_at)
+
+    def test_reclaimed_run_cannot_finish_the_job(self):
+        ImportJob.objects.create(filename="users.xlsx", payload=b"x")
+        lost = claim_next_job()
+        self.stall(lost)
+        current = claim_next_job()
+        _finish(lost, status="failed", error="lost run")
+        current.refresh_from_db()
+        self.assertEqual(current.status, "running")
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class KeysetCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email="admin@lnmiit.ac.in", username="admin", password="x", role="admin"
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_wrongly_typed_cursor_values_are_rejected(self):
+        cursors = {
+            "/api/users": [encode_cursor(["a", "not-an-id"]), encode_cursor(["a", [1]])],
+            "/api/uploaded-files": [encode_cursor(["yesterday", 1]), encode_cursor([None, {"id": 1}])],
+        }
+        for path, values in cursors.items():
+            for cursor in values:
+                with self.subTest(path=path, cursor=cursor):
+                    response = self.client.get(path, {"cursor": cursor})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json()["detail"], "Invalid cursor")
+
+    def test_valid_cursor_pages_on(self):
+        for i in range(3):
+            User.objects.create_user(email=f"u{i}@lnmiit.ac.in", username=f"u{i}", password="x")
+        first = self.client.get("/api/users", {"limit": 2}).json()
+        second = self.client.get("/api/users", {"limit": 2, "cursor": first["next_cursor"]}).json()
+        self.assertEqual(len(first["items"]) + len(second["items"]), 4)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class UserCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="f1@lnmiit.ac.in", username="f1", password="Quartz#Zebra91", role="faculty"
+        )
+
+    def log_in(self):
+        response = self.client.post(
+            "/api/login", {"email": "f1@lnmiit.ac.in", "password": "Quartz#Zebra91"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_keeps_cached_entries(self):
+        self.log_in()
+        generation = get_generation(self.user.id)
+        self.client.get("/api/auth/full-detail")
+        self.log_in()
+        self.assertEqual(get_generation(self.user.id), generation)
+
+        last_login = User.objects.get(id=self.user.id).last_login
+        detail = self.client.get("/api/auth/full-detail").json()["user"]
+        self.assertEqual(detail["last_login"], str(last_login))
+
+    def test_other_changes_invalidate(self):
+        generation = get_generation(self.user.id)
+        self.user.first_name = "Asha"
+        self.user.save(update_fields=["first_name", "last_login"])
+        self.assertNotEqual(get_generation(self.user.id), generation)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class UserDetailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(email="admin@lnmiit.ac.in", username="admin", password="x", role="admin")
+        cls.student = User.objects.create_user(
+            email="22ucs001@lnmiit.ac.in", username="22ucs001", password="x", role="student"
+        )
+        StudentProfile.objects.create(user=cls.student, roll_number="22ucs001", department="CSE")
+
+    def setUp(self):
+        # Ids repeat across test cases; start without their cached entries
+        cache.clear()
+
+    def test_malformed_ids_are_rejected(self):
+        self.client.force_login(self.admin)
+        for ids in ("1,two,3", "1;2", "1.5"):
+            with self.subTest(ids=ids):
+                self.assertEqual(self.client.get("/api/users/details", {"ids": ids}).status_code, 400)
+
+    def test_id_cap_is_enforced(self):
+        self.client.force_login(self.admin)
+        too_many = ",".join(str(i) for i in range(1, MAX_PAGE_SIZE + 2))
+        self.assertEqual(self.client.get("/api/users/details", {"ids": too_many}).status_code, 400)
+        at_cap = ",".join(str(i) for i in range(1, MAX_PAGE_SIZE + 1))
+        response = self.client.get("/api/users/details", {"ids": at_cap})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([user["roll_number"] for user in response.json() if user["role"] == "student"], ["22ucs001"])
+
+    def test_user_and_profile_load_in_one_query(self):
+        # Sessions live in the cache, so the one query is request.user
+        # joined with its profile; cached and uncached responses alike
+        self.client.force_login(self.student)
+        for path in ("/api/auth/check", "/api/auth/full-detail"):
+            for attempt in ("uncached", "cached"):
+                with self.subTest(path=path, attempt=attempt), self.assertNumQueries(1):
+                    response = self.client.get(path)
+                self.assertEqual(response.json()["user"]["roll_number"], "22ucs001")
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class CredentialCacheTests(TestCase):
+    PASSWORD = "Quartz#Zebra91"
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="f1@lnmiit.ac.in", username="f1", password=self.PASSWORD, role="faculty"
+        )
+        patcher = mock.patch.object(credentials, "authenticate", wraps=credentials.authenticate)
+        self.authenticate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def log_in(self, password):
+        return self.client.post(
+            "/api/login", {"email": self.user.email, "password": password}, content_type="application/json"
+        ).status_code
+
+    def test_repeat_login_skips_the_hasher(self):
+        self.assertEqual(self.log_in(self.PASSWORD), 200)
+        self.assertEqual(self.log_in(self.PASSWORD), 200)
+        self.assertEqual(self.authenticate.call_count, 1)
+
+    def test_wrong_password_after_a_cached_login_is_refused(self):
+        self.assertEqual(self.log_in(self.PASSWORD), 200)
+        self.assertEqual(self.log_in("Quartz#Zebra92"), 401)
+
+    def test_password_change_makes_the_old_entry_miss(self):
+        self.assertEqual(self.log_in(self.PASSWORD), 200)
+        self.user.refresh_from_db()
+        self.user.set_password("Lunar^Maple47")
+        self.user.save()
+        self.assertEqual(self.log_in(self.PASSWORD), 401)
+        self.assertEqual(self.authenticate.call_count, 2)
+        self.assertEqual(self.log_in("Lunar^Maple47"), 200)
+
+    def test_user_deactivated_after_caching_is_refused(self):
+        self.assertEqual(self.log_in(self.PASSWORD), 200)
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        self.assertEqual(self.log_in(self.PASSWORD), 401)
+
+    def test_cache_key_never_holds_the_password(self):
+        self.assertEqual(self.log_in(self.PASSWORD), 200)
+        keys = list(cache._cache)
+        self.assertTrue(any("verified_login:" in key for key in keys))
+        for key in keys:
+            self.assertNotIn(self.PASSWORD, key)
+        self.user.refresh_from_db()
+        key = credentials._credentials_key(self.user.email, self.user.password, self.PASSWORD)
+        self.assertNotIn(self.PASSWORD, key)
+
+
+def failing_handler(status=500):
+    class FailingHandler(QuietHandler):
+        hits = 0
+
+        def do_GET(self):
+            type(self).hits += 1
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    return FailingHandler
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, GOOGLE_CLIENT_ID="test-client")
+class GoogleTokenTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import rsa
+        from google.auth import crypt
+
+        public_key, private_key = rsa.newkeys(1024)
+        cls.signer = crypt.RSASigner.from_string(private_key.save_pkcs1().decode(), key_id="k1")
+        cls.certs = {"k1": public_key.save_pkcs1().decode()}
+
+    def setUp(self):
+        # A fresh process-local key cache for every test
+        self.cert_cache = google_tokens.GoogleCertCache()
+        patcher = mock.patch.object(google_tokens, "cert_cache", self.cert_cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def token(self, kid="k1", email="g1@lnmiit.ac.in"):
+        from google.auth import crypt, jwt
+
+        signer = self.signer if kid == "k1" else crypt.RSASigner(self.signer._key, key_id=kid)
+        now = int(time.time())
+        return jwt.encode(signer, {
+            "iss": "https://accounts.google.com", "aud": "test-client", "sub": email,
+            "email": email, "iat": now, "exp": now + 3600, "nonce": time.perf_counter_ns(),
+        }).decode()
+
+    def google_login(self, token):
+        return self.client.post("/api/auth/google-login", json.dumps({"token": token}), content_type="application/json")
+
+    def test_unknown_key_ids_refresh_at_most_once_a_minute(self):
+        handler = cert_handler(self.certs)
+        with serve(handler) as url, self.settings(GOOGLE_CERTS_URL=url):
+            self.assertEqual(google_tokens.verify_google_token(self.token())["email"], "g1@lnmiit.ac.in")
+            for _ in range(5):
+                with self.assertRaises(ValueError):
+                    google_tokens.verify_google_token(self.token(kid="rotated"))
+            self.assertEqual(handler.hits, 1)
+
+            self.cert_cache._attempted_at -= google_tokens.MIN_REFRESH_INTERVAL
+            with self.assertRaises(ValueError):
+                google_tokens.verify_google_token(self.token(kid="rotated"))
+            self.assertEqual(handler.hits, 2)
+
+    def test_unreachable_certs_answer_503(self):
+        for handler in (failing_handler(500), failing_handler(404)):
+            with self.subTest(status=handler), serve(handler) as url, self.settings(GOOGLE_CERTS_URL=url):
+                self.cert_cache._attempted_at = float("-inf")
+                response = self.google_login(self.token())
+                self.assertEqual(response.status_code, 503)
+                # Retried no sooner than the refresh interval
+                self.google_login(self.token())
+                self.assertEqual(handler.hits, 1)
+
+        with serve(cert_handler(self.certs)) as url:
+            pass  # Nothing listens on the port any more
+        with self.settings(GOOGLE_CERTS_URL=url):
+            self.cert_cache._attempted_at = float("-inf")
+            self.assertEqual(self.google_login(self.token()).status_code, 503)
+
+    def test_expired_keys_are_kept_when_the_refresh_fails(self):
+        User.objects.create_user(email="g1@lnmiit.ac.in", username="g1", password="Quartz#Zebra91")
+        with serve(cert_handler(self.certs, max_age=0)) as url, self.settings(GOOGLE_CERTS_URL=url):
+            self.assertEqual(self.google_login(self.token()).status_code, 200)
+
+        failing = failing_handler()
+        with serve(failing) as url, self.settings(GOOGLE_CERTS_URL=url):
+            self.cert_cache._attempted_at -= google_tokens.MIN_REFRESH_INTERVAL
+            self.assertEqual(self.google_login(self.token()).status_code, 200)
+            self.assertEqual(failing.hits, 1)
+
+
+async def _worst_loop_lag(stop, interval=0.01):
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - started - interval)
+    return worst
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AsyncViewTests(TestCase):
+    """
+    The async views must only await on slow I/O: with a storage stand-in
+    that takes ``LATENCY`` per request, a blocking call anywhere on the
+    request path would stall a concurrent ticker for at least that long.
+    """
+    LATENCY = 0.2
+    CONCURRENCY = 8
+    PATH = "1_notes.pdf"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # What the ASGI entry point loads before serving (httpx)
+        import backend1.asgi  # noqa: F401
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="a1@lnmiit.ac.in", username="a1", password="x", role="student")
+        UploadedFile.objects.create(user=self.user, filename="notes.pdf", size=1, cdn_url=self.PATH)
+        self.client.force_login(self.user)
+        self.addCleanup(storage.set_storage, None)
+
+    async def requests_while_ticking(self, url, **params):
+        async def fetch():
+            response = await self.async_client.get(url, params)
+            if response.streaming:
+                response.body = b"".join([chunk async for chunk in response.streaming_content])
+            else:
+                response.body = response.content
+            return response
+
+        self.async_client.cookies = self.client.cookies
+        stop = asyncio.Event()
+        ticker = asyncio.create_task(_worst_loop_lag(stop))
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(fetch() for _ in range(self.CONCURRENCY)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        return responses, elapsed, await ticker
+
+    def assert_not_blocked(self, elapsed, lag):
+        self.assertLess(lag, self.LATENCY / 2, "a view blocked the event loop")
+        # Served concurrently, not one after another
+        self.assertLess(elapsed, self.CONCURRENCY * self.LATENCY / 2)
+
+    async def test_secure_stream_does_not_block_the_loop(self):
+        from .stream_cache import stream_cache
+
+        handler = object_handler(256 * 1024, latency=self.LATENCY)
+        with serve(handler) as url, mock.patch.object(stream_cache, "max_bytes", 0):
+            storage.set_storage(storage.SupabaseStorage(url=url, key="test", bucket="test"))
+            responses, elapsed, lag = await self.requests_while_ticking("/api/secure-stream", path=self.PATH)
+        self.assertEqual({r.status_code for r in responses}, {200})
+        self.assertEqual(handler.peak_in_flight, self.CONCURRENCY)
+        self.assertEqual({len(r.body) for r in responses}, {256 * 1024})
+        self.assert_not_blocked(elapsed, lag)
+
+    async def test_signed_url_does_not_block_the_loop(self):
+        with serve(sign_handler("test", latency=self.LATENCY)) as url:
+            storage.set_storage(storage.SupabaseStorage(url=url, key="test", bucket="test"))
+            responses, elapsed, lag = await self.requests_while_ticking(f"/api/get-signed-url/{self.PATH}")
+        self.assertEqual({r.status_code for r in responses}, {200})
+        self.assert_not_blocked(elapsed, lag)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class StreamRelayTests(TestCase):
+    """
+    /secure-stream forwards conditional and partial request headers to
+    storage and relays its answer, over both the WSGI (sync iterator) and
+    ASGI (async iterator) paths.
+    """
+    SIZE = 200 * 1024
+    PATH = "1_slides.pdf"
+
+    def setUp(self):
+        from .stream_cache import stream_cache
+
+        self.handler = object_handler(self.SIZE, chunk_size=16 * 1024, latency=0)
+        server = serve(self.handler)
+        url = server.__enter__()
+        self.addCleanup(server.__exit__, None, None, None)
+        patcher = mock.patch.object(stream_cache, "max_bytes", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        storage.set_storage(storage.SupabaseStorage(url=url, key="test", bucket="test"))
+        self.addCleanup(storage.set_storage, None)
+
+        user = User.objects.create_user(email="r1@lnmiit.ac.in", username="r1", password="x")
+        self.client.force_login(user)
+
+    def stream(self, headers=None, method="get"):
+        response = getattr(self.client, method)("/api/secure-stream", {"path": self.PATH}, headers=headers)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    async def astream(self, headers=None):
+        self.async_client.cookies = self.client.cookies
+        response = await self.async_client.get("/api/secure-stream", {"path": self.PATH}, headers=headers)
+        body = b"".join([chunk async for chunk in response.streaming_content]) if response.streaming else response.content
+        return response, body
+
+    def assert_range(self, response, body, start, end):
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes {start}-{end}/{self.SIZE}")
+        self.assertEqual(int(response["Content-Length"]), end - start + 1)
+        self.assertEqual(body, self.handler.body[start:end + 1])
+
+    def test_full_body_carries_validators(self):
+        response, body = self.stream()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], self.handler.etag)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(body, self.handler.body)
+
+    def test_range_is_relayed(self):
+        response, body = self.stream({"Range": "bytes=100-70099"})
+        self.assert_range(response, body, 100, 70099)
+        response, body = self.stream({"Range": "bytes=-500"})
+        self.assert_range(response, body, self.SIZE - 500, self.SIZE - 1)
+
+    def test_unsatisfiable_range_is_relayed(self):
+        response, body = self.stream({"Range": f"bytes={self.SIZE}-"})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{self.SIZE}")
+        self.assertEqual(body, b"")
+
+    def test_matching_etag_answers_304(self):
+        response, body = self.stream({"If-None-Match": self.handler.etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], self.handler.etag)
+        self.assertEqual(body, b"")
+
+        response, _ = self.stream({"If-None-Match": '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_head_has_length_and_no_body(self):
+        response, body = self.stream(method="head")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(int(response["Content-Length"]), self.SIZE)
+        self.assertEqual(body, b"")
+
+    async def test_async_path_relays_range_and_304(self):
+        response, body = await self.astream({"Range": "bytes=0-65535"})
+        self.assert_range(response, body, 0, 65535)
+        response, body = await self.astream({"If-None-Match": self.handler.etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(body, b"")
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class StreamCacheTests(TestCase):
+    SIZE = 100 * 1024
+    PATH = "1_lab.pdf"
+
+    def setUp(self):
+        from .stream_cache import stream_cache
+
+        self.stream_cache = stream_cache
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for name, value in (("directory", directory.name), ("max_bytes", 10 * self.SIZE)):
+            patcher = mock.patch.object(stream_cache, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.handler = object_handler(self.SIZE, latency=0)
+        server = serve(self.handler)
+        url = server.__enter__()
+        self.addCleanup(server.__exit__, None, None, None)
+        storage.set_storage(storage.SupabaseStorage(url=url, key="test", bucket="test"))
+        self.addCleanup(storage.set_storage, None)
+
+        user = User.objects.create_user(email="c1@lnmiit.ac.in", username="c1", password="x")
+        self.client.force_login(user)
+
+    def get(self, headers=None):
+        response = self.client.get("/api/secure-stream", {"path": self.PATH}, headers=headers)
+        return response, b"".join(response.streaming_content)
+
+    def test_hits_are_served_from_disk(self):
+        self.get()
+        requests = self.handler.requests
+        response, body = self.get({"Range": "bytes=10-19"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.handler.body[10:20])
+        self.assertEqual(self.handler.requests, requests)
+
+    async def test_async_hits_are_served_from_disk(self):
+        await sync_to_async(self.get)()
+        self.async_client.cookies = self.client.cookies
+        response = await self.async_client.get("/api/secure-stream", {"path": self.PATH}, headers={"Range": "bytes=-100"})
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.handler.body[-100:])
+
+    def test_entry_evicted_after_lookup_falls_back_to_storage(self):
+        self.get()
+        lookup = self.stream_cache.lookup
+
+        def lookup_then_evict(path):
+            entry = lookup(path)
+            self.stream_cache.evict(path)
+            return entry
+
+        requests = self.handler.requests
+        with mock.patch.object(self.stream_cache, "lookup", lookup_then_evict):
+            response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.handler.body)
+        self.assertEqual(self.handler.requests, requests + 1)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class SignedUrlTests(TestCase):
+    def setUp(self):
+        cache.clear()  # Signed URLs are shared through the cache
+        self.handler = sign_handler("test", latency=0)
+        server = serve(self.handler)
+        url = server.__enter__()
+        self.addCleanup(server.__exit__, None, None, None)
+        storage.set_storage(storage.SupabaseStorage(url=url, key="test", bucket="test"))
+        self.addCleanup(storage.set_storage, None)
+
+        self.owner = User.objects.create_user(email="s1@lnmiit.ac.in", username="s1", password="x", role="student")
+        self.other = User.objects.create_user(email="s2@lnmiit.ac.in", username="s2", password="x", role="student")
+        UploadedFile.objects.create(user=self.owner, filename="a.pdf", size=1, cdn_url="1_a.pdf")
+
+    def test_single_url_needs_ownership(self):
+        self.assertEqual(self.client.get("/api/get-signed-url/1_a.pdf").status_code, 401)
+
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get("/api/get-signed-url/1_a.pdf").status_code, 404)
+        self.assertEqual(self.handler.calls, 0)
+
+        self.client.force_login(self.owner)
+        response = self.client.get("/api/get-signed-url/1_a.pdf")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("1_a.pdf", response.json()["url"])
+
+    def test_sync_listing_signs_without_an_event_loop(self):
+        self.client.force_login(self.owner)
+        with mock.patch.object(storage, "async_http_client", side_effect=AssertionError("event loop client used")):
+            response = self.client.get("/api/uploaded-files", {"with_urls": "true"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("1_a.pdf", response.json()["items"][0]["signed_url"])
+        self.assertEqual(self.handler.calls, 1)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class FileDeletionTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = storage.LocalStorage(root=directory.name)
+        storage.set_storage(self.storage)
+        self.addCleanup(storage.set_storage, None)
+
+        self.admin = User.objects.create_user(email="d0@lnmiit.ac.in", username="d0", password="x", role="admin")
+        self.student = User.objects.create_user(email="d1@lnmiit.ac.in", username="d1", password="x", role="student")
+        self.client.force_login(self.admin)
+
+    def store(self, path, refs):
+        self.storage._put(path, ContentFile(b"content"))
+        return StoredObject.objects.create(sha256=path.ljust(64, "0"), path=path, size=7, ref_count=refs)
+
+    def upload(self, path, blob=None, user=None):
+        return UploadedFile.objects.create(user=user or self.student, filename=path, size=7, cdn_url=path, blob=blob)
+
+    def delete(self, uploaded):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f"/api/uploaded-files/{uploaded.id}/delete")
+        self.assertEqual(response.status_code, 200)
+
+    def stored(self, path):
+        return self.storage._stat(path) is not None
+
+    def test_shared_content_is_removed_with_its_last_reference(self):
+        blob = self.store("1_shared.pdf", refs=2)
+        first, second = self.upload(blob.path, blob), self.upload(blob.path, blob)
+        self.delete(first)
+        self.assertTrue(self.stored(blob.path))
+        self.delete(second)
+        self.assertFalse(self.stored(blob.path))
+        self.assertFalse(StoredObject.objects.exists())
+
+    def test_row_without_blob_keeps_a_stored_objects_path(self):
+        blob = self.store("1_meta.pdf", refs=1)
+        self.upload(blob.path, blob)
+        self.delete(self.upload(blob.path))  # e.g. registered via /save-file-meta
+        self.assertTrue(self.stored(blob.path))
+
+    def test_row_without_blob_keeps_a_path_other_rows_use(self):
+        self.storage._put("1_legacy.pdf", ContentFile(b"x"))
+        first, second = self.upload("1_legacy.pdf"), self.upload("1_legacy.pdf")
+        self.delete(first)
+        self.assertTrue(self.stored("1_legacy.pdf"))
+        self.delete(second)
+        self.assertFalse(self.stored("1_legacy.pdf"))
+
+    def test_deleting_a_user_releases_their_files(self):
+        blob = self.store("1_cascade.pdf", refs=2)
+        self.upload(blob.path, blob)
+        self.upload(blob.path, blob, user=self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        self.assertTrue(self.stored(blob.path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.delete()
+        self.assertFalse(StoredObject.objects.exists())
+        self.assertFalse(self.stored(blob.path))
+
+    def test_failed_storage_removal_is_logged(self):
+        with mock.patch.object(self.storage, "remove", side_effect=storage.StorageError("down")), \
+                self.assertLogs("api.blobs", "ERROR") as logs:
+            self.delete(self.upload("1_orphan.pdf"))
+        self.assertIn("1_orphan.pdf", logs.output[0])
+        self.assertFalse(UploadedFile.objects.exists())
+
+
+class UploadedFileListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        storage.set_storage(storage.LocalStorage(root=directory.name))
+        self.addCleanup(storage.set_storage, None)
+
+        self.admin = User.objects.create_user(email="l0@lnmiit.ac.in", username="l0", password="x", role="admin")
+        self.student = User.objects.create_user(email="l1@lnmiit.ac.in", username="l1", password="x", role="student")
+        self.other = User.objects.create_user(email="l2@lnmiit.ac.in", username="l2", password="x", role="student")
+        for user, filename, year in (
+            (self.student, "notes.pdf", "2023"), (self.student, "lab.pdf", "2024"),
+            (self.other, "notes-other.pdf", "2024"), (self.admin, "circular.pdf", "2024"),
+        ):
+            UploadedFile.objects.create(user=user, filename=filename, size=1, cdn_url=filename, year=year)
+
+    def names(self, **params):
+        response = self.client.get("/api/uploaded-files", params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(item["filename"] for item in response.json()["items"])
+
+    def test_filters(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.names(year="2024"), ["circular.pdf", "lab.pdf", "notes-other.pdf"])
+        self.assertEqual(self.names(owner=self.other.id), ["notes-other.pdf"])
+        self.assertEqual(self.names(filename="notes"), ["notes-other.pdf", "notes.pdf"])
+        self.assertEqual(self.names(filename="notes", year="2023"), ["notes.pdf"])
+
+    def test_owner_filter_cannot_reveal_other_users_files(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.names(), ["lab.pdf", "notes.pdf"])
+        self.assertEqual(self.names(owner=self.other.id), [])
+        self.assertEqual(self.names(owner=self.admin.id, filename="circ"), [])
+
+    def test_cached_page_is_refreshed_after_upload_and_delete(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(len(self.names()), 4)
+
+        response = self.client.post("/api/upload", {"file": ContentFile(b"%PDF new", name="new.pdf"), "year": "2024"})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertIn("new.pdf", self.names())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f"/api/uploaded-files/{response.json()['id']}/delete")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("new.pdf", self.names())
+
+        # Other users' cached pages go stale too
+        self.client.force_login(self.other)
+        self.assertEqual(self.names(), ["notes-other.pdf"])
+        UploadedFile.objects.create(user=self.other, filename="late.pdf", size=1, cdn_url="late.pdf", year="2024")
+        self.assertEqual(self.names(), ["late.pdf", "notes-other.pdf"])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class LocalStorageTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = storage.LocalStorage(root=f"{directory.name}/objects")
+        self.storage._put("1_a.pdf", ContentFile(b"pdf"))
+        storage.set_storage(self.storage)
+        self.addCleanup(storage.set_storage, None)
+
+        admin = User.objects.create_user(email="l0@lnmiit.ac.in", username="l0", password="x", role="admin")
+        self.client.force_login(admin)
+
+    def test_backends_must_implement_the_interface(self):
+        with self.assertRaises(TypeError):
+            storage.Storage()
+
+        class Partial(storage.Storage):
+            async def asign(self, paths, expires_in=3600):
+                return {}
+
+        with self.assertRaises(TypeError):
+            Partial()
+
+    def test_paths_outside_the_root_do_not_exist(self):
+        escaping = ["../x", "../objects_/1_a.pdf", "/etc/passwd"]
+        response = self.client.post(
+            "/api/get-signed-urls", {"paths": ["1_a.pdf", *escaping]}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()["urls"]), ["1_a.pdf"])
+        self.assertEqual(response.json()["missing"], escaping)
+
+        self.assertEqual(self.client.get("/api/get-signed-url/..%2Fx").status_code, 404)
+        self.assertIsNone(self.storage._stat("../x"))
+        self.storage._remove(["../x"])
+        with self.assertRaises(storage.StorageError):
+            self.storage._put("../x", ContentFile(b"x"))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class QueryBudgetTests(TransactionTestCase):
+    # Real transactions: under TestCase every atomic() is a savepoint, which
+    # adds queries the deployed app doesn't make
+
+    def test_api_routes_stay_within_budget(self):
+        # Two sizes, so list routes whose queries grow with the result fail
+        results, failures = measure((2, 6), repeat=1, prefixes=("api/",))
+        self.assertEqual(failures, [])
+
+    def test_server_timing_is_opt_in(self):
+        admin = User.objects.create_user(email="admin@lnmiit.ac.in", username="admin", password="x", role="admin")
+        self.client.force_login(admin)
+        with override_settings(SERVER_TIMING=False):
+            self.assertNotIn("Server-Timing", self.client.get("/api/auth/check"))
+        with override_settings(SERVER_TIMING=True):
+            self.assertIn("queries", self.client.get("/api/auth/check")["Server-Timing"])
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        StreamCacheCollector._stats = None
+        self.addCleanup(setattr, StreamCacheCollector, "_stats", None)
+
+    @override_settings(METRICS_TOKEN="", DEBUG=False)
+    def test_denied_without_a_token_outside_debug(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+    @override_settings(METRICS_TOKEN="s3cret", DEBUG=False)
+    def test_token_is_required_when_set(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        response = self.client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"stream_cache_entries", response.content)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_stream_cache_stats_are_reused_between_scrapes(self):
+        from .stream_cache import stream_cache
+
+        patcher = mock.patch.object(stream_cache, "stats", wraps=stream_cache.stats)
+        stats = patcher.start()
+        self.addCleanup(patcher.stop)
+        for _ in range(3):
+            self.client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+        self.assertEqual(stats.call_count, 1)
+
+
+class ResumableUploadTests(TestCase):
+    CHUNK = 64 * 1024
+    DATA = bytes(range(256)) * (5 * 1024)  # 1.25 MiB: 20 chunks
+
+    def upload(self, **handler_options):
+        self.handler = upload_handler("test", **handler_options)
+        server = serve(self.handler)
+        url = server.__enter__()
+        self.addCleanup(server.__exit__, None, None, None)
+        patcher = mock.patch.object(storage, "RESUMABLE_CHUNK_SIZE", self.CHUNK)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        backend = storage.SupabaseStorage(url=url, key="test", bucket="test")
+        return asyncio.run(backend.aput("big.bin", ContentFile(self.DATA), len(self.DATA)))
+
+    def test_chunked_upload(self):
+        self.assertEqual(self.upload(), "big.bin")
+        self.assertEqual(self.handler.objects["big.bin"], (len(self.DATA), hashlib.sha256(self.DATA).hexdigest()))
+        self.assertEqual(self.handler.patch_offsets, list(range(0, len(self.DATA), self.CHUNK)))
+
+    def test_resumes_from_the_offset_storage_reports(self):
+        # The first chunk breaks off after 1000 bytes; the retry starts there
+        self.upload(fail_chunks=1, keep_on_failure=1000)
+        self.assertEqual(self.handler.patch_offsets[:3], [0, 1000, 1000 + self.CHUNK])
+        self.assertEqual(self.handler.objects["big.bin"], (len(self.DATA), hashlib.sha256(self.DATA).hexdigest()))
+
+    def test_gives_up_after_repeated_failures(self):
+        with self.assertRaises(storage.StorageError):
+            self.upload(fail_chunks=storage.RESUMABLE_RETRIES + 1)
+        self.assertEqual(self.handler.patches, storage.RESUMABLE_RETRIES + 1)
+        self.assertNotIn("big.bin", self.handler.objects)
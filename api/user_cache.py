@@ -0,0 +1,62 @@
+"""
+Versioned per-user cache keys.
+
+Every user-derived cache entry is namespaced by a per-user generation
+counter. ``api.signals`` bumps the counter whenever the user or one of its
+profiles is saved or deleted, which orphans all of that user's entries at
+once; they simply age out. This keeps entries correct no matter where the
+change came from (API, Django admin, Google login), so TTLs can be long.
+"""
+from django.core.cache import cache
+
+from . import cache_versions
+
+USER_CACHE_TIMEOUT = 60 * 60 * 6  # 6 hours
+
+
+def _generation_key(user_id):
+    return f"user_gen:{user_id}"
+
+
+def get_generation(user_id):
+    return cache_versions.get_version(_generation_key(user_id))
+
+
+def bump_generation(user_id):
+    cache_versions.bump_version(_generation_key(user_id))
+
+
+def user_key(name, user_id):
+    """
+    Cache key for ``name`` scoped to the user's current generation, e.g.
+    ``user_check:42:g1718000000000001``.
+    """
+    return f"{name}:{user_id}:g{get_generation(user_id)}"
+
+
+def get_for_user(name, user_id):
+    return cache.get(user_key(name, user_id))
+
+
+def set_for_user(name, user_id, value, timeout=USER_CACHE_TIMEOUT):
+    cache.set(user_key(name, user_id), value, timeout=timeout)
+
+
+def get_by_email(name, email):
+    """
+    Read an entry stored with ``set_by_email``. Email-keyed entries can't
+    embed the generation in the key (the id isn't known yet), so the
+    generation is stored alongside the value and checked on read.
+    """
+    entry = cache.get(f"{name}:{email}")
+    if not entry or entry["gen"] != get_generation(entry["user_id"]):
+        return None
+    return entry["value"]
+
+
+def set_by_email(name, email, user_id, value, timeout=USER_CACHE_TIMEOUT):
+    cache.set(
+        f"{name}:{email}",
+        {"user_id": user_id, "gen": get_generation(user_id), "value": value},
+        timeout=timeout,
+    )
@@ -0,0 +1,225 @@
+"""
+Set-based user import engine used by ``/admin/import-users``.
+
+The spreadsheet is validated column-wise (domain, required student fields,
+in-file duplicates, one ``IN`` query per unique column), then users and their
+role profiles are written with ``bulk_create`` in chunked transactions.
+"""
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+
+from .models import StudentProfile, FacultyProfile, StaffProfile
+from .passwords import hash_passwords, user_attributes
+
+User = get_user_model()
+
+ALLOWED_EMAIL_DOMAIN = "@lnmiit.ac.in"
+REQUIRED_COLUMNS = {"email", "role", "username", "password"}
+OPTIONAL_COLUMNS = ("picture", "department", "roll_number")
+IMPORT_CHUNK_SIZE = 500
+
+PROFILE_MODELS = {
+    "student": StudentProfile,
+    "faculty": FacultyProfile,
+    "staff": StaffProfile,
+}
+
+
+def normalize_frame(df):
+    """
+    Lower-case the headers and turn every column into stripped strings so the
+    checks below can run as vectorised string operations.
+    """
+    df = df.copy()
+    df.columns = df.columns.str.strip().str.lower()
+    for column in OPTIONAL_COLUMNS:
+        if column not in df.columns:
+            df[column] = ""
+
+    df = df.fillna("")
+    for column in ("email", "username", "role", *OPTIONAL_COLUMNS):
+        df[column] = df[column].astype(str).str.strip()
+    df["email"] = df["email"].str.lower()
+    df["role"] = df["role"].str.lower()
+    df["password"] = df["password"].astype(str)
+    return df
+
+
+def _flag(errors, mask, message):
+    # Only the first failing check is reported for a row, matching the old
+    # row-by-row behaviour.
+    errors[mask & errors.isna()] = message
+
+
+def validate_frame(df):
+    """
+    Return a Series (aligned with ``df``) holding the first validation error
+    for each row, or NaN for rows that can be inserted. Repeats inside the
+    file are caught while importing (see ``_claim``), so a row only counts
+    as a duplicate of an earlier one that was actually accepted.
+    """
+    errors = pd.Series(pd.NA, index=df.index, dtype="object")
+    is_student = df["role"] == "student"
+
+    _flag(errors, ~df["email"].str.endswith(ALLOWED_EMAIL_DOMAIN), "Only LNMIIT emails are allowed")
+
+    existing_emails = set(
+        User.objects.filter(email__in=df["email"].unique().tolist()).values_list("email", flat=True)
+    )
+    _flag(errors, df["email"].isin(existing_emails), "Email already exists")
+
+    _flag(
+        errors,
+        is_student & ((df["roll_number"] == "") | (df["department"] == "")),
+        "Student must have roll_number and department",
+    )
+
+    student_rolls = df.loc[is_student, "roll_number"]
+    existing_rolls = set(
+        StudentProfile.objects.filter(roll_number__in=student_rolls.unique().tolist()).values_list(
+            "roll_number", flat=True
+        )
+    )
+    _flag(errors, is_student & df["roll_number"].isin(existing_rolls), "Roll number already exists")
+
+    return errors
+
+
+def build_user(row):
+    """
+    Build an unsaved user for ``row``. The password is filled in later by
+    ``hash_passwords`` for the whole chunk.
+    """
+    return User(
+        email=row["email"],
+        username=row["username"],
+        role=row["role"],
+        profile_picture=row["picture"] or None,
+    )
+
+
+def build_profile(user, row):
+    model = PROFILE_MODELS.get(user.role)
+    if model is None:
+        return None
+    if model is StudentProfile:
+        return StudentProfile(user=user, roll_number=row["roll_number"], department=row["department"])
+    return model(user=user, department=row["department"])
+
+
+def _claim(row, claimed):
+    """
+    Reserve the row's email (and a student's roll number) for this import,
+    or return the error for a value an earlier accepted row already took.
+    """
+    if row["email"] in claimed["email"]:
+        return "Email already exists"
+    roll_number = row["roll_number"] if row["role"] == "student" else ""
+    if roll_number and roll_number in claimed["roll_number"]:
+        return "Roll number already exists"
+    claimed["email"].add(row["email"])
+    if roll_number:
+        claimed["roll_number"].add(roll_number)
+    return None
+
+
+def _insert_chunk(users, rows):
+    """
+    Insert one chunk of users and their profiles in a single transaction.
+    """
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        profiles = {}
+        for user, row in zip(users, rows):
+            profile = build_profile(user, row)
+            if profile is not None:
+                profiles.setdefault(type(profile), []).append(profile)
+        for model, batch in profiles.items():
+            model.objects.bulk_create(batch)
+
+
+def _insert_rows_individually(users, rows, row_numbers, failed):
+    """
+    Fallback for a chunk that hit a constraint (e.g. a concurrent insert):
+    retry row by row so the failure report still points at the bad rows.
+    """
+    success = 0
+    for user, row, row_number in zip(users, rows, row_numbers):
+        user.pk = None
+        try:
+            _insert_chunk([user], [row])
+            success += 1
+        except IntegrityError as e:
+            failed.append({"row": row_number, "error": str(e)})
+    return success
+
+
+def import_users_frame(df, chunk_size=IMPORT_CHUNK_SIZE, on_progress=None):
+    """
+    Import every valid row of ``df``.
+
+    Returns ``(success_count, failed)`` where ``failed`` is a list of
+    ``{"row": <spreadsheet row>, "error": <message>}`` dicts.
+    ``on_progress(processed, failed_count)`` is called after each chunk.
+    """
+    df = normalize_frame(df)
+    errors = validate_frame(df)
+
+    success = 0
+    failed = []
+    processed = 0
+    pending = []
+    claimed = {"email": set(), "roll_number": set()}
+
+    def flush():
+        nonlocal success
+        if not pending:
+            return
+        rows, row_numbers = zip(*pending)
+        pending.clear()
+
+        # Passwords are validated against the user's attributes, exactly like
+        # CustomUser.set_password, but across a process pool.
+        candidates = [build_user(row) for row in rows]
+        hashes = hash_passwords((row["password"], user_attributes(user)) for user, row in zip(candidates, rows))
+
+        users, ready_rows, ready_numbers = [], [], []
+        for user, row, row_number, (hashed, error) in zip(candidates, rows, row_numbers, hashes):
+            error = error or _claim(row, claimed)
+            if error:
+                failed.append({"row": row_number, "error": error})
+                continue
+            user.password = hashed
+            users.append(user)
+            ready_rows.append(row)
+            ready_numbers.append(row_number)
+
+        if not users:
+            return
+        try:
+            _insert_chunk(users, ready_rows)
+            success += len(users)
+        except IntegrityError:
+            success += _insert_rows_individually(users, ready_rows, ready_numbers, failed)
+
+    for index, row in zip(df.index, df.to_dict("records")):
+        row_number = int(index) + 2
+        processed += 1
+
+        if isinstance(errors[index], str):
+            failed.append({"row": row_number, "error": errors[index]})
+        else:
+            pending.append((row, row_number))
+
+        if len(pending) >= chunk_size:
+            flush()
+            if on_progress:
+                on_progress(processed, len(failed))
+
+    flush()
+    if on_progress:
+        on_progress(processed, len(failed))
+
+    failed.sort(key=lambda f: f["row"])
+    return success, failed
@@ -5,6 +5,12 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+The I/O-bound endpoints (upload, secure-stream, signed URLs, Google login)
+are async views, so serving through this module lets one worker keep many of
+them in flight:
+
+    gunicorn backend1.asgi:application -k uvicorn.workers.UvicornWorker
 """
 
 import os
@@ -14,3 +20,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend1.settings')
 
 application = get_asgi_application()
+
+# Imported before the event loop starts: the first outbound storage request
+# would otherwise import httpx and its transport (httpcore, which httpx only
+# loads when a client is created) on the loop, stalling every request in
+# flight for a few hundred milliseconds
+import httpcore  # noqa: E402,F401
+import httpx  # noqa: E402,F401
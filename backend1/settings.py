@@ -122,6 +122,7 @@
 # settings.py (Updated for Supabase Postgres, Redis Channels, and Production Security)
 
 import os
+import tempfile
 from pathlib import Path
 from decouple import config, Csv
 import dj_database_url
@@ -184,7 +185,10 @@ INSTALLED_APPS = [
 # MIDDLEWARE
 # -----------------------------------------------------------------------------
 MIDDLEWARE = [
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # whitenoise.middleware.WhiteNoiseMiddleware, async-capable (api.middleware)
+    'api.middleware.AsyncWhiteNoiseMiddleware',
+    # Query count, DB time and cache calls per route (api.instrumentation)
+    'api.instrumentation.RequestStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -228,8 +232,6 @@ ASGI_APPLICATION = 'backend1.asgi.application'
 # -----------------------------------------------------------------------------
 # DATABASES (Supabase Postgres)
 # -----------------------------------------------------------------------------
-print("DB SETTINGS >>>", config("DB_NAME"), config("DB_USER"), config("DB_PASSWORD"), config("DB_HOST"))
-
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -260,7 +262,8 @@ else:
 
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        # RedisCache that counts its round trips per request
+        "BACKEND": "api.instrumentation.InstrumentedRedisCache",
         "LOCATION": REDIS_URL,  # e.g. redis://red-xxxx:6379/0
     }
 }
@@ -272,6 +275,16 @@ SESSION_CACHE_ALIAS = "default"
 # AUTH
 # -----------------------------------------------------------------------------
 AUTH_USER_MODEL = 'api.CustomUser'
+AUTHENTICATION_BACKENDS = [
+    # Loads request.user together with its role profile in one query
+    'api.backends.ProfileModelBackend',
+    # Kept so sessions created before the switch stay valid
+    'django.contrib.auth.backends.ModelBackend',
+]
+# Google sign-in: ID tokens are verified locally against these certs
+GOOGLE_CLIENT_ID = config('GOOGLE_CLIENT_ID', default=None)  # Checked as the token audience when set
+GOOGLE_CERTS_URL = config('GOOGLE_CERTS_URL', default='https://www.googleapis.com/oauth2/v1/certs')
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -299,6 +312,43 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Where uploaded files live: 'api.storage.SupabaseStorage', or
+# 'api.storage.LocalStorage' to keep them under MEDIA_ROOT (offline
+# development, benchmarks and load tests)
+STORAGE_BACKEND = config('STORAGE_BACKEND', default='api.storage.SupabaseStorage')
+LOCAL_STORAGE_ROOT = MEDIA_ROOT / 'storage'
+LOCAL_STORAGE_URL = '/api/local-storage/'
+
+# Hash uploads as they arrive, for content-addressed deduplication
+FILE_UPLOAD_HANDLERS = [
+    'api.upload_handlers.HashingMemoryFileUploadHandler',
+    'api.upload_handlers.HashingTemporaryFileUploadHandler',
+]
+
+# Read size used when relaying files through /secure-stream
+SECURE_STREAM_CHUNK_SIZE = config('SECURE_STREAM_CHUNK_SIZE', default=64 * 1024, cast=int)
+
+# Local disk cache for files served by /secure-stream (shared by all workers
+# on the host); set STREAM_CACHE_MAX_BYTES=0 to disable
+STREAM_CACHE_DIR = config('STREAM_CACHE_DIR', default=os.path.join(tempfile.gettempdir(), 'secure_stream_cache'))
+STREAM_CACHE_MAX_BYTES = config('STREAM_CACHE_MAX_BYTES', default=1024 * 1024 * 1024, cast=int)
+
+# -----------------------------------------------------------------------------
+# METRICS
+# -----------------------------------------------------------------------------
+# Each worker writes its Prometheus samples here and /metrics merges them
+# (api.metrics); gunicorn.conf.py empties it when the server starts. It has
+# to be in the environment before prometheus_client is imported.
+PROMETHEUS_MULTIPROC_DIR = config('PROMETHEUS_MULTIPROC_DIR', default=os.path.join(tempfile.gettempdir(), 'backend_metrics'))
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', PROMETHEUS_MULTIPROC_DIR)
+os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+# /metrics requires "Authorization: Bearer <METRICS_TOKEN>"; without a token
+# it is only served under DEBUG
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Add a Server-Timing header (query count, DB and total time) to every
+# response; it describes the internals, so only in development unless asked
+SERVER_TIMING = config('SERVER_TIMING', default=DEBUG, cast=bool)
+
 # -----------------------------------------------------------------------------
 # CORS
 # -----------------------------------------------------------------------------
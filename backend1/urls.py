@@ -24,6 +24,7 @@ from django.core.cache import cache
 # API routers
 from api.api import api
 from intruments.api import api as instruments
+from api.metrics import metrics_view
 
 # Health check view
 def health_check(request):
@@ -40,6 +41,7 @@ urlpatterns = [
     path('instruments/', instruments.urls),
     path('health/', health_check),
     path("cache-ping/", cache_ping),
+    path("metrics", metrics_view),
 ]
 
 # Only add debug toolbar & static media in development
@@ -0,0 +1,73 @@
+"""
+Standalone performance benchmarks.
+
+Run them from the repository root as modules, e.g.
+``python -m benchmarks.password_hashing``. Each benchmark prints its results
+as JSON so runs from different commits can be diffed. They default to
+``benchmarks.settings`` and need no Redis, Supabase or Postgres; never point
+them at ``backend1.settings``, whose cache also holds the live sessions.
+"""
+import os
+import statistics
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    import django
+
+    django.setup()
+
+
+def clear_cache():
+    """
+    Empty the default cache for a cold-cache measurement. Refuses anything
+    but a local-memory cache, so a benchmark can't wipe a shared one.
+    """
+    from django.core.cache import caches
+    from django.core.cache.backends.locmem import LocMemCache
+
+    cache = caches["default"]
+    if not isinstance(cache, LocMemCache):
+        raise RuntimeError(
+            f"Refusing to clear {type(cache).__name__}; run with DJANGO_SETTINGS_MODULE=benchmarks.settings"
+        )
+    cache.clear()
+
+
+@contextmanager
+def bench_database():
+    """
+    Run inside a throwaway test database (``test_<NAME>``), created and
+    destroyed like the Django test runner does, so benchmarks never touch
+    real data.
+    """
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+    try:
+        yield
+    finally:
+        runner.teardown_databases(old_config)
+        teardown_test_environment()
+
+
+def summarize(samples):
+    """
+    Latency summary in milliseconds for a list of durations in seconds.
+    """
+    ordered = sorted(samples)
+
+    def percentile(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+    }
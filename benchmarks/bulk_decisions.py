@@ -0,0 +1,95 @@
+"""
+Clearing a queue of pending issue requests: one /approve (or /reject) call
+per request versus a single /bulk-approve (or /bulk-reject), measuring wall
+time, API calls and database queries.
+
+    python -m benchmarks.bulk_decisions --requests 200 --items 20
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks import bench_database, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200, help="pending requests to decide, at most 200")
+    parser.add_argument("--items", type=int, default=20, help="items the requests are spread over")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    from intruments.models import Category, IssueRequest, Item, SubCategory
+
+    rng = random.Random(args.seed)
+    with bench_database():
+        admin = get_user_model().objects.create_user(
+            email="bench.bulk@lnmiit.ac.in", username="bench.bulk", password="x", role="admin", is_superuser=True
+        )
+        category = Category.objects.create(name="Bulk")
+        sub_category = SubCategory.objects.create(name="Bulk", category=category)
+        client = Client()
+        client.force_login(admin)
+
+        def queue(run):
+            items = Item.objects.bulk_create(
+                Item(
+                    category=category, sub_category=sub_category, name=f"Bulk {i}", serial_number=f"{run}{i}",
+                    cost=1, quantity=10 * args.requests, gst_number="GST", buyer_name="Buyer",
+                    buyer_email="buyer@lnmiit.ac.in",
+                )
+                for i in range(args.items)
+            )
+            requests = IssueRequest.objects.bulk_create(
+                IssueRequest(item=rng.choice(items), user=admin, quantity=rng.randint(1, 3), remarks="")
+                for _ in range(args.requests)
+            )
+            return [r.id for r in requests]
+
+        def single(decision):
+            def run(ids):
+                for request_id in ids:
+                    assert client.post(f"/instruments/issue-requests/{request_id}/{decision}").status_code == 200
+                return len(ids)
+            return run
+
+        def bulk(decision):
+            def run(ids):
+                response = client.post(
+                    f"/instruments/issue-requests/bulk-{decision}", {"ids": ids}, content_type="application/json"
+                )
+                assert all(outcome["ok"] for outcome in response.json()), response.content
+                return 1
+            return run
+
+        results = {}
+        for name, strategy in (
+            ("single_approve", single("approve")), ("bulk_approve", bulk("approve")),
+            ("single_reject", single("reject")), ("bulk_reject", bulk("reject")),
+        ):
+            ids = queue(name)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                calls = strategy(ids)
+                elapsed = time.perf_counter() - started
+            results[name] = {
+                "seconds": round(elapsed, 3),
+                "requests_to_api": calls,
+                "queries": len(queries),
+                "decisions_per_second": round(len(ids) / elapsed, 1),
+            }
+
+    print(json.dumps({
+        "benchmark": "bulk_decisions", "requests": args.requests, "items": args.items, **results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Google logins per second with ID tokens signed by a local key, served from
+a local stand-in of Google's certs endpoint. Compares the old per-call
+certificate download (``id_token.verify_token``) with the cached offline
+verifier used by ``/auth/google-login``.
+
+    python -m benchmarks.google_login --logins 300
+"""
+import argparse
+import json
+import time
+
+from benchmarks import bench_database, setup_django
+from benchmarks.servers import cert_handler, serve
+
+
+def make_signer():
+    import rsa
+    from google.auth import crypt
+
+    public_key, private_key = rsa.newkeys(2048)
+    signer = crypt.RSASigner.from_string(private_key.save_pkcs1().decode(), key_id="bench")
+    return signer, {"bench": public_key.save_pkcs1().decode()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from google.auth import jwt
+    from google.auth.transport import requests as google_requests
+    from google.oauth2 import id_token
+
+    signer, certs = make_signer()
+    email = "bench.google@lnmiit.ac.in"
+
+    def token(i):
+        now = int(time.time())
+        payload = {
+            "iss": "https://accounts.google.com",
+            "aud": settings.GOOGLE_CLIENT_ID or "bench-client",
+            "sub": str(i),
+            "email": email,
+            "iat": now,
+            "exp": now + 3600,
+        }
+        return jwt.encode(signer, payload).decode()
+
+    tokens = [token(i) for i in range(args.logins)]
+    handler = cert_handler(certs)
+
+    with serve(handler) as certs_url, bench_database():
+        settings.GOOGLE_CERTS_URL = certs_url
+        get_user_model().objects.create_user(email=email, username="bench.google", password="Quartz#Zebra91")
+
+        request = google_requests.Request()
+        started = time.perf_counter()
+        for t in tokens:
+            id_token.verify_token(t, request, certs_url=certs_url)
+        per_call_fetch = time.perf_counter() - started
+
+        handler.hits = 0
+        client = Client()
+        started = time.perf_counter()
+        for t in tokens:
+            response = client.post("/api/auth/google-login", json.dumps({"token": t}), content_type="application/json")
+            assert response.status_code == 200, response.content
+        endpoint = time.perf_counter() - started
+
+    print(json.dumps({
+        "benchmark": "google_login",
+        "logins": args.logins,
+        "verify_with_cert_fetch_per_call_per_second": round(args.logins / per_call_fetch, 1),
+        "google_login_endpoint_per_second": round(args.logins / endpoint, 1),
+        "cert_fetches_during_endpoint_run": handler.hits,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+/instruments/items/search latency over a large inventory: prefix, misspelt,
+multi-word, serial-number and category-filtered queries, each through the
+indexed search and, for comparison, the unindexed ``icontains`` scan that
+other backends fall back to.
+
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python -m benchmarks.item_search --items 100000
+
+Use BENCH_DATABASE_URL to measure the PostgreSQL indexes; with SQLite it
+measures the FTS5 table.
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks import bench_database, setup_django, summarize
+
+INSTRUMENTS = (
+    "Oscilloscope", "Multimeter", "Spectrometer", "Function Generator", "Power Supply", "Soldering Station",
+    "Logic Analyzer", "Microscope", "Centrifuge", "Thermocouple", "Tachometer", "Anemometer", "Rheostat",
+    "Galvanometer", "Wattmeter", "Signal Analyzer", "Pipette", "Burette", "Hot Plate", "Magnetic Stirrer",
+)
+ADJECTIVES = ("Digital", "Analog", "Portable", "Benchtop", "Precision", "Dual Channel", "High Voltage", "Compact")
+BUYERS = ("Ravi Kumar", "Anita Sharma", "Suresh Iyer", "Meena Gupta", "Arjun Singh", "Kavya Nair")
+# Long enough to still be a search after losing a letter
+TYPO_WORDS = [word for name in INSTRUMENTS for word in name.split() if len(word) >= 6]
+BATCH = 5000
+
+
+def misspell(word, rng):
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50, help="queries per kind")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import Client
+
+    from intruments.models import Category, Item, SubCategory
+    from intruments.search import _scan, query_words
+
+    rng = random.Random(args.seed)
+    with bench_database():
+        categories = Category.objects.bulk_create(Category(name=f"Lab {i}") for i in range(args.categories))
+        sub_categories = SubCategory.objects.bulk_create(
+            SubCategory(name=f"Shelf {j}", category=category) for category in categories for j in range(3)
+        )
+        seeding = time.perf_counter()
+        for start in range(0, args.items, BATCH):
+            items = []
+            for i in range(start, min(start + BATCH, args.items)):
+                sub = rng.choice(sub_categories)
+                items.append(Item(
+                    category_id=sub.category_id, sub_category=sub,
+                    name=f"{rng.choice(ADJECTIVES)} {rng.choice(INSTRUMENTS)} {rng.randint(100, 999)}",
+                    serial_number=f"SN{i:07d}", cost=rng.randint(100, 100000), quantity=rng.randint(0, 20),
+                    gst_number=f"27AAPFU{i % 10000:04d}F1ZV", buyer_name=rng.choice(BUYERS),
+                    buyer_email="buyer@lnmiit.ac.in", bill_number=f"BILL{i // 10}",
+                    remarks=rng.choice(("", "calibrated", "needs repair", "spare probes in drawer")),
+                ))
+            Item.objects.bulk_create(items)
+        seeding = time.perf_counter() - seeding
+
+        kinds = {
+            "prefix": lambda: {"q": rng.choice(INSTRUMENTS).split()[0][:5]},
+            "typo": lambda: {"q": misspell(rng.choice(TYPO_WORDS), rng)},
+            "multi_word": lambda: {"q": f"{rng.choice(ADJECTIVES).split()[0]} {rng.choice(INSTRUMENTS).split()[0]}"},
+            "serial": lambda: {"q": f"SN{rng.randrange(args.items):07d}"},
+            "buyer": lambda: {"q": rng.choice(BUYERS).split()[1]},
+            "in_category": lambda: {"q": rng.choice(INSTRUMENTS).split()[0], "category": rng.choice(categories).id},
+        }
+
+        admin = get_user_model().objects.create_user(
+            email="bench.search@lnmiit.ac.in", username="bench.search", password="x", role="admin"
+        )
+        client = Client()
+        client.force_login(admin)
+
+        results = {}
+        for name, make_params in kinds.items():
+            indexed, scanned, hits = [], [], []
+            for _ in range(args.repeat):
+                params = make_params()
+                started = time.perf_counter()
+                response = client.get("/instruments/items/search", params)
+                indexed.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.content
+                hits.append(len(response.json()))
+
+                queryset = Item.objects.all()
+                if "category" in params:
+                    queryset = queryset.filter(category_id=params["category"])
+                started = time.perf_counter()
+                # An unindexed order, so every match is read as ranking must
+                list(_scan(queryset, query_words(params["q"])).order_by("remarks", "id")[:50])
+                scanned.append(time.perf_counter() - started)
+            results[name] = {
+                "indexed": summarize(indexed),
+                "scan": summarize(scanned),
+                "mean_hits": round(sum(hits) / len(hits), 1),
+            }
+
+    print(json.dumps({
+        "benchmark": "item_search",
+        "database": connection.vendor,
+        "items": args.items,
+        "seeding_seconds": round(seeding, 2),
+        "queries": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+End-to-end load test of the main NinjaAPI routes.
+
+Seeds a throwaway database with the requested volumes of users, files,
+items and issue requests, then drives each endpoint through the ASGI app
+(the production entry point) with a number of concurrent clients, and
+prints p50/p95/p99 latency, throughput and queries per request for every
+endpoint as JSON, so runs from different commits can be diffed.
+
+Self-contained with the benchmark settings (local-memory cache, local
+filesystem storage, SQLite or BENCH_DATABASE_URL):
+
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python -m benchmarks.load_test \\
+        --users 500 --files 2000 --items 1000 --issue-requests 1000 \\
+        --requests 200 --concurrency 16
+
+The same --seed gives the same data and request sequence.
+"""
+import argparse
+import asyncio
+import collections
+import io
+import json
+import random
+import tempfile
+import time
+
+from benchmarks import bench_database, setup_django, summarize
+
+PASSWORD = "Quartz#Zebra91"
+# Any 32 allowed characters will do as long as cookie and header match
+CSRF_TOKEN = "loadtestloadtestloadtestloadtest"
+STORED_OBJECTS = 10
+
+
+class Data:
+    """
+    Seeded rows, kept as id lists so requests can pick from them.
+    """
+
+    def __init__(self, args, rng):
+        from asgiref.sync import async_to_sync
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.hashers import make_password
+
+        from api.models import FacultyProfile, StudentProfile, UploadedFile
+        from api.storage import get_storage
+        from intruments.models import Category, IssueRequest, Item, SubCategory
+
+        User = get_user_model()
+        password = make_password(PASSWORD)  # hashed once, shared by every seeded user
+
+        def users(role, count):
+            return User.objects.bulk_create(
+                User(email=f"load.{role}{i}@lnmiit.ac.in", username=f"load.{role}{i}", password=password, role=role)
+                for i in range(count)
+            )
+
+        self.admin = User.objects.create_user(
+            email="load.admin@lnmiit.ac.in", username="load.admin", password=PASSWORD, role="admin", is_superuser=True
+        )
+        students = users("student", max(1, args.users * 4 // 5))
+        faculty = users("faculty", max(1, args.users - len(students)))
+        StudentProfile.objects.bulk_create(
+            StudentProfile(user=user, roll_number=f"22ucs{i:05}", department=rng.choice(("CSE", "ECE", "ME")))
+            for i, user in enumerate(students)
+        )
+        FacultyProfile.objects.bulk_create(FacultyProfile(user=user, department="CSE") for user in faculty)
+        self.students, self.faculty = students, faculty
+        self.user_ids = [user.id for user in students + faculty]
+
+        storage = get_storage()
+        self.paths = [f"load_{i}.pdf" for i in range(STORED_OBJECTS)]
+        for path in self.paths:
+            content = io.BytesIO(rng.randbytes(args.file_size))
+            async_to_sync(storage.aput)(path, content, args.file_size, "application/pdf")
+        UploadedFile.objects.bulk_create(
+            UploadedFile(
+                user=rng.choice(students + faculty), filename=f"notes_{i}.pdf", size=args.file_size,
+                cdn_url=rng.choice(self.paths), year=str(rng.randint(2021, 2025)),
+            )
+            for i in range(args.files)
+        )
+
+        categories = Category.objects.bulk_create(
+            Category(name=f"Load category {i}") for i in range(max(1, args.items // 50))
+        )
+        sub_categories = SubCategory.objects.bulk_create(
+            SubCategory(name=f"Sub {j}", category=category) for category in categories for j in range(3)
+        )
+        items = Item.objects.bulk_create(
+            Item(
+                category=sub.category, sub_category=sub, name=f"Instrument {i}", serial_number=f"LSN{i}",
+                cost=rng.randint(100, 100000), quantity=rng.randint(0, 50), gst_number="GST",
+                buyer_name="Buyer", buyer_email="buyer@lnmiit.ac.in", bill_number=f"LB{i}",
+            )
+            for i, sub in ((i, rng.choice(sub_categories)) for i in range(args.items))
+        )
+        IssueRequest.objects.bulk_create(
+            IssueRequest(
+                item=rng.choice(items), user=rng.choice(students), quantity=1, remarks="",
+                status=rng.choice(("pending", "approved", "rejected")),
+            )
+            for _ in range(args.issue_requests)
+        )
+        self.category_ids = [category.id for category in categories]
+        self.item_ids = [item.id for item in items if item.quantity > 0] or [items[0].id]
+
+
+def endpoints(data, rng):
+    """
+    ``name -> (role, request factory)``; a factory returns the arguments of
+    one ``httpx.AsyncClient.request`` call.
+    """
+    return {
+        "GET /api/auth/check": ("student", lambda: ("GET", "/api/auth/check", {})),
+        "GET /api/users": ("admin", lambda: ("GET", "/api/users", {"params": {"limit": 50}})),
+        "GET /api/users/details": ("admin", lambda: (
+            "GET", "/api/users/details", {"params": {"ids": ",".join(map(str, rng.sample(data.user_ids, min(20, len(data.user_ids)))))}},
+        )),
+        "GET /api/uploaded-files": ("faculty", lambda: ("GET", "/api/uploaded-files", {"params": {"limit": 50}})),
+        "GET /api/uploaded-files?with_urls": ("faculty", lambda: (
+            "GET", "/api/uploaded-files", {"params": {"limit": 50, "with_urls": "true"}},
+        )),
+        "GET /api/uploaded-files (student)": ("student", lambda: ("GET", "/api/uploaded-files", {})),
+        "POST /api/get-signed-urls": ("faculty", lambda: (
+            "POST", "/api/get-signed-urls", {"json": {"paths": rng.sample(data.paths, 5)}},
+        )),
+        "GET /api/secure-stream": ("student", lambda: (
+            "GET", "/api/secure-stream", {"params": {"path": rng.choice(data.paths)}},
+        )),
+        "POST /api/login": (None, lambda: (
+            "POST", "/api/login", {"json": {"email": data.admin.email, "password": PASSWORD}},
+        )),
+        "GET /instruments/items": ("student", lambda: (
+            "GET", "/instruments/items", {"params": {"category": rng.choice(data.category_ids)}},
+        )),
+        "GET /instruments/items/{id}": ("student", lambda: ("GET", f"/instruments/items/{rng.choice(data.item_ids)}", {})),
+        "GET /instruments/categories": ("student", lambda: ("GET", "/instruments/categories", {})),
+        "GET /instruments/subcategories": ("student", lambda: (
+            "GET", "/instruments/subcategories", {"params": {"category_id": rng.choice(data.category_ids)}},
+        )),
+        "GET /instruments/issue-requests/": ("admin", lambda: (
+            "GET", "/instruments/issue-requests/", {"params": {"status": "pending"}},
+        )),
+        "POST /instruments/issue-requests/": ("student", lambda: (
+            "POST", "/instruments/issue-requests/", {"json": {"item_id": rng.choice(data.item_ids), "quantity": 1, "remarks": ""}},
+        )),
+    }
+
+
+async def drive(client, make_request, count, concurrency):
+    latencies = []
+    statuses = collections.Counter()
+    remaining = iter(range(count))
+
+    async def worker():
+        for _ in remaining:
+            method, url, kwargs = make_request()
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+async def run(app, sessions, plan, args):
+    import httpx
+
+    from api.instrumentation import route_stats
+
+    transport = httpx.ASGITransport(app=app)
+    clients = {
+        role: httpx.AsyncClient(
+            transport=transport, base_url="http://testserver", headers={"X-CSRFToken": CSRF_TOKEN},
+            cookies={"csrftoken": CSRF_TOKEN, **({"sessionid": session} if session else {})},
+        )
+        for role, session in sessions.items()
+    }
+    results = {}
+    try:
+        for name, (role, make_request) in plan.items():
+            await drive(clients[role], make_request, 1, 1)  # warm-up, not measured
+            route_stats.reset()
+            latencies, statuses, elapsed = await drive(clients[role], make_request, args.requests, args.concurrency)
+            totals = list(route_stats.snapshot().values())
+            requests = sum(entry["requests"] for entry in totals) or 1
+            results[name] = {
+                **summarize(latencies),
+                "throughput_rps": round(len(latencies) / elapsed, 1),
+                "queries_per_request": round(sum(entry["queries"] for entry in totals) / requests, 2),
+                "errors": sum(count for status, count in statuses.items() if status >= 400),
+                "statuses": {str(status): count for status, count in sorted(statuses.items())},
+            }
+    finally:
+        for client in clients.values():
+            await client.aclose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--issue-requests", type=int, default=500)
+    parser.add_argument("--file-size", type=int, default=256 * 1024, help="bytes per stored object")
+    parser.add_argument("--requests", type=int, default=100, help="measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--only", nargs="+", help="endpoint names (or prefixes) to run")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.asgi import get_asgi_application
+    from django.db import connection
+    from django.test import Client
+
+    from api import storage
+
+    rng = random.Random(args.seed)
+    with bench_database(), tempfile.TemporaryDirectory() as root:
+        storage.set_storage(storage.LocalStorage(root=root))
+        seeding = time.perf_counter()
+        data = Data(args, rng)
+        seeding = time.perf_counter() - seeding
+
+        sessions = {None: None}
+        for role, user in (("admin", data.admin), ("faculty", data.faculty[0]), ("student", data.students[0])):
+            client = Client()
+            client.force_login(user)
+            sessions[role] = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+        plan = endpoints(data, rng)
+        if args.only:
+            plan = {name: entry for name, entry in plan.items() if any(name.startswith(only) for only in args.only)}
+        results = asyncio.run(run(get_asgi_application(), sessions, plan, args))
+
+    print(json.dumps({
+        "benchmark": "load_test",
+        "database": connection.vendor,
+        "seed": args.seed,
+        "volumes": {
+            "users": args.users, "files": args.files, "items": args.items,
+            "issue_requests": args.issue_requests, "file_size": args.file_size,
+        },
+        "requests_per_endpoint": args.requests,
+        "concurrency": args.concurrency,
+        "seeding_seconds": round(seeding, 2),
+        "endpoints": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
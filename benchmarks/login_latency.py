@@ -0,0 +1,50 @@
+"""
+/login latency with a cold credential cache (full PBKDF2 check) and a warm
+one (verified-credential fast path).
+
+    python -m benchmarks.login_latency --iterations 50
+"""
+import argparse
+import json
+import time
+
+from benchmarks import bench_database, clear_cache, setup_django, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    with bench_database():
+        email, password = "bench.login@lnmiit.ac.in", "Quartz#Zebra91"
+        get_user_model().objects.create_user(email=email, username="bench.login", password=password)
+        payload = json.dumps({"email": email, "password": password})
+
+        def login_once():
+            started = time.perf_counter()
+            response = Client().post("/api/login", payload, content_type="application/json")
+            elapsed = time.perf_counter() - started
+            assert response.status_code == 200, response.content
+            return elapsed
+
+        cold = []
+        for _ in range(args.iterations):
+            clear_cache()
+            cold.append(login_once())
+
+        warm = [login_once() for _ in range(args.iterations)]
+
+    print(json.dumps({
+        "benchmark": "login_latency",
+        "cold": summarize(cold),
+        "warm": summarize(warm),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Users per second for password validation + hashing: the serial
+``set_password`` path against the batched process-pool path used by the
+bulk importer.
+
+    python -m benchmarks.password_hashing --users 2000
+"""
+import argparse
+import json
+import time
+
+from benchmarks import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from api.passwords import WORKERS, get_pool, hash_passwords, user_attributes
+
+    User = get_user_model()
+    users = [
+        User(email=f"bench{i}@lnmiit.ac.in", username=f"bench{i}", role="student")
+        for i in range(args.users)
+    ]
+    passwords = [f"Quartz#{i}Zebra" for i in range(args.users)]
+
+    started = time.perf_counter()
+    for user, password in zip(users, passwords):
+        user.set_password(password)
+    serial = time.perf_counter() - started
+
+    get_pool().submit(int).result()  # Exclude pool start-up from the timing
+    started = time.perf_counter()
+    results = hash_passwords((password, user_attributes(user)) for user, password in zip(users, passwords))
+    parallel = time.perf_counter() - started
+    assert all(hashed for hashed, _ in results)
+
+    print(json.dumps({
+        "benchmark": "password_hashing",
+        "users": args.users,
+        "workers": WORKERS,
+        "serial_users_per_second": round(args.users / serial, 1),
+        "parallel_users_per_second": round(args.users / parallel, 1),
+        "speedup": round(serial / parallel, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
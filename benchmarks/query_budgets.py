@@ -0,0 +1,342 @@
+"""
+Query-count and latency budgets for every route of the ``api`` and
+``instruments`` NinjaAPIs.
+
+Seeds a throwaway database at several sizes and calls each route once per
+size, reading its query count, DB time and cache calls from
+``api.instrumentation``. The run fails (exit status 1) when
+
+* a route goes over its declared query budget,
+* a list route makes more queries on the larger data set than on the
+  smaller one (an N+1: queries grow with the result size), or
+* a route has no case here, so new routes can't skip the check.
+
+Wall time is reported (the median of ``--repeat`` calls) for comparing
+commits, but not checked: it depends too much on the machine. The same
+checks run in the test suite, see ``QueryBudgetTests`` in ``api.tests``
+and ``intruments.tests``.
+
+    python -m benchmarks.query_budgets --sizes 5 50
+"""
+import argparse
+import io
+import itertools
+import json
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks import bench_database, setup_django
+
+# Routes without a case, and why
+SKIPPED = {
+    "POST api/auth/google-login": "needs a Google-signed ID token; see benchmarks.google_login",
+}
+
+
+class Case:
+    def __init__(self, method, path, budget, user="admin", scales=False, own_session=False, **kwargs):
+        """
+        ``path`` and ``kwargs`` may be callables taking the ``Seed`` so each
+        call can get fresh objects. ``scales`` marks routes whose result
+        grows with the data set; ``own_session`` gives each call a new login
+        (for routes that end it).
+        """
+        self.method = method
+        self.path = path
+        self.budget = budget
+        self.user = user
+        self.scales = scales
+        self.own_session = own_session
+        self.kwargs = kwargs
+
+    def request(self, client, seed):
+        path = self.path(seed) if callable(self.path) else self.path
+        kwargs = {name: value(seed) if callable(value) else value for name, value in self.kwargs.items()}
+        return getattr(client, self.method.lower())(path, **kwargs)
+
+
+class Seed:
+    """
+    Data for one size, plus factories for routes that consume objects.
+    """
+
+    def __init__(self, size, storage):
+        from django.contrib.auth import get_user_model
+        from django.core.files.base import ContentFile
+        from django.utils import timezone
+
+        from api.models import FacultyProfile, ImportJob, StudentProfile, UploadedFile
+        from intruments.models import Category, IssueRequest, Item, SubCategory
+
+        self._unique = itertools.count()
+        self.size = size
+        self.storage = storage
+        User = get_user_model()
+
+        self.admin = User.objects.filter(role="admin").first() or User.objects.create_user(
+            email="budget.admin@lnmiit.ac.in", username="budget.admin", password="x", role="admin", is_superuser=True,
+        )
+        for _ in range(size):
+            n = next(self._unique)
+            student = User.objects.create_user(
+                email=f"budget.s{size}.{n}@lnmiit.ac.in", username=f"budget.s{size}.{n}", password="x", role="student"
+            )
+            StudentProfile.objects.create(user=student, roll_number=f"b{size}ucs{n:04}", department="CSE")
+            faculty = User.objects.create_user(
+                email=f"budget.f{size}.{n}@lnmiit.ac.in", username=f"budget.f{size}.{n}", password="x", role="faculty"
+            )
+            FacultyProfile.objects.create(user=faculty, department="CSE")
+        self.student = student
+        self.faculty = faculty
+
+        self.path = f"budget_{size}.pdf"
+        from asgiref.sync import async_to_sync
+
+        async_to_sync(storage.aput)(self.path, ContentFile(b"%PDF budget" * 100), 1100, "application/pdf")
+        UploadedFile.objects.bulk_create(
+            UploadedFile(user=student if i % 2 else faculty, filename=f"budget{i}.pdf", size=1, cdn_url=self.path, year="2024")
+            for i in range(size)
+        )
+
+        self.category = Category.objects.create(name=f"budget {size}")
+        self.sub_category = SubCategory.objects.create(name="sub", category=self.category)
+        for _ in range(size):
+            self.item = self.new_item()
+            IssueRequest.objects.create(item=self.item, user=student, quantity=1, status="pending", remarks="")
+        self.job = ImportJob.objects.create(created_by=self.admin, filename="users.xlsx", payload=b"")
+        self.now = timezone.now()
+
+    def unique(self):
+        return next(self._unique)
+
+    def new_item(self):
+        from intruments.models import Item
+
+        n = self.unique()
+        return Item.objects.create(
+            category=self.category, sub_category=self.sub_category, name=f"Item {n}", serial_number=f"SN{n}",
+            cost=10, quantity=1000, gst_number="GST", buyer_name="Buyer", buyer_email="buyer@lnmiit.ac.in",
+            bill_number=f"B{n}",
+        )
+
+    def new_issue_request(self):
+        from intruments.models import IssueRequest
+
+        return IssueRequest.objects.create(item=self.item, user=self.student, quantity=1, status="pending", remarks="")
+
+    def items_csv(self):
+        """
+        A purchase order of ``size`` new items, half of them in a new
+        sub-category.
+        """
+        lines = ["category,sub_category,name,serial_number,bill_number,cost,quantity,gst_number,buyer_name,buyer_email"]
+        for i in range(self.size):
+            n = self.unique()
+            sub_category = self.sub_category.name if i % 2 else f"Imported {n // self.size}"
+            lines.append(f"{self.category.name},{sub_category},Imported {n},ISN{n},IB{n},10,3,GST,Buyer,buyer@lnmiit.ac.in")
+        return _named(io.BytesIO("\n".join(lines).encode()), "items.csv")
+
+    def pending_batch(self):
+        return json.dumps({"ids": [self.new_issue_request().id for _ in range(self.size)]})
+
+    def new_file(self):
+        from api.models import UploadedFile
+
+        return UploadedFile.objects.create(user=self.admin, filename="gone.pdf", size=1, cdn_url=None)
+
+    def item_body(self):
+        n = self.unique()
+        return json.dumps({
+            "category_id": self.category.id, "sub_category_id": self.sub_category.id, "name": f"New {n}",
+            "serial_number": f"NSN{n}", "cost": 1.5, "quantity": 5, "gst_number": "GST", "buyer_name": "Buyer",
+            "buyer_email": "buyer@lnmiit.ac.in", "purchase_date": "2024-01-01T00:00:00", "bill_number": f"NB{n}",
+        })
+
+    def local_url(self):
+        from asgiref.sync import async_to_sync
+
+        url = async_to_sync(self.storage.asign)([self.path])[self.path]
+        return url.replace("http://testserver", "")
+
+
+JSON = "application/json"
+PASSWORD = "Zebra#Quartz91"
+
+
+def cases():
+    """
+    Cases per NinjaAPI, keyed by its URL prefix.
+    """
+    return {"api/": [
+        # users and auth
+        Case("GET", "/api/users", 3, scales=True, data={"limit": 200}),
+        Case("POST", "/api/signup", 3, user=None, content_type=JSON,
+             data=lambda s: json.dumps({"email": f"new{s.unique()}@lnmiit.ac.in", "username": f"new{s.unique()}", "password": PASSWORD})),
+        Case("POST", "/api/login", 4, user=None, content_type=JSON,
+             data=lambda s: json.dumps({"email": s.student.email, "password": "x"})),
+        Case("POST", "/api/logout", 2, own_session=True),
+        Case("GET", "/api/auth/check", 1),
+        Case("POST", "/api/admin/create-user", 6, content_type=JSON,
+             data=lambda s: json.dumps({"email": f"made{s.unique()}@lnmiit.ac.in", "username": f"made{s.unique()}",
+                                        "password": PASSWORD, "role": "faculty", "department": "ECE"})),
+        Case("PUT", lambda s: f"/api/users/{s.faculty.id}/update", 6, content_type=JSON,
+             data=json.dumps({"username": "renamed", "department": "ME"})),
+        Case("GET", "/api/auth/full-detail", 1),
+        Case("GET", "/api/users/details", 2, scales=True,
+             data=lambda s: {"ids": ",".join(str(i) for i in range(1, 200))}),
+        Case("POST", "/api/admin/import-users", 2, data=lambda s: {"file": _named(io.BytesIO(b"x"), "users.xlsx")}),
+        Case("GET", lambda s: f"/api/admin/import-jobs/{s.job.id}", 2),
+        # files
+        Case("POST", "/api/save-file-meta", 2, content_type=JSON,
+             data=json.dumps({"filename": "meta.pdf", "size": 1, "cdn_url": "meta.pdf", "year": "2024"})),
+        Case("POST", "/api/upload", 6, data=lambda s: {"file": _named(io.BytesIO(b"%PDF" + str(s.unique()).encode()), "up.pdf")}),
+        Case("GET", "/api/uploaded-files", 2, scales=True, data={"limit": 200, "with_urls": "true"}),
+        Case("DELETE", lambda s: f"/api/uploaded-files/{s.new_file().id}/delete", 4),
+        Case("GET", lambda s: f"/api/get-signed-url/{s.path}", 1),
+        Case("POST", "/api/get-signed-urls", 2, user="student", content_type=JSON,
+             data=lambda s: json.dumps({"paths": [s.path, "missing.pdf"]})),
+        Case("GET", lambda s: f"/api/secure-stream?path={s.path}", 1),
+        Case("GET", lambda s: s.local_url(), 0, user=None),
+        Case("GET", "/api/admin/stream-cache", 1),
+        Case("POST", "/api/auth/google-signup", 4, user=None, content_type=JSON,
+             data=lambda s: json.dumps({"email": f"g{s.unique()}@lnmiit.ac.in", "password": PASSWORD})),
+    ], "instruments/": [
+        Case("GET", "/instruments/items", 1, scales=True),
+        Case("POST", "/instruments/items", 4, content_type=JSON, data=lambda s: s.item_body()),
+        Case("GET", "/instruments/items/search?q=item", 1, scales=True),
+        Case("POST", "/instruments/items/import", 8, scales=True, data=lambda s: {"file": s.items_csv()}),
+        Case("GET", lambda s: f"/instruments/items/{s.item.id}", 1),
+        Case("PUT", lambda s: f"/instruments/items/{s.new_item().id}", 5, content_type=JSON, data=lambda s: s.item_body()),
+        Case("DELETE", lambda s: f"/instruments/items/{s.new_item().id}", 6),
+        Case("POST", lambda s: f"/instruments/items/{s.item.id}/issue", 2, content_type=JSON, data=json.dumps({"quantity": 1})),
+        Case("GET", "/instruments/categories", 2, scales=True),
+        Case("POST", "/instruments/categories", 3, content_type=JSON,
+             data=lambda s: json.dumps({"name": f"Category {s.unique()}"})),
+        Case("GET", lambda s: f"/instruments/subcategories?category_id={s.category.id}", 2),
+        Case("POST", "/instruments/subcategories", 3, content_type=JSON,
+             data=lambda s: json.dumps({"name": f"Sub {s.unique()}", "category_id": s.category.id})),
+        Case("POST", "/instruments/issue-requests/", 5, content_type=JSON,
+             data=lambda s: json.dumps({"item_id": s.item.id, "quantity": 1, "remarks": ""})),
+        Case("GET", "/instruments/issue-requests/", 1, scales=True),
+        Case("POST", lambda s: f"/instruments/issue-requests/{s.new_issue_request().id}/approve", 5),
+        Case("POST", lambda s: f"/instruments/issue-requests/{s.new_issue_request().id}/reject", 2),
+        Case("POST", "/instruments/issue-requests/bulk-approve", 5, scales=True, content_type=JSON,
+             data=lambda s: s.pending_batch()),
+        Case("POST", "/instruments/issue-requests/bulk-reject", 3, scales=True, content_type=JSON,
+             data=lambda s: s.pending_batch()),
+    ]}
+
+
+def _named(file, name):
+    file.name = name
+    return file
+
+
+def all_routes(prefixes):
+    """
+    ``"<METHOD> <URL pattern>"`` for every operation of the NinjaAPIs
+    mounted at ``prefixes``, in the form ``api.instrumentation.route_stats``
+    records them in.
+    """
+    from django.urls import get_resolver
+
+    routes = set()
+    for include in get_resolver().url_patterns:
+        if str(include.pattern) not in prefixes:
+            continue
+        for pattern in include.url_patterns:
+            path_view = getattr(pattern.callback, "__self__", None)
+            for operation in getattr(path_view, "operations", ()):
+                for method in operation.methods:
+                    if method != "HEAD":
+                        routes.add(f"{method} {include.pattern}{pattern.pattern}")
+    return routes
+
+
+def measure(sizes, repeat=3, prefixes=("api/", "instruments/")):
+    """
+    Seed each size, call every case of the NinjaAPIs at ``prefixes`` and
+    check the budgets. Returns ``(results, failures)``. Writes to the
+    current database, so run it inside ``bench_database()`` or a test.
+    """
+    from django.test import Client, override_settings
+
+    from api import storage
+    from api.instrumentation import route_stats
+
+    routes = cases()
+    # Counted cache calls, and never the real Redis
+    caches = {"default": {"BACKEND": "api.instrumentation.InstrumentedLocMemCache"}}
+    results = {}
+    failures = []
+    with override_settings(CACHES=caches), tempfile.TemporaryDirectory() as root:
+        storage.set_storage(storage.LocalStorage(root=root, base_url="http://testserver/api/local-storage/"))
+        try:
+            for size in sorted(sizes):
+                seed = Seed(size, storage.get_storage())
+                clients = {None: Client(raise_request_exception=False)}
+                for role in ("admin", "faculty", "student"):
+                    clients[role] = Client(raise_request_exception=False)
+                    clients[role].force_login(getattr(seed, role))
+
+                for case in (case for prefix in prefixes for case in routes[prefix]):
+                    queries, cache_calls, db_ms, latencies, errors = [], [], [], [], set()
+                    for _ in range(repeat):
+                        client = clients[case.user]
+                        if case.own_session:
+                            client = Client(raise_request_exception=False)
+                            client.force_login(getattr(seed, case.user))
+                        route_stats.reset()
+                        started = time.perf_counter()
+                        response = case.request(client, seed)
+                        latencies.append((time.perf_counter() - started) * 1000)
+                        [(route, stats)] = route_stats.snapshot().items()
+                        if response.status_code >= 400:
+                            errors.add(response.status_code)
+                        queries.append(stats["queries"])
+                        cache_calls.append(stats["cache_calls"])
+                        db_ms.append(stats["db_seconds"] * 1000)
+                    failures += [f"{route}: status {status} at size {size}" for status in sorted(errors)]
+                    entry = results.setdefault(route, {"budget": case.budget, "scales": case.scales, "sizes": {}})
+                    entry["sizes"][size] = {
+                        "queries": max(queries),
+                        "cache_calls": max(cache_calls),
+                        "db_ms": round(statistics.median(db_ms), 2),
+                        "ms": round(statistics.median(latencies), 2),
+                    }
+        finally:
+            storage.set_storage(None)
+
+    for route, entry in sorted(results.items()):
+        sizes = entry["sizes"]
+        for size, measured in sizes.items():
+            if measured["queries"] > entry["budget"]:
+                failures.append(f"{route}: {measured['queries']} queries at size {size}, budget {entry['budget']}")
+        if entry["scales"]:
+            counts = [sizes[size]["queries"] for size in sorted(sizes)]
+            if counts[-1] > counts[0]:
+                failures.append(f"{route}: queries grow with result size {counts}")
+
+    missing = all_routes(prefixes) - set(results) - set(SKIPPED)
+    failures += [f"{route}: no budget case" for route in sorted(missing)]
+    return results, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 50])
+    parser.add_argument("--repeat", type=int, default=3, help="calls per route and size; wall time is the median")
+    args = parser.parse_args()
+
+    setup_django()
+    with bench_database():
+        results, failures = measure(args.sizes, args.repeat)
+
+    print(json.dumps({"benchmark": "query_budgets", "routes": results, "skipped": SKIPPED, "failures": failures}, indent=2))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Local stand-ins for the external services the backend talks to, so
+benchmarks run without network access.
+"""
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve(handler_class):
+    """
+    Run ``handler_class`` on an ephemeral localhost port in a background
+    thread and yield its base URL.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def cert_handler(certs, max_age=3600):
+    """
+    Handler class serving ``certs`` ({kid: pem}) like Google's v1 certs
+    endpoint, counting how many times it was hit.
+    """
+    import json
+
+    body = json.dumps(certs).encode()
+
+    class CertHandler(QuietHandler):
+        hits = 0
+
+        def do_GET(self):
+            type(self).hits += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", f"public, max-age={max_age}")
+            self.end_headers()
+            self.wfile.write(body)
+
+    return CertHandler
+
+
+def object_handler(size, chunk_size=64 * 1024, latency=0.05):
+    """
+    Handler class standing in for the storage object endpoint: GET and HEAD
+    on any path describe one ``size``-byte object after ``latency`` seconds.
+    Supports single ``Range`` requests, ``ETag``/``If-None-Match`` and tracks
+    the peak number of concurrent downloads.
+    """
+    import re
+    import time
+
+    body = bytes(i % 251 for i in range(size))
+    etag = f'"obj-{size}"'
+    lock = threading.Lock()
+
+    class ObjectHandler(QuietHandler):
+        in_flight = 0
+        peak_in_flight = 0
+        requests = 0
+
+        def _respond(self, send_body):
+            cls = type(self)
+            with lock:
+                cls.requests += 1
+                cls.in_flight += 1
+                cls.peak_in_flight = max(cls.peak_in_flight, cls.in_flight)
+            try:
+                time.sleep(latency)
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                start, end, status = 0, size - 1, 200
+                match = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+                if match:
+                    first, last = match.groups()
+                    if first:
+                        start, end = int(first), int(last) if last else size - 1
+                    else:
+                        start = max(0, size - int(last))
+                    end = min(end, size - 1)
+                    if start > end:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{size}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    status = 206
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/pdf")
+                self.send_header("Content-Length", str(end - start + 1))
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("ETag", etag)
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                self.end_headers()
+                if send_body:
+                    for offset in range(start, end + 1, chunk_size):
+                        self.wfile.write(body[offset:min(offset + chunk_size, end + 1)])
+            finally:
+                with lock:
+                    cls.in_flight -= 1
+
+        def do_GET(self):
+            self._respond(send_body=True)
+
+        def do_HEAD(self):
+            self._respond(send_body=False)
+
+    ObjectHandler.body = body
+    ObjectHandler.etag = etag
+    return ObjectHandler
+
+
+def sign_handler(bucket, latency=0.02):
+    """
+    Handler class standing in for the storage signing endpoints, both the
+    single-path and the bulk form, counting calls and signed paths.
+    """
+    import json
+    import time
+    from urllib.parse import unquote
+
+    prefix = f"/storage/v1/object/sign/{bucket}"
+
+    class SignHandler(QuietHandler):
+        calls = 0
+        signed = 0
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            cls = type(self)
+            data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(latency)
+            cls.calls += 1
+            if not self.path.startswith(prefix):
+                return self._send_json(404, {"error": "not found"})
+
+            def signed_url(path):
+                return f"/object/sign/{bucket}/{path}?token=t{cls.calls}"
+
+            if self.path == prefix:
+                cls.signed += len(data["paths"])
+                return self._send_json(200, [
+                    {"error": None, "path": path, "signedURL": signed_url(path)} for path in data["paths"]
+                ])
+            cls.signed += 1
+            return self._send_json(200, {"signedURL": signed_url(unquote(self.path[len(prefix) + 1:]))})
+
+    return SignHandler
+
+
+def upload_handler(bucket, fail_chunks=0, keep_on_failure=0):
+    """
+    Handler class standing in for the storage upload endpoints: the
+    single-request object upload, the TUS resumable protocol and the batch
+    delete. Bodies are
+    read in small pieces and only hashed, so the stand-in itself adds no
+    memory that grows with the upload. The first ``fail_chunks`` PATCH
+    requests are answered with a 500 to exercise resuming, after storing
+    the first ``keep_on_failure`` bytes of their chunk (a transfer cut off
+    mid-chunk).
+    """
+    import base64
+    import hashlib
+    import uuid
+
+    object_prefix = f"/storage/v1/object/{bucket}/"
+    resumable_prefix = "/storage/v1/upload/resumable"
+
+    class UploadHandler(QuietHandler):
+        objects = {}  # path -> (size, sha256 hex)
+        uploads = {}  # id -> state dict
+        failures_left = fail_chunks
+        patches = 0
+        patch_offsets = []
+
+        def _consume(self, hasher, limit=None):
+            """
+            Read the body, hashing its first ``limit`` bytes (all of it by
+            default); returns how many were hashed.
+            """
+            remaining = int(self.headers.get("Content-Length", 0))
+            kept = 0
+            while remaining:
+                piece = self.rfile.read(min(remaining, 64 * 1024))
+                if not piece:
+                    break
+                remaining -= len(piece)
+                if limit is not None:
+                    piece = piece[:limit - kept]
+                hasher.update(piece)
+                kept += len(piece)
+            return kept
+
+        def _reply(self, status, headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_POST(self):
+            cls = type(self)
+            if self.path.startswith(object_prefix):
+                hasher = hashlib.sha256()
+                size = self._consume(hasher)
+                cls.objects[self.path[len(object_prefix):]] = (size, hasher.hexdigest())
+                return self._reply(200)
+            if self.path == resumable_prefix:
+                metadata = dict(item.split(" ") for item in self.headers["Upload-Metadata"].split(","))
+                upload_id = uuid.uuid4().hex
+                cls.uploads[upload_id] = {
+                    "name": base64.b64decode(metadata["objectName"]).decode(),
+                    "length": int(self.headers["Upload-Length"]),
+                    "offset": 0,
+                    "hasher": hashlib.sha256(),
+                }
+                return self._reply(201, {"Location": f"{resumable_prefix}/{upload_id}", "Tus-Resumable": "1.0.0"})
+            self._reply(404)
+
+        def _upload(self):
+            return type(self).uploads.get(self.path.rsplit("/", 1)[-1])
+
+        def do_DELETE(self):
+            import json
+
+            if self.path != object_prefix.rstrip("/"):
+                return self._reply(404)
+            data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            for path in data["prefixes"]:
+                type(self).objects.pop(path, None)
+            self._reply(200)
+
+        def do_HEAD(self):
+            upload = self._upload()
+            if upload is None:
+                return self._reply(404)
+            self._reply(200, {"Upload-Offset": str(upload["offset"]), "Upload-Length": str(upload["length"])})
+
+        def do_PATCH(self):
+            cls = type(self)
+            upload = self._upload()
+            if upload is None:
+                return self._reply(404)
+            cls.patches += 1
+            cls.patch_offsets.append(int(self.headers["Upload-Offset"]))
+            if int(self.headers["Upload-Offset"]) != upload["offset"]:
+                self._consume(hashlib.sha256())
+                return self._reply(409)
+            if cls.failures_left:
+                cls.failures_left -= 1
+                upload["offset"] += self._consume(upload["hasher"], limit=keep_on_failure)
+                return self._reply(500)
+            upload["offset"] += self._consume(upload["hasher"])
+            if upload["offset"] >= upload["length"]:
+                cls.objects[upload["name"]] = (upload["offset"], upload["hasher"].hexdigest())
+            self._reply(204, {"Upload-Offset": str(upload["offset"]), "Tus-Resumable": "1.0.0"})
+
+    return UploadHandler
@@ -0,0 +1,64 @@
+"""
+Signing every row of a file listing: one /get-signed-url call per file
+versus a single /uploaded-files?with_urls=true, against a local stand-in for
+the storage signing endpoint.
+
+    python -m benchmarks.signed_urls --files 200
+"""
+import argparse
+import json
+import time
+
+from benchmarks import bench_database, clear_cache, setup_django
+from benchmarks.servers import serve, sign_handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=200, help="one /uploaded-files page, at most 200")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated storage latency (s)")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    from api import storage
+    from api.models import UploadedFile
+
+    handler = sign_handler("bench", latency=args.latency)
+    with bench_database(), serve(handler) as url:
+        storage.set_storage(storage.SupabaseStorage(url=url, key="bench", bucket="bench"))
+        user = get_user_model().objects.create_user(
+            email="bench.files@lnmiit.ac.in", username="bench.files", password="x", role="faculty"
+        )
+        UploadedFile.objects.bulk_create(
+            UploadedFile(user=user, filename=f"file{i}.pdf", size=1, cdn_url=f"{i}_file{i}.pdf")
+            for i in range(args.files)
+        )
+        client = Client()
+
+        results = {}
+        for name in ("per_row", "with_urls"):
+            clear_cache()
+            client.force_login(user)  # sessions live in the cache
+            handler.calls = 0
+            started = time.perf_counter()
+            if name == "per_row":
+                rows = client.get("/api/uploaded-files", {"limit": args.files}).json()["items"]
+                for row in rows:
+                    assert client.get(f"/api/get-signed-url/{row['cdn_url']}").status_code == 200
+            else:
+                rows = client.get("/api/uploaded-files", {"limit": args.files, "with_urls": "true"}).json()["items"]
+                assert all(row["signed_url"] for row in rows)
+            results[name] = {
+                "seconds": round(time.perf_counter() - started, 3),
+                "requests_to_api": 1 + (len(rows) if name == "per_row" else 0),
+                "storage_calls": handler.calls,
+            }
+
+    print(json.dumps({"benchmark": "signed_urls", "files": args.files, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Worker cold start: time for ``django.setup()`` and for loading the URLconf
+(which imports every API module), the memory those imports take, and a check
+that heavy dependencies only needed by a few code paths (pandas for imports,
+the Google auth library, the Supabase client) stay out of start-up.
+
+Each run is a fresh interpreter. Exits non-zero when the median of the runs
+goes over a budget, so it can gate CI:
+
+    python -m benchmarks.startup --runs 5 --max-setup-ms 750
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# About 2.5x the lazily importing tree (~300 ms, ~200 ms, ~40 MB); importing
+# pandas and the Google client at module level again (~750 ms, ~100 MB) fails.
+SETUP_BUDGET_MS = 750
+URLCONF_BUDGET_MS = 500
+IMPORT_MEMORY_BUDGET_MB = 70
+
+LAZY_MODULES = ("pandas", "numpy", "openpyxl", "google.auth", "supabase", "requests", "httpx")
+
+PROBE = """
+import json, resource, sys, time
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+before = rss_mb()
+start = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urlconf_done = time.perf_counter()
+print(json.dumps({
+    "setup_ms": (setup_done - start) * 1000,
+    "urlconf_ms": (urlconf_done - setup_done) * 1000,
+    "import_memory_mb": rss_mb() - before,
+    "modules": len(sys.modules),
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+
+def probe():
+    env = dict(os.environ)
+    env.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-setup-ms", type=float, default=SETUP_BUDGET_MS)
+    parser.add_argument("--max-urlconf-ms", type=float, default=URLCONF_BUDGET_MS)
+    parser.add_argument("--max-import-memory-mb", type=float, default=IMPORT_MEMORY_BUDGET_MB)
+    args = parser.parse_args()
+
+    runs = [probe() for _ in range(args.runs)]
+    results = {
+        name: round(statistics.median(run[name] for run in runs), 1)
+        for name in ("setup_ms", "urlconf_ms", "import_memory_mb", "modules")
+    }
+    loaded = sorted({name for run in runs for name in run["loaded"]})
+
+    failures = [
+        f"{name} {results[name]} > {budget}"
+        for name, budget in (
+            ("setup_ms", args.max_setup_ms),
+            ("urlconf_ms", args.max_urlconf_ms),
+            ("import_memory_mb", args.max_import_memory_mb),
+        )
+        if results[name] > budget
+    ]
+    failures += [f"{name} imported at start-up" for name in loaded]
+
+    print(json.dumps({
+        "benchmark": "startup",
+        "runs": args.runs,
+        **results,
+        "eagerly_loaded": loaded,
+        "failures": failures,
+    }, indent=2))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Stock decrements under contention: many threads, each with its own database
+connection, approving issue requests for the same item (every request sent
+more than once, so approvals also race each other) and issuing the item
+directly, against more demand than there is stock.
+
+Checks that no stock is lost or oversold - the final quantity equals the
+starting stock minus everything approved or issued, never below zero, and
+each request is approved at most once - and reports approvals per second.
+Exits non-zero if any check fails.
+
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python -m benchmarks.stock_contention \\
+        --stock 100 --requests 300 --threads 16
+
+Run it against Postgres (BENCH_DATABASE_URL) for real row-level contention;
+SQLite serializes writers, so there it mostly shows correctness.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+
+from benchmarks import bench_database, setup_django, summarize
+
+
+def hammer(session, calls, threads):
+    """
+    POST every ``(url, body)`` of ``calls`` from ``threads`` threads, each
+    with its own client and database connection. Returns the statuses, the
+    latencies and the elapsed time.
+    """
+    from django.conf import settings
+    from django.db import connection
+    from django.test import Client
+
+    pending = iter(calls)
+    lock = threading.Lock()
+    statuses, latencies = [], []
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        client = Client(raise_request_exception=False)
+        client.cookies[settings.SESSION_COOKIE_NAME] = session
+        barrier.wait()
+        try:
+            while True:
+                with lock:
+                    call = next(pending, None)
+                if call is None:
+                    return
+                url, body = call
+                started = time.perf_counter()
+                status = client.post(url, body, content_type="application/json").status_code
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    statuses.append(status)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return statuses, latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stock", type=int, default=100, help="starting quantity of the contended item")
+    parser.add_argument("--requests", type=int, default=300, help="pending issue requests for it")
+    parser.add_argument("--max-quantity", type=int, default=3, help="each request asks for 1..N units")
+    parser.add_argument("--duplicates", type=int, default=2, help="times each approval is sent")
+    parser.add_argument("--issues", type=int, default=300, help="direct /issue calls of one unit")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import Client
+
+    from intruments.models import Category, IssueRequest, Item, SubCategory
+
+    rng = random.Random(args.seed)
+    failures = []
+    with bench_database():
+        admin = get_user_model().objects.create_user(
+            email="bench.stock@lnmiit.ac.in", username="bench.stock", password="x", role="admin", is_superuser=True
+        )
+        client = Client()
+        client.force_login(admin)
+        session = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+        category = Category.objects.create(name="Contended")
+        sub_category = SubCategory.objects.create(name="Contended", category=category)
+
+        def new_item(serial):
+            return Item.objects.create(
+                category=category, sub_category=sub_category, name="Contended", serial_number=serial,
+                cost=1, quantity=args.stock, gst_number="GST", buyer_name="Buyer", buyer_email="buyer@lnmiit.ac.in",
+            )
+
+        # Approvals
+        item = new_item("approve")
+        requests = IssueRequest.objects.bulk_create(
+            IssueRequest(item=item, user=admin, quantity=rng.randint(1, args.max_quantity), remarks="")
+            for _ in range(args.requests)
+        )
+        calls = [(f"/instruments/issue-requests/{r.id}/approve", {}) for r in requests] * args.duplicates
+        rng.shuffle(calls)
+        statuses, latencies, elapsed = hammer(session, calls, args.threads)
+
+        item.refresh_from_db()
+        approved = IssueRequest.objects.filter(item=item, status="approved")
+        approved_quantity = sum(approved.values_list("quantity", flat=True))
+        approvals = statuses.count(200)
+        if item.quantity != args.stock - approved_quantity:
+            failures.append(f"approve: final stock {item.quantity}, expected {args.stock} - {approved_quantity}")
+        if approvals != approved.count():
+            failures.append(f"approve: {approvals} successful responses for {approved.count()} approved requests")
+        if IssueRequest.objects.filter(item=item, status="pending").exclude(quantity__gt=item.quantity).exists():
+            failures.append("approve: a request that fits the remaining stock was left pending")
+        errors = [status for status in statuses if status not in (200, 400)]
+        if errors:
+            failures.append(f"approve: unexpected statuses {sorted(set(errors))}")
+        approve_results = {
+            **summarize(latencies),
+            "approvals": approvals,
+            "approvals_per_second": round(approvals / elapsed, 1),
+            "requests_per_second": round(len(statuses) / elapsed, 1),
+            "final_stock": item.quantity,
+            "approved_quantity": approved_quantity,
+        }
+
+        # Direct issues
+        item = new_item("issue")
+        calls = [(f"/instruments/items/{item.id}/issue", {"quantity": 1})] * args.issues
+        statuses, latencies, elapsed = hammer(session, calls, args.threads)
+
+        item.refresh_from_db()
+        issued = statuses.count(200)
+        if issued != min(args.stock, args.issues) or item.quantity != args.stock - issued:
+            failures.append(f"issue: {issued} issued, final stock {item.quantity}, started with {args.stock}")
+        errors = [status for status in statuses if status not in (200, 400)]
+        if errors:
+            failures.append(f"issue: unexpected statuses {sorted(set(errors))}")
+        issue_results = {
+            **summarize(latencies),
+            "issued": issued,
+            "issues_per_second": round(issued / elapsed, 1),
+            "final_stock": item.quantity,
+        }
+
+    print(json.dumps({
+        "benchmark": "stock_contention",
+        "database": connection.vendor,
+        "stock": args.stock,
+        "requests": args.requests,
+        "duplicates": args.duplicates,
+        "threads": args.threads,
+        "approve": approve_results,
+        "issue": issue_results,
+        "failures": failures,
+    }, indent=2))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
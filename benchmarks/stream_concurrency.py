@@ -0,0 +1,105 @@
+"""
+Concurrent /secure-stream downloads handled by one worker: the ASGI app
+(async view, pooled httpx client) against the WSGI app, where a sync worker
+serves one request at a time. Storage is a local stand-in object server with
+artificial latency.
+
+Also samples event-loop lag while the ASGI streams run; anything above a few
+milliseconds means something in the request path is blocking the loop.
+
+    python -m benchmarks.stream_concurrency --concurrency 50 --size 1048576
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks import bench_database, setup_django
+from benchmarks.servers import object_handler, serve
+
+STREAM_PATH = "bench_file.pdf"
+
+
+async def _loop_lag_probe(stop, interval=0.005):
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - started - interval)
+    return worst
+
+
+async def _run_asgi(app, cookies, concurrency):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", cookies=cookies) as client:
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_loop_lag_probe(stop))
+
+        async def one():
+            response = await client.get("/api/secure-stream", params={"path": STREAM_PATH})
+            assert response.status_code == 200, response.text
+            return len(response.content)
+
+        started = time.perf_counter()
+        sizes = await asyncio.gather(*(one() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        return elapsed, sum(sizes), await probe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--size", type=int, default=1024 * 1024)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    from api import storage
+    from api.stream_cache import stream_cache
+
+    handler = object_handler(args.size, latency=args.latency)
+    with serve(handler) as object_url, bench_database():
+        storage.set_storage(storage.SupabaseStorage(url=object_url, key="bench", bucket="bench"))
+        stream_cache.max_bytes = 0  # measure the relay, not local cache hits
+        user = get_user_model().objects.create_user(
+            email="bench.stream@lnmiit.ac.in", username="bench.stream", password="Quartz#Zebra91"
+        )
+        client = Client()
+        client.force_login(user)
+        cookies = {name: morsel.value for name, morsel in client.cookies.items()}
+
+        started = time.perf_counter()
+        for _ in range(args.concurrency):
+            response = client.get("/api/secure-stream", {"path": STREAM_PATH})
+            assert response.status_code == 200
+            b"".join(response.streaming_content)
+        wsgi_elapsed = time.perf_counter() - started
+        wsgi_peak = handler.peak_in_flight
+
+        handler.peak_in_flight = 0
+        # The deployed entry point, including what it loads before serving
+        from backend1.asgi import application
+
+        asgi_elapsed, _, loop_lag = asyncio.run(_run_asgi(application, cookies, args.concurrency))
+
+    print(json.dumps({
+        "benchmark": "stream_concurrency",
+        "streams": args.concurrency,
+        "object_bytes": args.size,
+        "wsgi_streams_per_second": round(args.concurrency / wsgi_elapsed, 1),
+        "wsgi_peak_concurrent_streams": wsgi_peak,
+        "asgi_streams_per_second": round(args.concurrency / asgi_elapsed, 1),
+        "asgi_peak_concurrent_streams": handler.peak_in_flight,
+        "asgi_max_event_loop_lag_ms": round(loop_lag * 1000, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
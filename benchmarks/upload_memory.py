@@ -0,0 +1,95 @@
+"""
+Peak Python heap per upload when sending files to storage: reading the
+whole file into memory first (the old behaviour) versus streaming it from
+the spooled upload, against a local Supabase storage stand-in. Files above
+one resumable chunk (6 MB) go through the TUS resumable protocol.
+
+    python -m benchmarks.upload_memory --size-mb 100 --concurrency 4
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import time
+import tracemalloc
+
+from benchmarks import setup_django
+from benchmarks.servers import serve, upload_handler
+
+MB = 1024 * 1024
+
+
+def make_upload(name, size):
+    from django.core.files.uploadedfile import TemporaryUploadedFile
+
+    upload = TemporaryUploadedFile(name, "application/pdf", size, None)
+    hasher = hashlib.sha256()
+    block = bytes(range(256)) * (MB // 256)
+    written = 0
+    while written < size:
+        piece = block[:min(MB, size - written)]
+        upload.write(piece)
+        hasher.update(piece)
+        written += len(piece)
+    upload.seek(0)
+    return upload, hasher.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    setup_django()
+    from asgiref.sync import sync_to_async
+
+    from api import storage
+
+    async def whole_file(path, upload):
+        content = await sync_to_async(upload.read, thread_sensitive=False)()
+        return await backend.aput(path, io.BytesIO(content), upload.size, upload.content_type)
+
+    async def streamed(path, upload):
+        return await backend.aput(path, upload, upload.size, upload.content_type)
+
+    handler = upload_handler("bench")
+    results = {}
+    with serve(handler) as url:
+        backend = storage.SupabaseStorage(url=url, key="bench", bucket="bench")
+        for mode in (whole_file, streamed):
+            uploads = [make_upload(f"bench{i}.pdf", args.size_mb * MB) for i in range(args.concurrency)]
+
+            async def run():
+                return await asyncio.gather(*(
+                    mode(f"{mode.__name__}/{i}.pdf", upload) for i, (upload, _) in enumerate(uploads)
+                ))
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            paths = asyncio.run(run())
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            for path, (upload, digest) in zip(paths, uploads):
+                assert handler.objects[path] == (upload.size, digest), path
+                upload.close()
+            results[mode.__name__] = {
+                "peak_mb": round(peak / MB, 1),
+                "peak_mb_per_upload": round(peak / MB / args.concurrency, 1),
+                "seconds": round(elapsed, 2),
+            }
+
+    print(json.dumps({
+        "benchmark": "upload_memory",
+        "size_mb": args.size_mb,
+        "concurrency": args.concurrency,
+        "resumable": args.size_mb * MB > storage.RESUMABLE_CHUNK_SIZE,
+        **results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Gunicorn settings, read from the working directory:
+
+    gunicorn backend1.asgi:application -k uvicorn.workers.UvicornWorker
+
+Workers share one Prometheus metrics directory (see api.metrics); the default
+must match PROMETHEUS_MULTIPROC_DIR in backend1/settings.py.
+
+The master also runs ``manage.py run_import_worker`` next to the web workers,
+so queued /admin/import-users jobs are processed. Set IMPORT_WORKER=0 when
+the worker runs as its own service instead.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "backend_metrics")
+)
+
+
+def on_starting(server):
+    # Samples left by a previous run would be added to this one's
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def when_ready(server):
+    if os.environ.get("IMPORT_WORKER", "1") == "0":
+        return
+    server.import_worker = subprocess.Popen([sys.executable, "manage.py", "run_import_worker"])
+    server.log.info("Started import worker (pid %s)", server.import_worker.pid)
+
+
+def on_exit(server):
+    worker = getattr(server, "import_worker", None)
+    if worker is not None and worker.poll() is None:
+        # A job interrupted here is requeued by the next worker (api.import_jobs)
+        worker.terminate()
+        worker.wait(timeout=30)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,28 +1,123 @@
 from ninja import NinjaAPI
+from ninja.files import UploadedFile
 from django.contrib.auth import get_user_model
 from django.utils.timezone import make_aware
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
 from .models import Item, Category, SubCategory , IssueRequest
+from .search import MIN_QUERY_LENGTH, query_words, search_items
 from .schemas import (
-    ItemSchema, ItemIn,
+    ItemSchema, ItemIn, ItemPageSchema, ItemImportResultSchema, ItemSearchHitSchema,
     CategorySchema, SubCategorySchema,
-    CategoryIn, SubCategoryIn,IssueRequestIn,IssueRequestSchema
+    CategoryIn, SubCategoryIn,IssueRequestIn,IssueRequestSchema,
+    IssueRequestBulkIn, IssueRequestOutcomeSchema,
 )
 from django.shortcuts import get_object_or_404
+from api.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, clamp_limit, paginate_keyset
 import datetime
 
 api = NinjaAPI(urls_namespace="instruments")
 User = get_user_model()
 
+# Everything ItemSchema serializes (SubCategorySchema nests its category),
+# joined into the item query instead of loaded per row
+ITEM_RELATED = ("category", "sub_category__category")
+ISSUE_REQUEST_RELATED = (*(f"item__{name}" for name in ITEM_RELATED), "user")
+
+# Largest spreadsheet /items/import handles in one request. The byte limit
+# is checked first, so an oversized upload is never parsed.
+MAX_IMPORT_ROWS = 5000
+MAX_IMPORT_BYTES = 5 * 1024 * 1024
+
+# Issue-request decision outcomes, shared by the single and bulk routes
+NOT_FOUND = "Issue request not found."
+ALREADY_PROCESSED = "Request already processed."
+NOT_ENOUGH_STOCK = "Not enough quantity available."
+
+# Keyset orderings for /items, each ending in id so the order is total
+ITEM_SORTS = {
+    "name": ("name", "id"),
+    "-name": ("-name", "-id"),
+    "purchase_date": ("purchase_date", "id"),
+    "-purchase_date": ("-purchase_date", "-id"),
+    "cost": ("cost", "id"),
+    "-cost": ("-cost", "-id"),
+}
+
 # ──────── ITEM ROUTES ───────── #
 
+@api.post("/items/import", response=ItemImportResultSchema)
+def import_items(request, file: UploadedFile):
+    """
+    Create every valid line of a .csv or Excel purchase order. Categories
+    and sub-categories are matched by name (case-insensitively) and created
+    if missing; lines that fail validation or repeat an existing item are
+    reported by spreadsheet row instead of failing the whole file.
+
+    Registered before the /items/{item_id} routes, which would otherwise
+    match "import".
+    """
+    # pandas is only loaded by workers that actually import
+    from .item_import import REQUIRED_COLUMNS, import_items_frame, read_frame
+
+    if file.size > MAX_IMPORT_BYTES:
+        return api.create_response(
+            request, {"detail": f"At most {MAX_IMPORT_BYTES // (1024 * 1024)} MB per file"}, status=400
+        )
+    try:
+        df = read_frame(file)
+    except Exception:
+        return api.create_response(request, {"detail": "Could not read the file as CSV or Excel."}, status=400)
+    df.columns = df.columns.str.strip().str.lower()
+
+    missing = REQUIRED_COLUMNS - set(df.columns)
+    if missing:
+        return api.create_response(
+            request, {"detail": f"Missing required columns: {', '.join(sorted(missing))}"}, status=400
+        )
+    if len(df) > MAX_IMPORT_ROWS:
+        return api.create_response(request, {"detail": f"At most {MAX_IMPORT_ROWS} rows per file"}, status=400)
+
+    success, failed, created = import_items_frame(df)
+    return {
+        "success_count": success,
+        "created_categories": created["categories"],
+        "created_sub_categories": created["sub_categories"],
+        "failed": failed,
+    }
+
+@api.get("/items/search", response=list[ItemSearchHitSchema])
+def search_inventory(
+    request,
+    q: str,
+    category: int = None,
+    subcategory: int = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+):
+    """
+    Best matches for ``q`` in item names, serial numbers, buyers, GST
+    numbers and remarks, by prefix and tolerating typos, highest rank
+    first. Also registered ahead of /items/{item_id}.
+    """
+    # Shorter words only narrow a search; they can't be matched on their own
+    if max(map(len, query_words(q)), default=0) < MIN_QUERY_LENGTH:
+        return api.create_response(
+            request, {"detail": f"q needs a word of at least {MIN_QUERY_LENGTH} characters"}, status=400
+        )
+    items = Item.objects.select_related(*ITEM_RELATED)
+    if category:
+        items = items.filter(category_id=category)
+    if subcategory:
+        items = items.filter(sub_category_id=subcategory)
+    return search_items(items, q)[:clamp_limit(limit)]
+
 @api.get("/items/{item_id}", response=ItemSchema)
 def get_item(request, item_id: int):
     """
     View details of a single item.
     """
     try:
-        item = Item.objects.get(id=item_id)
+        item = Item.objects.select_related(*ITEM_RELATED).get(id=item_id)
         return item
     except Item.DoesNotExist:
         return api.create_response(request, {"detail": "Item not found"}, status=404)
@@ -87,35 +182,60 @@ from ninja import Schema
 class ItemIssueRequest(Schema):
     quantity: int
 
+def _take_stock(item_id, quantity):
+    """
+    Atomically remove ``quantity`` units of an item if that many are in
+    stock. A single conditional UPDATE: concurrent callers can't both pass
+    the check or overwrite each other's decrement, and only the quantity
+    column is written. Returns whether the stock was taken.
+    """
+    return bool(
+        Item.objects.filter(id=item_id, quantity__gte=quantity).update(quantity=F("quantity") - quantity)
+    )
+
+
 @api.post("/items/{item_id}/issue", response=ItemSchema)
 def issue_item(request, item_id: int, data: ItemIssueRequest):
     """
     Deducts the issued quantity from the item's quantity.
     """
-    try:
-        item = Item.objects.get(id=item_id)
-        available = int(item.quantity)
-        requested = int(data.quantity)
-        if requested <= 0:
-            return api.create_response(request, {"detail": "Quantity must be greater than 0."}, status=400)
-        if requested > available:
-            return api.create_response(request, {"detail": "You can't issue more than available quantity."}, status=400)
-        item.quantity = str(available - requested)
-        item.save()
-        return item
-    except Item.DoesNotExist:
-        return api.create_response(request, {"detail": "Item not found"}, status=404)
-    except Exception as e:
-        return api.create_response(request, {"detail": f"Error: {str(e)}"}, status=500)
+    requested = int(data.quantity)
+    if requested <= 0:
+        return api.create_response(request, {"detail": "Quantity must be greater than 0."}, status=400)
+    if not _take_stock(item_id, requested):
+        if not Item.objects.filter(id=item_id).exists():
+            return api.create_response(request, {"detail": "Item not found"}, status=404)
+        return api.create_response(request, {"detail": "You can't issue more than available quantity."}, status=400)
+    return Item.objects.select_related(*ITEM_RELATED).get(id=item_id)
+
+@api.get("/items", response=ItemPageSchema)
+def list_items(
+    request,
+    category: int = None,
+    subcategory: int = None,
+    sort: str = "name",
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+):
+    """
+    Keyset-paginated inventory. ``sort`` is name, purchase_date or cost,
+    prefixed with ``-`` for descending order. Pass the returned
+    ``next_cursor`` back as ``cursor`` (with the same filters and sort) to
+    fetch the next page.
+    """
+    if sort not in ITEM_SORTS:
+        return api.create_response(
+            request, {"detail": f"sort must be one of: {', '.join(ITEM_SORTS)}"}, status=400
+        )
 
-@api.get("/items", response=list[ItemSchema])
-def list_items(request, category: int = None, subcategory: int = None):
-    items = Item.objects.all()
+    items = Item.objects.select_related(*ITEM_RELATED)
     if category:
         items = items.filter(category_id=category)
     if subcategory:
         items = items.filter(sub_category_id=subcategory)
-    return items
+
+    rows, next_cursor = paginate_keyset(items, ITEM_SORTS[sort], cursor=cursor, limit=limit)
+    return {"items": rows, "next_cursor": next_cursor}
 
 @api.post("/items", response=ItemSchema)
 def create_item(request, item: ItemIn):
@@ -220,7 +340,7 @@ def create_issue_request(request, data: IssueRequestIn):
 
 @api.get("/issue-requests/", response=list[IssueRequestSchema])
 def list_issue_requests(request, status: str = None):
-    qs = IssueRequest.objects.select_related("item", "user")
+    qs = IssueRequest.objects.select_related(*ISSUE_REQUEST_RELATED)
     if status:
         qs = qs.filter(status=status)
     return qs
@@ -230,26 +350,125 @@ def approve_issue_request(request, request_id: int):
     """
     Admin approves an issue request and decreases item quantity.
     """
-    issue_request = get_object_or_404(IssueRequest, id=request_id)
-    if issue_request.status != 'pending':
-        return api.create_response(request, {"detail": "Request already processed."}, status=400)
-    item = issue_request.item
-    if issue_request.quantity > int(item.quantity):  # <--- STOCK CHECK IS HERE
-        return api.create_response(request, {"detail": "Not enough quantity available."}, status=400)
-    item.quantity = str(int(item.quantity) - issue_request.quantity)
-    item.save()
-    issue_request.status = 'approved'
-    issue_request.save()
-    return issue_request
+    issue_request = get_object_or_404(IssueRequest.objects.only("item", "quantity"), id=request_id)
+    # The status change and the decrement commit together or not at all;
+    # both are conditional, so of two concurrent approvals only one passes
+    # and stock never goes below zero.
+    with transaction.atomic():
+        if not _decide(request_id, "approved"):
+            return api.create_response(request, {"detail": ALREADY_PROCESSED}, status=400)
+        if not _take_stock(issue_request.item_id, issue_request.quantity):
+            transaction.set_rollback(True)
+            return api.create_response(request, {"detail": NOT_ENOUGH_STOCK}, status=400)
+    return _issue_request_with_item(request_id)
 
 @api.post("/issue-requests/{request_id}/reject", response=IssueRequestSchema)
 def reject_issue_request(request, request_id: int):
     """
     Admin rejects an issue request.
     """
-    issue_request = get_object_or_404(IssueRequest, id=request_id)
-    if issue_request.status != 'pending':
-        return api.create_response(request, {"detail": "Request already processed."}, status=400)
-    issue_request.status = 'rejected'
-    issue_request.save()
-    return issue_request
\ No newline at end of file
+    if not _decide(request_id, "rejected"):
+        get_object_or_404(IssueRequest.objects.only("id"), id=request_id)
+        return api.create_response(request, {"detail": ALREADY_PROCESSED}, status=400)
+    return _issue_request_with_item(request_id)
+
+def _decide(request_id, status):
+    """
+    Move a pending request to ``status``; False if it was already decided,
+    possibly by a concurrent approval or rejection.
+    """
+    return bool(IssueRequest.objects.filter(id=request_id, status="pending").update(status=status))
+
+def _issue_request_with_item(request_id):
+    return IssueRequest.objects.select_related(*ISSUE_REQUEST_RELATED).get(id=request_id)
+
+
+# ──────── BULK DECISIONS ───────── #
+
+@api.post("/issue-requests/bulk-approve", response=list[IssueRequestOutcomeSchema])
+def bulk_approve_issue_requests(request, data: IssueRequestBulkIn):
+    """
+    Approve up to MAX_PAGE_SIZE requests at once, in the order given: a
+    request is approved if it is pending and its item still has enough
+    stock after the requests before it. One transaction locks the requests
+    and their items, then applies every status change and every item's
+    total decrement in one UPDATE each. Returns an outcome per id.
+    """
+    ids = list(dict.fromkeys(data.ids))
+    if len(ids) > MAX_PAGE_SIZE:
+        return api.create_response(request, {"detail": f"At most {MAX_PAGE_SIZE} ids per request"}, status=400)
+
+    with transaction.atomic():
+        found = _lock_issue_requests(ids)
+        pending = [row for row in found.values() if row["status"] == "pending"]
+        # Items are locked in id order so concurrent bulk approvals can't deadlock
+        stock = dict(
+            Item.objects.select_for_update()
+            .filter(id__in={row["item_id"] for row in pending})
+            .order_by("id")
+            .values_list("id", "quantity")
+        )
+
+        approved, taken = [], {}
+        for request_id in ids:
+            row = found.get(request_id)
+            if row is None or row["status"] != "pending" or row["quantity"] > stock[row["item_id"]]:
+                continue
+            stock[row["item_id"]] -= row["quantity"]
+            taken[row["item_id"]] = taken.get(row["item_id"], 0) + row["quantity"]
+            approved.append(request_id)
+            row["status"] = "approved"
+
+        if approved:
+            IssueRequest.objects.filter(id__in=approved).update(status="approved")
+            Item.objects.filter(id__in=taken).update(
+                quantity=F("quantity") - Case(*(When(id=item_id, then=Value(n)) for item_id, n in taken.items()))
+            )
+
+    return _outcomes(ids, found, set(approved), NOT_ENOUGH_STOCK)
+
+@api.post("/issue-requests/bulk-reject", response=list[IssueRequestOutcomeSchema])
+def bulk_reject_issue_requests(request, data: IssueRequestBulkIn):
+    """
+    Reject up to MAX_PAGE_SIZE pending requests at once. Returns an outcome
+    per id.
+    """
+    ids = list(dict.fromkeys(data.ids))
+    if len(ids) > MAX_PAGE_SIZE:
+        return api.create_response(request, {"detail": f"At most {MAX_PAGE_SIZE} ids per request"}, status=400)
+
+    with transaction.atomic():
+        found = _lock_issue_requests(ids)
+        rejected = [request_id for request_id, row in found.items() if row["status"] == "pending"]
+        if rejected:
+            IssueRequest.objects.filter(id__in=rejected).update(status="rejected")
+        for request_id in rejected:
+            found[request_id]["status"] = "rejected"
+
+    return _outcomes(ids, found, set(rejected), None)
+
+def _lock_issue_requests(ids):
+    """
+    ``id -> {status, item_id, quantity}`` for the requests that exist,
+    locked until the end of the transaction.
+    """
+    rows = (
+        IssueRequest.objects.select_for_update()
+        .filter(id__in=ids)
+        .order_by("id")
+        .values("id", "status", "item_id", "quantity")
+    )
+    return {row["id"]: row for row in rows}
+
+def _outcomes(ids, found, done, pending_detail):
+    outcomes = []
+    for request_id in ids:
+        row = found.get(request_id)
+        if row is None:
+            outcomes.append({"id": request_id, "ok": False, "detail": NOT_FOUND})
+        elif request_id in done:
+            outcomes.append({"id": request_id, "ok": True, "status": row["status"]})
+        else:
+            detail = pending_detail if row["status"] == "pending" else ALREADY_PROCESSED
+            outcomes.append({"id": request_id, "ok": False, "status": row["status"], "detail": detail})
+    return outcomes
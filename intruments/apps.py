@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class IntrumentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'intruments'
+
+    def ready(self):
+        from . import search  # noqa: F401  (registers the search index check)
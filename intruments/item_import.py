@@ -0,0 +1,265 @@
+"""
+Set-based inventory import used by ``/items/import``.
+
+Rows are validated column-wise, category and sub-category names are
+resolved (and missing ones created) with one query each, duplicate
+``unique_item_group`` keys are found inside the file and against the
+database with one query, and the remaining items are written with
+``bulk_create`` in chunked transactions.
+"""
+import io
+from decimal import Decimal
+
+import pandas as pd
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .models import Category, Item, SubCategory
+
+REQUIRED_COLUMNS = {
+    "category", "sub_category", "name", "serial_number", "cost", "quantity",
+    "gst_number", "buyer_name", "buyer_email",
+}
+OPTIONAL_COLUMNS = ("purchase_date", "bill_number", "remarks")
+MAX_LENGTHS = {
+    "category": 50, "sub_category": 50, "name": 100, "serial_number": 100,
+    "gst_number": 15, "buyer_name": 100, "bill_number": 50,
+}
+# DecimalField(max_digits=12, decimal_places=2)
+MAX_COST = Decimal("9999999999.99")
+IMPORT_CHUNK_SIZE = 500
+UNIQUE_KEY = ["category_id", "sub_category_id", "serial_number", "bill_number"]
+
+
+def read_frame(file):
+    """
+    Parse an uploaded .csv or Excel file with every cell as a string.
+    """
+    content = io.BytesIO(file.read())
+    if (file.name or "").lower().endswith(".csv"):
+        return pd.read_csv(content, dtype=str, keep_default_na=False)
+    return pd.read_excel(content, dtype=str, engine="openpyxl")
+
+
+def normalize_frame(df):
+    df = df.copy()
+    df.columns = df.columns.str.strip().str.lower()
+    for column in OPTIONAL_COLUMNS:
+        if column not in df.columns:
+            df[column] = ""
+    df = df.fillna("")
+    for column in (*REQUIRED_COLUMNS, *OPTIONAL_COLUMNS):
+        df[column] = df[column].astype(str).str.strip()
+    df["buyer_email"] = df["buyer_email"].str.lower()
+
+    df["cost"] = pd.to_numeric(df["cost"], errors="coerce").round(2)
+    df["quantity"] = pd.to_numeric(df["quantity"], errors="coerce")
+    # The text is kept to tell blank dates (default to now) from invalid ones
+    df["purchase_date_text"] = df["purchase_date"]
+    df["purchase_date"] = pd.to_datetime(df["purchase_date"].replace("", None), errors="coerce", format="mixed")
+    return df
+
+
+def _flag(errors, mask, message):
+    # Only the first failing check is reported for a row
+    errors[mask & errors.isna()] = message
+
+
+def _is_email(value):
+    try:
+        validate_email(value)
+        return True
+    except ValidationError:
+        return False
+
+
+def validate_frame(df):
+    """
+    Return a Series (aligned with ``df``) holding the first validation error
+    for each row, or NaN for rows that can be inserted.
+    """
+    errors = pd.Series(pd.NA, index=df.index, dtype="object")
+
+    for column in sorted(REQUIRED_COLUMNS - {"cost", "quantity"}):
+        _flag(errors, df[column] == "", f"{column} is required")
+    for column, limit in MAX_LENGTHS.items():
+        _flag(errors, df[column].str.len() > limit, f"{column} is longer than {limit} characters")
+    _flag(errors, ~((df["cost"] > 0) & (df["cost"] <= float(MAX_COST))), "cost must be a number greater than 0")
+    _flag(
+        errors,
+        ~((df["quantity"] >= 0) & (df["quantity"] % 1 == 0)),
+        "quantity must be a whole number of at least 0",
+    )
+    _flag(errors, df["purchase_date"].isna() & (df["purchase_date_text"] != ""), "purchase_date is not a valid date")
+    _flag(errors, ~df["buyer_email"].map(_is_email), "buyer_email is not a valid email")
+    return errors
+
+
+def _resolve_categories(df):
+    """
+    Map every row to a category id by case-insensitive name, creating the
+    missing categories. Returns ``(ids, created_count)``.
+    """
+    names = df.groupby(df["category"].str.lower())["category"].first()
+
+    def existing():
+        rows = Category.objects.annotate(key=Lower("name")).filter(key__in=names.index.tolist())
+        return dict(rows.values_list("key", "id"))
+
+    ids = existing()
+    missing = [names[key] for key in names.index if key not in ids]
+    if missing:
+        # A concurrent import may create the same names; keep whichever won
+        Category.objects.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+        ids = existing()
+    # Counted from the re-query: ignore_conflicts silently drops rows
+    created = sum(name.lower() in ids for name in missing)
+    return df["category"].str.lower().map(ids), created
+
+
+def _resolve_sub_categories(df):
+    """
+    Same for sub-categories, which are unique by name within a category.
+    """
+    keys = pd.Series(list(zip(df["category_id"], df["sub_category"].str.lower())), index=df.index)
+    names = df["sub_category"].groupby(keys).first()
+
+    def existing():
+        rows = SubCategory.objects.annotate(key=Lower("name")).filter(
+            category_id__in={category_id for category_id, _ in names.index},
+            key__in={key for _, key in names.index},
+        )
+        return {(category_id, key): id for category_id, key, id in rows.values_list("category_id", "key", "id")}
+
+    ids = existing()
+    missing = [key for key in names.index if key not in ids]
+    if missing:
+        SubCategory.objects.bulk_create(
+            [SubCategory(category_id=category_id, name=names[(category_id, key)]) for category_id, key in missing],
+            ignore_conflicts=True,
+        )
+        ids = existing()
+    created = sum(key in ids for key in missing)
+    return keys.map(ids), created
+
+
+def _drop_unresolved(df, column, errors, message):
+    # Names the re-query didn't find (their insert was dropped) fail the row
+    unresolved = df[column].isna()
+    _flag(errors, unresolved.reindex(errors.index, fill_value=False), message)
+    return df[~unresolved].copy()
+
+
+def flag_duplicates(df, errors):
+    """
+    Flag rows whose ``unique_item_group`` key repeats an earlier row or an
+    existing item. Like the constraint, rows without a bill number never
+    collide (NULLs are distinct).
+    """
+    def flag(mask, message):
+        _flag(errors, mask.reindex(errors.index, fill_value=False), message)
+
+    keyed = df["bill_number"] != ""
+    flag(keyed & df.duplicated(subset=UNIQUE_KEY), "Duplicate item in file")
+
+    candidates = df[keyed & errors[df.index].isna()]
+    if candidates.empty:
+        return
+    existing = set(
+        Item.objects.filter(
+            category_id__in=candidates["category_id"].unique().tolist(),
+            serial_number__in=candidates["serial_number"].unique().tolist(),
+            bill_number__in=candidates["bill_number"].unique().tolist(),
+        ).values_list(*UNIQUE_KEY)
+    )
+    in_db = pd.Series([key in existing for key in candidates[UNIQUE_KEY].itertuples(index=False, name=None)],
+                      index=candidates.index, dtype=bool)
+    flag(in_db, "Item already exists")
+
+
+def build_item(row, now):
+    purchase_date = row["purchase_date"]
+    if pd.isna(purchase_date):
+        purchase_date = now
+    else:
+        purchase_date = purchase_date.to_pydatetime()
+        if timezone.is_naive(purchase_date):
+            purchase_date = timezone.make_aware(purchase_date)
+    return Item(
+        category_id=int(row["category_id"]),
+        sub_category_id=int(row["sub_category_id"]),
+        name=row["name"],
+        serial_number=row["serial_number"],
+        cost=Decimal(str(row["cost"])),
+        quantity=int(row["quantity"]),
+        gst_number=row["gst_number"],
+        buyer_name=row["buyer_name"],
+        buyer_email=row["buyer_email"],
+        purchase_date=purchase_date,
+        bill_number=row["bill_number"] or None,
+        remarks=row["remarks"],
+    )
+
+
+def _insert_rows_individually(items, row_numbers, failed):
+    """
+    Fallback for a chunk that hit a constraint (e.g. a concurrent import):
+    retry row by row so the failure report still points at the bad rows.
+    """
+    success = 0
+    for item, row_number in zip(items, row_numbers):
+        item.pk = None
+        try:
+            with transaction.atomic():
+                item.save(force_insert=True)
+            success += 1
+        except IntegrityError:
+            failed.append({"row": row_number, "error": "Item already exists"})
+    return success
+
+
+def import_items_frame(df, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Import every valid row of ``df``.
+
+    Returns ``(success_count, failed, created)`` where ``failed`` is a list
+    of ``{"row": <spreadsheet row>, "error": <message>}`` dicts and
+    ``created`` counts the categories and sub-categories that were added.
+    """
+    df = normalize_frame(df)
+    errors = validate_frame(df)
+
+    # Only rows that passed validation create categories
+    valid = df[errors.isna()].copy()
+    created = {"categories": 0, "sub_categories": 0}
+    if not valid.empty:
+        valid["category_id"], created["categories"] = _resolve_categories(valid)
+        valid = _drop_unresolved(valid, "category_id", errors, "category could not be created")
+        valid["sub_category_id"], created["sub_categories"] = _resolve_sub_categories(valid)
+        valid = _drop_unresolved(valid, "sub_category_id", errors, "sub_category could not be created")
+        flag_duplicates(valid, errors)
+
+    success = 0
+    failed = [
+        {"row": int(index) + 2, "error": error}
+        for index, error in errors.items() if isinstance(error, str)
+    ]
+    now = timezone.now()
+    ready = valid[errors[valid.index].isna()]
+    rows = ready.to_dict("records")
+    row_numbers = [int(index) + 2 for index in ready.index]
+    for start in range(0, len(rows), chunk_size):
+        items = [build_item(row, now) for row in rows[start:start + chunk_size]]
+        numbers = row_numbers[start:start + chunk_size]
+        try:
+            with transaction.atomic():
+                Item.objects.bulk_create(items)
+            success += len(items)
+        except IntegrityError:
+            success += _insert_rows_individually(items, numbers, failed)
+
+    failed.sort(key=lambda f: f["row"])
+    return success, failed, created
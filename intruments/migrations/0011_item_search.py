@@ -0,0 +1,77 @@
+"""
+Search index for /items/search (see intruments/search.py).
+
+Backend-specific, so it is raw SQL chosen at migration time:
+
+* PostgreSQL: pg_trgm plus two GIN expression indexes. The expressions must
+  match PG_DOCUMENT / PG_VECTOR in intruments/search.py exactly.
+* SQLite: an external-content FTS5 table over intruments_item, kept in sync
+  by triggers. Django rebuilds a SQLite table (dropping its triggers) when a
+  later migration alters intruments_item in ways SQLite can't do in place;
+  such a migration has to recreate them (the intruments.W001 system check
+  reports them missing).
+"""
+from django.db import migrations
+
+DOCUMENT = (
+    "(name || ' ' || serial_number || ' ' || buyer_name || ' ' || gst_number"
+    " || ' ' || coalesce(remarks, ''))"
+)
+
+POSTGRES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX item_search_tsv_idx ON intruments_item USING gin (to_tsvector('simple'::regconfig, {DOCUMENT}))",
+    f"CREATE INDEX item_search_trgm_idx ON intruments_item USING gin (lower({DOCUMENT}) gin_trgm_ops)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS item_search_trgm_idx",
+    "DROP INDEX IF EXISTS item_search_tsv_idx",
+]
+
+COLUMNS = "name, serial_number, buyer_name, gst_number, remarks"
+SQLITE = [
+    f"CREATE VIRTUAL TABLE intruments_item_search USING fts5({COLUMNS}, "
+    "content='intruments_item', content_rowid='id', tokenize='trigram')",
+    f"""CREATE TRIGGER intruments_item_search_insert AFTER INSERT ON intruments_item BEGIN
+        INSERT INTO intruments_item_search(rowid, {COLUMNS})
+        VALUES (new.id, new.name, new.serial_number, new.buyer_name, new.gst_number, new.remarks);
+    END""",
+    f"""CREATE TRIGGER intruments_item_search_delete AFTER DELETE ON intruments_item BEGIN
+        INSERT INTO intruments_item_search(intruments_item_search, rowid, {COLUMNS})
+        VALUES ('delete', old.id, old.name, old.serial_number, old.buyer_name, old.gst_number, old.remarks);
+    END""",
+    f"""CREATE TRIGGER intruments_item_search_update AFTER UPDATE OF {COLUMNS} ON intruments_item BEGIN
+        INSERT INTO intruments_item_search(intruments_item_search, rowid, {COLUMNS})
+        VALUES ('delete', old.id, old.name, old.serial_number, old.buyer_name, old.gst_number, old.remarks);
+        INSERT INTO intruments_item_search(rowid, {COLUMNS})
+        VALUES (new.id, new.name, new.serial_number, new.buyer_name, new.gst_number, new.remarks);
+    END""",
+    "INSERT INTO intruments_item_search(intruments_item_search) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS intruments_item_search_update",
+    "DROP TRIGGER IF EXISTS intruments_item_search_delete",
+    "DROP TRIGGER IF EXISTS intruments_item_search_insert",
+    "DROP TABLE IF EXISTS intruments_item_search",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intruments', '0010_item_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"postgresql": POSTGRES, "sqlite": SQLITE}),
+            _run({"postgresql": POSTGRES_REVERSE, "sqlite": SQLITE_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 05:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intruments', '0011_item_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['category', 'name', 'id'], name='item_category_only_name_idx'),
+        ),
+    ]
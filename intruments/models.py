@@ -43,6 +43,16 @@ class Item(models.Model):
                 name='unique_item_group'
             )
         ]
+        indexes = [
+            # Back the category/subcategory filters of /items together with
+            # its default keyset order (category alone skips sub_category),
+            # and each sort on its own
+            models.Index(fields=['category', 'sub_category', 'name', 'id'], name='item_category_name_idx'),
+            models.Index(fields=['category', 'name', 'id'], name='item_category_only_name_idx'),
+            models.Index(fields=['name', 'id'], name='item_name_id_idx'),
+            models.Index(fields=['purchase_date', 'id'], name='item_purchase_date_id_idx'),
+            models.Index(fields=['cost', 'id'], name='item_cost_id_idx'),
+        ]
     
 class IssueRequest(models.Model):
     item = models.ForeignKey('Item', on_delete=models.CASCADE)
@@ -78,7 +78,8 @@
 from ninja import ModelSchema, Schema
 from pydantic import BaseModel, Field, EmailStr
 from .models import Item,IssueRequest
-from typing import Optional
+from api.schemas import FailedRow
+from typing import List, Optional
 import datetime
 # ✅ Item schema (used for both input and output)
 
@@ -126,6 +127,17 @@ class ItemSchema(BaseModel):
         from_attributes = True  # ✅ Required for Django ORM
 
 
+# ✅ One keyset page of /items
+class ItemPageSchema(BaseModel):
+    items: List[ItemSchema]
+    next_cursor: Optional[str] = None
+
+
+# ✅ An /items/search match; higher rank is a better match
+class ItemSearchHitSchema(ItemSchema):
+    rank: float
+
+
 class ItemIn(BaseModel):
     category_id: int
     sub_category_id: int
@@ -141,6 +153,14 @@ class ItemIn(BaseModel):
     remarks: Optional[str] = Field(default="")
 
 
+# ✅ Result of /items/import; rows are spreadsheet row numbers
+class ItemImportResultSchema(Schema):
+    success_count: int
+    created_categories: int
+    created_sub_categories: int
+    failed: List[FailedRow]
+
+
 class IssueRequestIn(Schema):
     item_id: int
     quantity: int
@@ -158,4 +178,16 @@ class IssueRequestSchema(Schema):
     quantity: int
     status: str
     created_at: datetime.datetime
-    remarks: str = None
\ No newline at end of file
+    remarks: str = None
+
+
+class IssueRequestBulkIn(Schema):
+    ids: List[int]
+
+
+# ✅ What happened to one id of a bulk approve/reject; status is None if it doesn't exist
+class IssueRequestOutcomeSchema(Schema):
+    id: int
+    ok: bool
+    status: Optional[str] = None
+    detail: Optional[str] = None
@@ -0,0 +1,159 @@
+"""
+Ranked, typo-tolerant search over the text fields of ``Item``, used by
+``/items/search``.
+
+The index lives in the database, so every write path (``save``,
+``bulk_create``, queryset ``update``, deletes) keeps it current without
+signals. Migration 0011 creates it per backend:
+
+* PostgreSQL: GIN indexes on ``to_tsvector`` of the searched text (word and
+  prefix matches, ranked by ``ts_rank``) and, through ``pg_trgm``, on its
+  lower-cased trigrams (misspellings, via word similarity);
+* SQLite (local runs): an FTS5 table with the trigram tokenizer, kept in
+  sync by triggers. Longer query words match on either half, so one typo
+  still matches; results are ranked by ``bm25``.
+
+Any other backend gets an unranked ``icontains`` scan.
+
+``check_search_index`` (a database system check, run by ``migrate`` and
+``check --database``, and by the test suite) reports index objects a later
+migration dropped, e.g. the SQLite triggers lost when Django rebuilds
+``intruments_item``.
+"""
+import re
+
+from django.core import checks
+from django.db import connection, connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_FIELDS = ("name", "serial_number", "buyer_name", "gst_number", "remarks")
+MIN_QUERY_LENGTH = 3
+FTS_TABLE = "intruments_item_search"
+SEARCH_MIGRATION = ("intruments", "0011_item_search")
+# What migration 0011 creates, per backend
+INDEX_OBJECTS = {
+    "postgresql": ("item_search_tsv_idx", "item_search_trgm_idx"),
+    "sqlite": (
+        FTS_TABLE, "intruments_item_search_insert", "intruments_item_search_delete", "intruments_item_search_update",
+    ),
+}
+
+# Must stay identical to the indexed expressions in migration 0011 for
+# PostgreSQL to use the indexes
+PG_DOCUMENT = (
+    "(intruments_item.name || ' ' || intruments_item.serial_number || ' ' || intruments_item.buyer_name"
+    " || ' ' || intruments_item.gst_number || ' ' || coalesce(intruments_item.remarks, ''))"
+)
+PG_VECTOR = f"to_tsvector('simple'::regconfig, {PG_DOCUMENT})"
+
+_WORD = re.compile(r"\w+")
+
+
+def query_words(q):
+    return [word.lower() for word in _WORD.findall(q)]
+
+
+def _postgres(queryset, words):
+    # Every word as a prefix, all required; only \w characters reach to_tsquery
+    tsquery = " & ".join(f"{word}:*" for word in words)
+    text = " ".join(words)
+    matched = RawSQL(
+        f"({PG_VECTOR} @@ to_tsquery('simple'::regconfig, %s) OR %s <%% lower({PG_DOCUMENT}))",
+        (tsquery, text),
+        output_field=BooleanField(),
+    )
+    rank = RawSQL(
+        f"ts_rank({PG_VECTOR}, to_tsquery('simple'::regconfig, %s)) + word_similarity(%s, lower({PG_DOCUMENT}))",
+        (tsquery, text),
+        output_field=FloatField(),
+    )
+    return queryset.filter(matched).annotate(rank=rank)
+
+
+def _sqlite(queryset, words):
+    # The trigram tokenizer matches substrings of 3+ characters. A word of 6
+    # or more matches if it contains either half of the query word, which
+    # survives any single typo; whole-word matches contain both and rank
+    # higher.
+    groups = []
+    for word in words:
+        if len(word) < 3:
+            continue
+        if len(word) < 6:
+            groups.append(f'"{word}"')
+        else:
+            half = (len(word) + 1) // 2
+            groups.append(f'("{word[:half]}" OR "{word[-half:]}")')
+    if not groups:
+        # Nothing the trigram index can match; rank keeps the ordering valid
+        return queryset.none().annotate(rank=Value(0.0, output_field=FloatField()))
+    # A join, so bm25 is computed once per match; extra() is the only way
+    # to join a table the ORM doesn't model
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f"{FTS_TABLE}.rowid = intruments_item.id", f"{FTS_TABLE} MATCH %s"],
+        params=[" AND ".join(groups)],
+        select={"rank": f"-bm25({FTS_TABLE})"},  # bm25 is lower for better matches
+    )
+
+
+def _scan(queryset, words):
+    condition = Q()
+    for word in words:
+        condition &= Q(*(Q(**{f"{field}__icontains": word}) for field in SEARCH_FIELDS), _connector=Q.OR)
+    return queryset.filter(condition).annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+def search_items(queryset, q):
+    """
+    Filter an ``Item`` queryset to the matches for ``q``, annotated with
+    ``rank`` (higher is better) and ordered by it.
+    """
+    words = query_words(q)
+    if not words:
+        return queryset.none()
+    if connection.vendor == "postgresql":
+        queryset = _postgres(queryset, words)
+    elif connection.vendor == "sqlite":
+        queryset = _sqlite(queryset, words)
+    else:
+        queryset = _scan(queryset, words)
+    return queryset.order_by("-rank", "id")
+
+
+def missing_index_objects(using="default"):
+    """
+    Names from ``INDEX_OBJECTS`` that aren't in the ``using`` database;
+    empty until migration 0011 has run.
+    """
+    db = connections[using]
+    expected = INDEX_OBJECTS.get(db.vendor)
+    if not expected or SEARCH_MIGRATION not in MigrationRecorder(db).applied_migrations():
+        return []
+    placeholders = ", ".join(["%s"] * len(expected))
+    if db.vendor == "postgresql":
+        sql = f"SELECT indexname FROM pg_indexes WHERE tablename = 'intruments_item' AND indexname IN ({placeholders})"
+    else:
+        sql = f"SELECT name FROM sqlite_master WHERE name IN ({placeholders})"
+    with db.cursor() as cursor:
+        cursor.execute(sql, expected)
+        found = {name for name, in cursor.fetchall()}
+    return [name for name in expected if name not in found]
+
+
+@checks.register(checks.Tags.database)
+def check_search_index(app_configs, databases=None, **kwargs):
+    # A warning, not an error: migrate runs this first and must still be
+    # able to apply the migration that recreates them
+    warnings = []
+    for alias in databases or ():
+        missing = missing_index_objects(alias)
+        if missing:
+            warnings.append(checks.Warning(
+                f"/items/search index objects are missing from the '{alias}' database: {', '.join(missing)}",
+                hint="A migration rebuilt intruments_item; recreate them as migration 0011 does.",
+                id="intruments.W001",
+            ))
+    return warnings
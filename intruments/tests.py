@@ -1,3 +1,217 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from api.pagination import MAX_PAGE_SIZE
+from benchmarks.query_budgets import measure
+
+from . import api, item_import
+from .models import Category, IssueRequest, Item, SubCategory
+from .search import missing_index_objects, search_items
+
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class QueryBudgetTests(TransactionTestCase):
+    # Real transactions: under TestCase every atomic() is a savepoint, which
+    # adds queries the deployed app doesn't make
+
+    def test_instrument_routes_stay_within_budget(self):
+        # Two sizes, so list routes whose queries grow with the result fail
+        results, failures = measure((2, 6), repeat=1, prefixes=("instruments/",))
+        self.assertEqual(failures, [])
+
+
+def make_item(sub_category, n, **fields):
+    return Item.objects.create(**{
+        "category_id": sub_category.category_id, "sub_category": sub_category, "name": f"Item {n}",
+        "serial_number": f"SN{n}", "cost": 10, "quantity": 5, "gst_number": "GST", "buyer_name": "Buyer",
+        "buyer_email": "buyer@lnmiit.ac.in", "bill_number": f"B{n}", **fields,
+    })
+
+
+class ItemListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sub_category = SubCategory.objects.create(name="Lenses", category=Category.objects.create(name="Optics"))
+        day = timezone.now().replace(microsecond=0)
+        # Few distinct values, so most pages split a run of equal sort keys
+        for n in range(17):
+            make_item(sub_category, n, cost=(10, 20, 30)[n % 3], purchase_date=day - timedelta(days=n % 2))
+
+    def walk(self, sort):
+        ids, cursor = [], None
+        while True:
+            params = {"sort": sort, "limit": 4}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get("/instruments/items", params)
+            self.assertEqual(response.status_code, 200, response.content)
+            page = response.json()
+            ids += [item["id"] for item in page["items"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                return ids
+
+    def test_pages_cover_every_item_once_in_order(self):
+        for sort in ("cost", "-cost", "purchase_date", "-purchase_date"):
+            with self.subTest(sort=sort):
+                expected = list(Item.objects.order_by(*api.ITEM_SORTS[sort]).values_list("id", flat=True))
+                self.assertEqual(self.walk(sort), expected)
+                self.assertEqual(len(expected), 17)
+
+
+HEADER = "category,sub_category,name,serial_number,bill_number,cost,quantity,gst_number,buyer_name,buyer_email"
+
+
+def items_csv(*lines):
+    return SimpleUploadedFile("items.csv", "\n".join([HEADER, *lines]).encode(), content_type="text/csv")
+
+
+class ItemImportTests(TestCase):
+    def test_counts_only_categories_it_created(self):
+        Category.objects.create(name="Optics")
+        response = self.client.post("/instruments/items/import", {"file": items_csv(
+            "optics,Lenses,Lens 1,SN1,B1,10,1,GST,Buyer,buyer@lnmiit.ac.in",
+            "Physics Lab,Shelf,Prism,SN2,B2,10,1,GST,Buyer,buyer@lnmiit.ac.in",
+        )})
+        self.assertEqual(response.status_code, 200, response.content)
+        result = response.json()
+        self.assertEqual(result["success_count"], 2)
+        self.assertEqual(result["created_categories"], 1)
+        self.assertEqual(result["created_sub_categories"], 2)
+
+    def test_names_dropped_on_insert_fail_their_rows(self):
+        with mock.patch.object(Category.objects, "bulk_create", return_value=[]):
+            response = self.client.post("/instruments/items/import", {"file": items_csv(
+                "Optics,Lenses,Lens 1,SN1,B1,10,1,GST,Buyer,buyer@lnmiit.ac.in",
+            )})
+        self.assertEqual(response.status_code, 200, response.content)
+        result = response.json()
+        self.assertEqual(result["created_categories"], 0)
+        self.assertEqual(result["failed"], [{"row": 2, "error": "category could not be created"}])
+
+    def test_oversized_upload_is_rejected_before_parsing(self):
+        with mock.patch.object(api, "MAX_IMPORT_BYTES", 64), \
+                mock.patch.object(item_import, "read_frame", wraps=item_import.read_frame) as read_frame:
+            response = self.client.post("/instruments/items/import", {"file": items_csv(
+                *(f"Optics,Lenses,Lens {i},SN{i},B{i},10,1,GST,Buyer,buyer@lnmiit.ac.in" for i in range(5))
+            )})
+        self.assertEqual(response.status_code, 400)
+        read_frame.assert_not_called()
+
+
+class ItemSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Optics")
+        sub_category = SubCategory.objects.create(name="Lenses", category=category)
+        cls.item = Item.objects.create(
+            category=category, sub_category=sub_category, name="Digital Oscilloscope", serial_number="SN1",
+            cost=10, quantity=1, gst_number="GST", buyer_name="Buyer", buyer_email="buyer@lnmiit.ac.in",
+        )
+
+    def search(self, q):
+        return self.client.get("/instruments/items/search", {"q": q})
+
+    def test_needs_one_word_long_enough_to_match(self):
+        for q in ("ab cd", "  ab  ", "a-b-c"):
+            with self.subTest(q=q):
+                self.assertEqual(self.search(q).status_code, 400)
+        response = self.search("ab oscilloscope")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([hit["id"] for hit in response.json()], [self.item.id])
+
+    def test_only_short_words_match_nothing(self):
+        self.assertEqual(list(search_items(Item.objects.all(), "ab cd")), [])
+
+    def test_search_index_objects_are_present(self):
+        self.assertEqual(missing_index_objects(), [])
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("DROP TRIGGER intruments_item_search_update")
+            self.assertEqual(missing_index_objects(), ["intruments_item_search_update"])
+
+
+class IssueRequestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sub_category = SubCategory.objects.create(name="Lenses", category=Category.objects.create(name="Optics"))
+        cls.item = make_item(sub_category, 1, quantity=5)
+        cls.user = get_user_model().objects.create_user(
+            email="s1@lnmiit.ac.in", username="s1", password="x", role="student"
+        )
+
+    def request_for(self, quantity):
+        return IssueRequest.objects.create(
+            item=self.item, user=self.user, quantity=quantity, status="pending", remarks=""
+        )
+
+    def approve(self, issue_request):
+        return self.client.post(f"/instruments/issue-requests/{issue_request.id}/approve")
+
+    def stock(self):
+        return Item.objects.get(id=self.item.id).quantity
+
+    def test_approving_more_than_the_stock_changes_nothing(self):
+        issue_request = self.request_for(6)
+        response = self.approve(issue_request)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["detail"], api.NOT_ENOUGH_STOCK)
+        issue_request.refresh_from_db()
+        self.assertEqual(issue_request.status, "pending")
+        self.assertEqual(self.stock(), 5)
+
+    def test_approving_twice_takes_stock_once(self):
+        issue_request = self.request_for(2)
+        self.assertEqual(self.approve(issue_request).status_code, 200)
+        response = self.approve(issue_request)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["detail"], api.ALREADY_PROCESSED)
+        self.assertEqual(self.stock(), 3)
+
+    def bulk(self, action, ids):
+        return self.client.post(
+            f"/instruments/issue-requests/bulk-{action}", {"ids": ids}, content_type="application/json"
+        )
+
+    def test_bulk_approve_takes_stock_in_request_order(self):
+        first, second, third = self.request_for(3), self.request_for(3), self.request_for(2)
+        response = self.bulk("approve", [second.id, first.id, third.id])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(o["id"], o["ok"]) for o in response.json()], [
+            (second.id, True), (first.id, False), (third.id, True),
+        ])
+        self.assertEqual(response.json()[1]["detail"], api.NOT_ENOUGH_STOCK)
+        self.assertEqual(self.stock(), 0)
+        statuses = dict(IssueRequest.objects.values_list("id", "status"))
+        self.assertEqual([statuses[r.id] for r in (first, second, third)], ["pending", "approved", "approved"])
+
+    def test_bulk_outcome_per_id(self):
+        done, pending = self.request_for(1), self.request_for(1)
+        self.assertEqual(self.approve(done).status_code, 200)
+        missing = pending.id + 100
+        for action, status in (("approve", "approved"), ("reject", "rejected")):
+            with self.subTest(action=action):
+                fresh = self.request_for(1)
+                response = self.bulk(action, [missing, done.id, fresh.id, fresh.id])
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), [
+                    {"id": missing, "ok": False, "status": None, "detail": api.NOT_FOUND},
+                    {"id": done.id, "ok": False, "status": "approved", "detail": api.ALREADY_PROCESSED},
+                    {"id": fresh.id, "ok": True, "status": status, "detail": None},
+                ])
+
+    def test_bulk_id_cap(self):
+        for action in ("approve", "reject"):
+            with self.subTest(action=action):
+                response = self.bulk(action, list(range(1, MAX_PAGE_SIZE + 2)))
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(self.bulk(action, list(range(1, MAX_PAGE_SIZE + 1))).status_code, 200)
+        self.assertEqual(self.stock(), 5)